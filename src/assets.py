@@ -0,0 +1,142 @@
+from chessConfiguration import Configuration
+from rules import START_PIECE_POS
+import pygame
+
+SQUARE_NAMES = ['light_square', 'dark_square']
+
+
+class Assets:
+    def __init__(self, config: Configuration = None):
+        """
+        Decodes every image once and packs the board and piece images into one atlas surface.
+
+        Piece images are scaled to the piece size. Square images are cropped to the
+        square size, and the whole board is pre-rendered from them once.
+
+        Args:
+            config (Configuration): The configuration holding the asset paths.
+        """
+        self.config = config or Configuration()
+        names = SQUARE_NAMES + list(START_PIECE_POS)
+        cell = max(self.config.square_size, self.config.piece_size)
+
+        self.atlas = pygame.Surface((cell * len(names), cell), pygame.SRCALPHA)
+        self.images = {}
+        squares = {}
+        for i, name in enumerate(names):
+            image = self._load(name)
+            if name in SQUARE_NAMES:
+                squares[name] = image
+                image = image.subsurface((0, 0, self.config.square_size, self.config.square_size))
+            else:
+                image = pygame.transform.scale(image, (self.config.piece_size, self.config.piece_size))
+            # Copy pixels as they are rather than alpha-blending them onto the empty atlas
+            self.atlas.blit(image, (i * cell, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.images[name] = self.atlas.subsurface((i * cell, 0) + image.get_size())
+
+        self.board_background = self._render_board(squares)
+        size = self.config.square_size
+        self.piece_rects = [[self.images['w_pawn'].get_rect(center=((x + 0.5) * size, (y + 0.5) * size)) for y in range(8)]
+                            for x in range(8)]
+        self.menu_backgrounds = {}
+        self.fonts = {}
+        self.overlays = {}
+
+    def _load(self, name: str):
+        image = pygame.image.load(self.config.get_path(name))
+        # Converting needs a display mode; without one the image keeps its file format
+        return image.convert_alpha() if pygame.display.get_surface() is not None else image
+
+    def _render_board(self, squares: dict):
+        # The square images are larger than a square and have soft edges, so each one is drawn
+        # whole over its neighbours, in the order the board has always been drawn in
+        size = self.config.square_size
+        board = pygame.Surface((size * 8, size * 8))
+        for x in range(8):
+            for y in range(8):
+                board.blit(squares[SQUARE_NAMES[(x + y) % 2]], (x * size, y * size))
+        return board
+
+    def get_image(self, name: str):
+        """
+        Returns the cached image of a piece or square.
+
+        Args:
+            name (str): A piece name such as 'w_king', 'light_square' or 'dark_square'.
+
+        Returns:
+            pygame.Surface: A subsurface of the atlas; blit it, do not draw on it.
+        """
+        return self.images[name]
+
+    def get_piece_rect(self, square: tuple[int, int]):
+        """
+        Returns where a piece image is drawn on a square.
+
+        Args:
+            square (tuple[int, int]): The (x, y) coordinates of the square.
+
+        Returns:
+            pygame.Rect: The shared rect, centred on the square; do not move it.
+        """
+        x, y = square
+        return self.piece_rects[x][y]
+
+    def get_overlay(self, color: tuple[int, int, int, int]):
+        """
+        Returns a square-sized surface filled with a translucent highlight colour, made on first use.
+
+        Args:
+            color (tuple[int, int, int, int]): The RGBA colour.
+
+        Returns:
+            pygame.Surface: The shared overlay; blit it, do not draw on it.
+        """
+        if color not in self.overlays:
+            self.overlays[color] = self.config.get_square_color_surface()
+            self.overlays[color].fill(color)
+        return self.overlays[color]
+
+    def get_menu_background(self, size: tuple[int, int]):
+        """
+        Returns the menu background scaled to a window size, decoding it on first use.
+
+        Args:
+            size (tuple[int, int]): The window size.
+
+        Returns:
+            pygame.Surface: The scaled background.
+        """
+        if size not in self.menu_backgrounds:
+            self.menu_backgrounds[size] = pygame.transform.scale(self._load('menu_bg'), size)
+        return self.menu_backgrounds[size]
+
+    def get_font(self, size: int):
+        """
+        Returns the game font at a point size, loading it on first use.
+
+        Args:
+            size (int): The font size.
+
+        Returns:
+            pygame.freetype.Font: The font.
+        """
+        if size not in self.fonts:
+            self.fonts[size] = pygame.freetype.Font(self.config.get_path('font'), size)
+        return self.fonts[size]
+
+
+_assets = None
+
+
+def get_assets():
+    """
+    Returns the process-wide Assets, creating it on first use.
+
+    Returns:
+        Assets: The shared asset manager.
+    """
+    global _assets
+    if _assets is None:
+        _assets = Assets()
+    return _assets
@@ -1,23 +1,29 @@
 from chessConfiguration import Configuration
 import pygame
 
+# Sound effects in the order a busy mixer gives them up, lowest priority first
+EFFECT_PRIORITIES = {'move': 0, 'capture': 1, 'castle': 1, 'promote': 2, 'check': 3}
+CHANNELS = 8  # Size of the sound effect channel pool
+
+
 class Audio:
-    def __init__(self):
+    def __init__(self, channels: int = CHANNELS):
         """
         Initializes the Audio object.
 
-        Loads the audio files and initializes the mixer.
+        Initializes the mixer once, decodes every sound effect into memory and
+        reserves a pool of channels to play them on. Music is only used for the game track.
+
+        Args:
+            channels (int): The number of sound effects that can play at once.
         """
-        pygame.mixer.init()
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(channels)
         self.config = Configuration()
-        self.audio_files = {
-            'capture': self.config.get_path('capture'),
-            'castle': self.config.get_path('castle'),
-            'check': self.config.get_path('check'),
-            'game': self.config.get_path('game'),
-            'move': self.config.get_path('move'),
-            'promote': self.config.get_path('promote')
-        }
+        self.sounds = {name: pygame.mixer.Sound(self.config.get_path(name)) for name in EFFECT_PRIORITIES}
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.channel_effects = [None] * channels
 
     def play_capture(self):
         """
@@ -39,9 +45,10 @@ class Audio:
 
     def play_game(self):
         """
-        Plays the game sound effect.
+        Plays the game track.
         """
-        self._play_audio('game')
+        pygame.mixer.music.load(str(self.config.get_path('game')))
+        pygame.mixer.music.play()
 
     def play_move(self):
         """
@@ -55,14 +62,56 @@ class Audio:
         """
         self._play_audio('promote')
 
+    def _pick_channel(self, audio_name: str):
+        """
+        Chooses the channel for a sound effect.
+
+        An effect that is still playing restarts on its own channel rather than
+        overlapping itself. Otherwise a free channel is used, and when every channel
+        is busy the lowest-priority effect below this one is cut off.
+
+        Args:
+            audio_name (str): The name of the sound effect.
+
+        Returns:
+            int or None: The channel index, or None if the effect should be dropped.
+        """
+        busy = [channel.get_busy() for channel in self.channels]
+        for i, name in enumerate(self.channel_effects):
+            if busy[i] and name == audio_name:
+                return i
+        if False in busy:
+            return busy.index(False)
+
+        priority = EFFECT_PRIORITIES[audio_name]
+        lower = [(EFFECT_PRIORITIES[name], i) for i, name in enumerate(self.channel_effects)
+                 if name is not None and EFFECT_PRIORITIES[name] < priority]
+        return min(lower)[1] if lower else None
+
     def _play_audio(self, audio_name):
         """
-        Plays the specified audio file.
+        Plays the specified sound effect.
 
         Args:
-            audio_name (str): The name of the audio file.
+            audio_name (str): The name of the sound effect.
         """
-        audio_path = self.audio_files.get(audio_name)
-        if audio_path:
-            pygame.mixer.music.load(str(audio_path))
-            pygame.mixer.music.play()
+        channel = self._pick_channel(audio_name)
+        if channel is not None:
+            self.channels[channel].play(self.sounds[audio_name])
+            self.channel_effects[channel] = audio_name
+
+
+_audio = None
+
+
+def get_audio():
+    """
+    Returns the process-wide Audio, creating it on first use and again if the mixer was shut down.
+
+    Returns:
+        Audio: The shared audio service.
+    """
+    global _audio
+    if _audio is None or not pygame.mixer.get_init():
+        _audio = Audio()
+    return _audio
@@ -0,0 +1,259 @@
+"""
+Batched legal move generation for Chess Without En Passant.
+
+Generates the legal moves of thousands of positions at once from the square
+codes of tensor.encode_codes. Every piece type of every position is a 64-bit
+board in a NumPy array, with bit ``y * 8 + x`` for square (x, y) as in
+bitboard.py, so each shift or mask below works on the whole batch:
+
+    attacks   enemy attacks are filled outward along the eight directions
+              with the moving side's king lifted off the board
+    pins      rays cast from the king find checkers and, past one own piece,
+              pinners; a pinned piece keeps only moves along its pin line
+    moves     targets are collected per square offset, and the set bits of
+              the few non-empty words are turned into (start, end) pairs
+
+The rules are those of the scalar generators: castling needs the right, which
+Position ties to on_starting_square, pawns capture only from ranks 2 to 7 of
+the board, a promotion counts once, and there is no en passant. Castling rights
+come from the castling masks and a pawn may advance two squares from its
+starting rank, as when a Position is set up from FEN.
+"""
+from bitboard import SQUARE_COORDS
+from tensor import PIECE_CODES, encode_codes
+from zobrist import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+import numpy as np
+
+KINDS = ['pawn', 'knight', 'bishop', 'rook', 'queen', 'king']
+FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+LINEAR_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+DIAGONAL_DIRECTIONS = [(1, 1), (-1, -1), (1, -1), (-1, 1)]
+KNIGHT_OFFSETS = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+KING_OFFSETS = LINEAR_DIRECTIONS + DIAGONAL_DIRECTIONS
+LINES = {direction: index // 2 for index, direction in enumerate(KING_OFFSETS)}  # Opposite directions share a line
+
+
+def _squares(*squares):
+    return np.uint64(sum(1 << (y * 8 + x) for x, y in squares))
+
+
+# Squares a shift by dx files may land on without wrapping round the board edge
+FILE_KEEP = {dx: _squares(*[(x, y) for x in range(8) for y in range(8) if 0 <= x - dx <= 7]) for dx in range(-2, 3)}
+RANKS = [_squares(*[(x, y) for x in range(8)]) for y in range(8)]
+PAWN_CAPTURE_ROWS = _squares(*[(x, y) for x in range(8) for y in range(1, 7)])  # As in bitboard.PAWN_ATTACKS
+CASTLING_PATHS = [  # (side, right, king target offset, squares to be empty, squares not attacked, target)
+    ('w', WHITE_KINGSIDE, 2, _squares((5, 7), (6, 7)), _squares((5, 7), (6, 7)), _squares((6, 7))),
+    ('w', WHITE_QUEENSIDE, -2, _squares((1, 7), (2, 7), (3, 7)), _squares((2, 7), (3, 7)), _squares((2, 7))),
+    ('b', BLACK_KINGSIDE, 2, _squares((5, 0), (6, 0)), _squares((5, 0), (6, 0)), _squares((6, 0))),
+    ('b', BLACK_QUEENSIDE, -2, _squares((1, 0), (2, 0), (3, 0)), _squares((2, 0), (3, 0)), _squares((2, 0))),
+]
+
+
+def _shift(boards, dx: int, dy: int):
+    offset = dy * 8 + dx
+    shifted = boards << np.uint64(offset) if offset > 0 else boards >> np.uint64(-offset)
+    return shifted & FILE_KEEP[dx]
+
+
+def _slide(boards, empty, dx: int, dy: int):
+    # Every square reached from the boards along one direction, up to and including the first blocker
+    reached = np.zeros_like(boards)
+    for _ in range(7):
+        boards = _shift(boards, dx, dy)
+        reached |= boards
+        boards &= empty
+    return reached
+
+
+def piece_boards(codes):
+    """
+    Packs square codes into one 64-bit board per piece.
+
+    Args:
+        codes (np.ndarray): (N, 64) square codes from tensor.encode_codes.
+
+    Returns:
+        dict[str, np.ndarray]: Piece name mapped to (N,) uint64 boards.
+    """
+    codes = np.asarray(codes, dtype=np.uint8).reshape(-1, 64)
+    return {piece_name: np.packbits(codes == code, axis=1, bitorder='little').view('<u8').reshape(-1).astype(np.uint64)
+            for piece_name, code in PIECE_CODES.items()}
+
+
+def legal_move_arrays(codes, turn, castling):
+    """
+    Generates the legal moves of many positions.
+
+    Args:
+        codes (np.ndarray): (N, 64) square codes.
+        turn (np.ndarray): (N,) side to move, 0 for white and 1 for black.
+        castling (np.ndarray): (N,) zobrist castling masks.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (index, start, end) int64 arrays with one entry per
+        move, sorted by position, then start square, then end square. Squares are bit indexes y * 8 + x.
+    """
+    boards = piece_boards(codes)
+    count = len(boards['w_king'])
+    is_black = np.where(np.asarray(turn).reshape(count) != 0, FULL, np.uint64(0))
+    is_white = ~is_black
+    castling = np.asarray(castling, dtype=np.uint64).reshape(count)
+
+    own = {kind: boards['w_' + kind] & is_white | boards['b_' + kind] & is_black for kind in KINDS}
+    enemy = {kind: boards['b_' + kind] & is_white | boards['w_' + kind] & is_black for kind in KINDS}
+    own_all = own['pawn'] | own['knight'] | own['bishop'] | own['rook'] | own['queen'] | own['king']
+    enemy_all = enemy['pawn'] | enemy['knight'] | enemy['bishop'] | enemy['rook'] | enemy['queen'] | enemy['king']
+    occupied = own_all | enemy_all
+    empty = ~occupied
+    king = own['king']
+    sliders = {direction: enemy['queen'] | enemy['rook' if direction in LINEAR_DIRECTIONS else 'bishop']
+               for direction in KING_OFFSETS}
+
+    # Enemy attacks with the king lifted off the board, so it cannot step back along a checking ray
+    attacked = np.zeros(count, dtype=np.uint64)
+    for dx, dy in KING_OFFSETS:
+        attacked |= _shift(enemy['king'], dx, dy) | _slide(sliders[dx, dy], empty | king, dx, dy)
+    for dx, dy in KNIGHT_OFFSETS:
+        attacked |= _shift(enemy['knight'], dx, dy)
+    for dx in (-1, 1):
+        attacked |= _shift(enemy['pawn'] & PAWN_CAPTURE_ROWS & is_black, dx, -1)
+        attacked |= _shift(enemy['pawn'] & PAWN_CAPTURE_ROWS & is_white, dx, 1)
+
+    # Checkers, the squares that block or capture them, and pinned pieces by the line they are pinned on
+    checkers = np.zeros(count, dtype=np.uint64)
+    check_rays = np.zeros(count, dtype=np.uint64)
+    pinned = [np.zeros(count, dtype=np.uint64) for _ in range(4)]
+    for dx, dy in KING_OFFSETS:
+        ray = _slide(king, empty, dx, dy)
+        checker = ray & occupied & sliders[dx, dy]
+        checkers |= checker
+        check_rays |= np.where(checker != 0, ray, np.uint64(0))
+        screen = ray & own_all
+        pinners = _slide(king, empty | screen, dx, dy) & sliders[dx, dy]
+        pinned[LINES[dx, dy]] |= np.where(pinners != 0, screen, np.uint64(0))
+    for dx, dy in KNIGHT_OFFSETS:
+        checkers |= _shift(king, dx, dy) & enemy['knight']
+    for dx in (-1, 1):
+        checkers |= _shift(king & is_white, dx, -1) & enemy['pawn'] & PAWN_CAPTURE_ROWS
+        checkers |= _shift(king & is_black, dx, 1) & enemy['pawn'] & PAWN_CAPTURE_ROWS
+    checks = np.bitwise_count(checkers)
+    evasions = np.where(checks == 0, FULL, np.where(checks == 1, check_rays | checkers, np.uint64(0)))
+    pinned_any = pinned[0] | pinned[1] | pinned[2] | pinned[3]
+    free = [~(pinned_any & ~pinned[line]) for line in range(4)]  # Pieces that may move along each line
+
+    # Target squares by the offset from start to end, which names the start square of each target
+    targets = {}
+
+    def add(offset: int, boards):
+        targets[offset] = targets[offset] | boards if offset in targets else boards
+
+    for dx, dy in KING_OFFSETS:
+        movers = (own['queen'] | own['rook' if (dx, dy) in LINEAR_DIRECTIONS else 'bishop']) & free[LINES[dx, dy]]
+        for distance in range(1, 8):
+            movers = _shift(movers, dx, dy) & ~own_all
+            add(distance * (dy * 8 + dx), movers & evasions)
+            movers &= empty
+        add(dy * 8 + dx, _shift(king, dx, dy) & ~own_all & ~attacked)
+    for dx, dy in KNIGHT_OFFSETS:
+        add(dy * 8 + dx, _shift(own['knight'] & ~pinned_any, dx, dy) & ~own_all & evasions)
+    for side, dy, start_rank in ((is_white, -1, 6), (is_black, 1, 1)):
+        pawns = own['pawn'] & side
+        single = _shift(pawns & free[LINES[0, dy]], 0, dy) & empty
+        add(dy * 8, single & evasions)
+        add(dy * 16, _shift(single & RANKS[start_rank + dy], 0, dy) & empty & evasions)
+        for dx in (-1, 1):
+            add(dy * 8 + dx, _shift(pawns & PAWN_CAPTURE_ROWS & free[LINES[dx, dy]], dx, dy) & enemy_all & evasions)
+    for color, right, offset, between, path, target in CASTLING_PATHS:
+        allowed = ((castling & np.uint64(right)) != 0) & (checks == 0) & ((occupied & between) == 0) & ((attacked & path) == 0)
+        add(offset, np.where(allowed, target, np.uint64(0)) & (is_white if color == 'w' else is_black))
+
+    # Only the non-empty words are split into moves, one lowest set bit per pass
+    index = [np.flatnonzero(boards) for boards in targets.values()]
+    words = np.concatenate([boards[nonzero] for boards, nonzero in zip(targets.values(), index)])
+    offsets = np.repeat(np.array(list(targets), dtype=np.int64), [len(nonzero) for nonzero in index])
+    index = np.concatenate(index)
+    moves = []
+    while len(words):
+        lowest = words & (~words + np.uint64(1))
+        end = np.bitwise_count(lowest - np.uint64(1)).astype(np.int64)
+        moves.append(index << 12 | (end - offsets) << 6 | end)
+        words ^= lowest
+        remaining = words != 0
+        words, index, offsets = words[remaining], index[remaining], offsets[remaining]
+
+    # Sorting one packed key is cheaper than sorting indirectly by three arrays
+    moves = np.sort(np.concatenate(moves)) if moves else np.zeros(0, dtype=np.int64)
+    return moves >> 12, moves >> 6 & 63, moves & 63
+
+
+def legal_move_masks(codes, turn, castling):
+    """
+    Generates the legal moves of many positions as from-to masks.
+
+    Args:
+        codes (np.ndarray): (N, 64) square codes.
+        turn (np.ndarray): (N,) side to move, 0 for white and 1 for black.
+        castling (np.ndarray): (N,) zobrist castling masks.
+
+    Returns:
+        np.ndarray: (N, 64, 64) bool, True at [position, start, end] for every legal move.
+    """
+    index, start, end = legal_move_arrays(codes, turn, castling)
+    masks = np.zeros((len(np.asarray(codes).reshape(-1, 64)), 64, 64), dtype=bool)
+    masks[index, start, end] = True
+    return masks
+
+
+def batch_legal_moves(positions):
+    """
+    Generates the legal moves of many positions in the form Position.get_legal_moves returns.
+
+    Args:
+        positions (Iterable[Position]): The positions.
+
+    Returns:
+        list[list[tuple[tuple[int, int], tuple[int, int]]]]: (start, end) pairs for each position.
+    """
+    codes, turn, castling = encode_codes(positions)
+    moves = [[] for _ in range(len(codes))]
+    for index, start, end in zip(*(array.tolist() for array in legal_move_arrays(codes, turn, castling))):
+        moves[index].append((SQUARE_COORDS[start], SQUARE_COORDS[end]))
+    return moves
+
+
+if __name__ == '__main__':
+    import argparse
+    import random
+    from rules import Position
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Compare batched and scalar legal move generation for Chess Without En Passant')
+    parser.add_argument('--games', type=int, default=200, help='random games to sample positions from')
+    parser.add_argument('--repeat', type=int, default=100, help='times the sampled batch is repeated for timing')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    positions = []
+    for _ in range(args.games):
+        position = Position()
+        for _ in range(rng.randrange(120)):
+            moves = position.get_legal_moves()
+            if not moves:
+                break
+            position.play_move(*rng.choice(sorted(moves)))
+        positions.append(position)
+
+    start_time = perf_counter()
+    scalar = [position.get_legal_moves() for position in positions]
+    scalar_time = (perf_counter() - start_time) / len(positions)
+    batch = batch_legal_moves(positions)
+    mismatches = sum(set(moves) != set(batch_moves) for moves, batch_moves in zip(scalar, batch))
+
+    codes, turn, castling = encode_codes(positions)
+    codes, turn, castling = np.tile(codes, (args.repeat, 1)), np.tile(turn, args.repeat), np.tile(castling, args.repeat)
+    start_time = perf_counter()
+    index, _, _ = legal_move_arrays(codes, turn, castling)
+    batch_time = (perf_counter() - start_time) / len(codes)
+    print(f'{len(codes)} positions, {len(index)} moves, {mismatches} mismatches: scalar {scalar_time * 1e6:.1f}us, '
+          f'batched {batch_time * 1e6:.2f}us per position ({scalar_time / batch_time:.0f}x)')
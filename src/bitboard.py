@@ -0,0 +1,603 @@
+"""
+Bitboard move generation for Chess Without En Passant.
+
+A position is stored as one 64-bit integer per piece name, with bit
+``y * 8 + x`` set when that piece stands on square (x, y). Knight, king and
+pawn moves come from precomputed attack tables and sliding pieces use
+classical ray tables, so a move set is a handful of integer operations
+instead of a walk over ``board[x][y]``. Moves are still returned as sets of
+(x, y) tuples so results are interchangeable with the list generator in
+rules.py.
+"""
+
+PIECE_NAMES = [color + '_' + kind for color in 'wb' for kind in ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')]
+
+SQUARE_COORDS = [(sq % 8, sq // 8) for sq in range(64)]
+
+# Ray directions as (dx, dy); the first four run towards higher square indices
+POSITIVE_DIRECTIONS = [(1, 0), (0, 1), (1, 1), (-1, 1)]
+NEGATIVE_DIRECTIONS = [(-1, 0), (0, -1), (-1, -1), (1, -1)]
+LINEAR_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+DIAGONAL_DIRECTIONS = [(1, 1), (-1, 1), (-1, -1), (1, -1)]
+
+
+def square_index(position: tuple[int, int]):
+    """
+    Returns the bit index of a board square.
+
+    Args:
+        position (tuple[int, int]): The (x, y) square.
+
+    Returns:
+        int: The bit index in the range 0-63.
+    """
+    x, y = position
+    return y * 8 + x
+
+
+def _offset_table(offsets):
+    table = []
+    for sq in range(64):
+        x, y = SQUARE_COORDS[sq]
+        bb = 0
+        for dx, dy in offsets:
+            if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+                bb |= 1 << square_index((x + dx, y + dy))
+        table.append(bb)
+    return table
+
+
+def _pawn_attack_table(forward: int):
+    # Pawns only capture from ranks 1-6, mirroring get_pawn_moves
+    table = []
+    for sq in range(64):
+        x, y = SQUARE_COORDS[sq]
+        bb = 0
+        if 0 < y < 7:
+            for dx in (-1, 1):
+                if 0 <= x + dx <= 7:
+                    bb |= 1 << square_index((x + dx, y + forward))
+        table.append(bb)
+    return table
+
+
+def _ray_table(dx: int, dy: int):
+    table = []
+    for sq in range(64):
+        x, y = SQUARE_COORDS[sq]
+        bb = 0
+        while 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+            x += dx
+            y += dy
+            bb |= 1 << square_index((x, y))
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _offset_table([(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)])
+KING_ATTACKS = _offset_table([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy])
+PAWN_ATTACKS = {'w': _pawn_attack_table(-1), 'b': _pawn_attack_table(1)}
+PAWN_DIRECTION = {'w': -8, 'b': 8}
+
+# PAWN_ATTACKERS[color][sq] holds the squares from which a pawn of that colour captures on sq
+PAWN_ATTACKERS = {color: [0] * 64 for color in 'wb'}
+for _color in 'wb':
+    for _sq in range(64):
+        _bb = PAWN_ATTACKS[_color][_sq]
+        while _bb:
+            _lsb = _bb & -_bb
+            PAWN_ATTACKERS[_color][_lsb.bit_length() - 1] |= 1 << _sq
+            _bb ^= _lsb
+
+RAYS = {direction: _ray_table(*direction) for direction in POSITIVE_DIRECTIONS + NEGATIVE_DIRECTIONS}
+# Ray tables paired with whether the nearest blocker on them is the lowest set bit
+LINEAR_RAYS = [(RAYS[direction], direction in POSITIVE_DIRECTIONS) for direction in LINEAR_DIRECTIONS]
+DIAGONAL_RAYS = [(RAYS[direction], direction in POSITIVE_DIRECTIONS) for direction in DIAGONAL_DIRECTIONS]
+ALL_RAYS = LINEAR_RAYS + DIAGONAL_RAYS
+
+
+def slider_attacks(sq: int, occupied: int, rays):
+    """
+    Returns the squares a sliding piece on sq attacks given the occupied squares.
+
+    Args:
+        sq (int): The bit index of the sliding piece.
+        occupied (int): Bitboard of every occupied square.
+        rays (list): LINEAR_RAYS, DIAGONAL_RAYS or ALL_RAYS.
+
+    Returns:
+        int: Bitboard of attacked squares, including the first blocker on each ray.
+    """
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                ray ^= table[(blockers & -blockers).bit_length() - 1]
+            else:
+                ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def bits_to_squares(bb: int):
+    """
+    Converts a bitboard into the set of (x, y) squares it contains.
+
+    Args:
+        bb (int): The bitboard.
+
+    Returns:
+        set: A set of (x, y) tuples.
+    """
+    squares = set()
+    while bb:
+        lsb = bb & -bb
+        squares.add(SQUARE_COORDS[lsb.bit_length() - 1])
+        bb ^= lsb
+    return squares
+
+
+class BitboardPosition:
+    def __init__(self):
+        """
+        Initializes an empty bitboard position with white to move.
+        """
+        self.pieces = {piece_name: 0 for piece_name in PIECE_NAMES}
+        self.colors = {'w': 0, 'b': 0}
+        self.squares = [None] * 64
+        self.unmoved = 0
+        self.turn = 'w'
+        self.move_stack = []
+
+    @classmethod
+    def from_board(cls, board, turn: str = 'w'):
+        """
+        Builds a bitboard position from a ``board[x][y]`` grid of pieces.
+
+        Args:
+            board: The chessboard representation.
+            turn (str): The side to move.
+
+        Returns:
+            BitboardPosition: The equivalent bitboard position.
+        """
+        return cls.from_pieces((piece for column in board for piece in column if piece is not None), turn)
+
+    @classmethod
+    def from_pieces(cls, pieces, turn: str = 'w'):
+        """
+        Builds a bitboard position from the pieces themselves, skipping the empty squares.
+
+        Args:
+            pieces (Iterable): Pieces with piece_name, position and on_starting_square.
+            turn (str): The side to move.
+
+        Returns:
+            BitboardPosition: The equivalent bitboard position.
+        """
+        position = cls()
+        bitboards, colors, squares = position.pieces, position.colors, position.squares
+        unmoved = 0
+        # put_piece inlined, this runs once per legal move query under the bitboard backend
+        for piece in pieces:
+            piece_name = piece.piece_name
+            x, y = piece.position
+            sq = y * 8 + x
+            bit = 1 << sq
+            bitboards[piece_name] |= bit
+            colors[piece_name[0]] |= bit
+            squares[sq] = piece_name
+            if piece.on_starting_square:
+                unmoved |= bit
+        position.unmoved = unmoved
+        position.turn = turn
+        return position
+
+    @property
+    def occupied(self):
+        return self.colors['w'] | self.colors['b']
+
+    def put_piece(self, piece_name: str, position: tuple[int, int], on_starting_square: bool = False):
+        """
+        Places a piece on an empty square.
+
+        Args:
+            piece_name (str): The name of the chess piece.
+            position (tuple[int, int]): The square to place it on.
+            on_starting_square (bool): Whether the piece has not moved yet.
+        """
+        sq = square_index(position)
+        bit = 1 << sq
+        self.pieces[piece_name] |= bit
+        self.colors[piece_name[0]] |= bit
+        self.squares[sq] = piece_name
+        if on_starting_square:
+            self.unmoved |= bit
+
+    def remove_piece(self, position: tuple[int, int]):
+        """
+        Takes the piece off a square, if there is one.
+
+        Args:
+            position (tuple[int, int]): The square to empty.
+        """
+        sq = square_index(position)
+        piece_name = self.squares[sq]
+        if piece_name is not None:
+            self._toggle(sq, piece_name)
+            self.squares[sq] = None
+            self.unmoved &= ~(1 << sq)
+
+    def _toggle(self, sq: int, piece_name: str):
+        bit = 1 << sq
+        self.pieces[piece_name] ^= bit
+        self.colors[piece_name[0]] ^= bit
+
+    def is_promotion(self, start: tuple[int, int], end: tuple[int, int]):
+        """
+        Checks whether a move is a pawn reaching the last rank.
+
+        Args:
+            start (tuple[int, int]): The square of the piece to move.
+            end (tuple[int, int]): The destination square.
+
+        Returns:
+            bool: True if the move promotes a pawn.
+        """
+        return end[1] in (0, 7) and self.squares[square_index(start)][2:] == 'pawn'
+
+    def make_move(self, start: tuple[int, int], end: tuple[int, int], promotion: str = 'queen'):
+        """
+        Plays a move without checking its legality and pushes an undo record.
+
+        Args:
+            start (tuple[int, int]): The square of the piece to move.
+            end (tuple[int, int]): The destination square.
+            promotion (str): The piece a pawn reaching the last rank becomes.
+        """
+        start_sq = square_index(start)
+        end_sq = square_index(end)
+        squares = self.squares
+        piece_name = squares[start_sq]
+        captured = squares[end_sq]
+        unmoved = self.unmoved
+        rook_squares = None
+
+        if captured is not None:
+            self._toggle(end_sq, captured)
+        self._toggle(start_sq, piece_name)
+        squares[start_sq] = None
+        placed = piece_name
+        kind = piece_name[2:]
+        if kind == 'pawn' and end[1] in (0, 7):
+            placed = piece_name[0] + '_' + promotion
+        elif kind == 'king' and abs(end[0] - start[0]) == 2:
+            row = start_sq - start[0]
+            rook_squares = (row, row + 3) if end[0] == 2 else (row + 7, row + 5)
+            rook_name = piece_name[0] + '_rook'
+            self._toggle(rook_squares[0], rook_name)
+            self._toggle(rook_squares[1], rook_name)
+            squares[rook_squares[0]] = None
+            squares[rook_squares[1]] = rook_name
+            self.unmoved &= ~(1 << rook_squares[0])
+        self._toggle(end_sq, placed)
+        squares[end_sq] = placed
+
+        self.unmoved &= ~(1 << start_sq | 1 << end_sq)
+        self.turn = 'b' if self.turn == 'w' else 'w'
+        self.move_stack.append((start_sq, end_sq, piece_name, captured, unmoved, rook_squares))
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+
+        Returns:
+            tuple[tuple[int, int], tuple[int, int]]: The (start, end) of the move taken back.
+        """
+        start_sq, end_sq, piece_name, captured, unmoved, rook_squares = self.move_stack.pop()
+        squares = self.squares
+
+        self._toggle(end_sq, squares[end_sq])
+        squares[end_sq] = captured
+        if captured is not None:
+            self._toggle(end_sq, captured)
+        self._toggle(start_sq, piece_name)
+        squares[start_sq] = piece_name
+        if rook_squares is not None:
+            rook_name = piece_name[0] + '_rook'
+            self._toggle(rook_squares[0], rook_name)
+            self._toggle(rook_squares[1], rook_name)
+            squares[rook_squares[0]] = rook_name
+            squares[rook_squares[1]] = None
+
+        self.unmoved = unmoved
+        self.turn = 'b' if self.turn == 'w' else 'w'
+        return SQUARE_COORDS[start_sq], SQUARE_COORDS[end_sq]
+
+    def get_linear_moves(self, position: tuple[int, int], color: str):
+        """
+        Calculates the possible linear moves from a square for a piece of the given colour.
+
+        Args:
+            position (tuple[int, int]): The square of the piece.
+            color (str): The colour of the piece.
+
+        Returns:
+            set: A set of possible linear moves.
+        """
+        return bits_to_squares(slider_attacks(square_index(position), self.occupied, LINEAR_RAYS) & ~self.colors[color])
+
+    def get_diagonal_moves(self, position: tuple[int, int], color: str):
+        """
+        Calculates the possible diagonal moves from a square for a piece of the given colour.
+
+        Args:
+            position (tuple[int, int]): The square of the piece.
+            color (str): The colour of the piece.
+
+        Returns:
+            set: A set of possible diagonal moves.
+        """
+        return bits_to_squares(slider_attacks(square_index(position), self.occupied, DIAGONAL_RAYS) & ~self.colors[color])
+
+    def get_knight_moves(self, position: tuple[int, int], color: str):
+        """
+        Calculates the possible knight moves from a square for a piece of the given colour.
+
+        Args:
+            position (tuple[int, int]): The square of the piece.
+            color (str): The colour of the piece.
+
+        Returns:
+            set: A set of possible knight moves.
+        """
+        return bits_to_squares(KNIGHT_ATTACKS[square_index(position)] & ~self.colors[color])
+
+    def get_king_moves(self, position: tuple[int, int], color: str):
+        """
+        Calculates the possible king moves from a square for a piece of the given colour.
+
+        Args:
+            position (tuple[int, int]): The square of the piece.
+            color (str): The colour of the piece.
+
+        Returns:
+            set: A set of possible king moves.
+        """
+        return bits_to_squares(KING_ATTACKS[square_index(position)] & ~self.colors[color])
+
+    def get_pawn_moves(self, position: tuple[int, int], color: str, on_starting_square: bool):
+        """
+        Calculates the possible pawn moves from a square for a pawn of the given colour.
+
+        Args:
+            position (tuple[int, int]): The square of the pawn.
+            color (str): The colour of the pawn.
+            on_starting_square (bool): Whether the pawn may still advance two squares.
+
+        Returns:
+            set: A set of possible pawn moves.
+        """
+        return bits_to_squares(self._pawn_targets(square_index(position), color, on_starting_square))
+
+    def get_possible_moves(self, position: tuple[int, int], piece_name: str, on_starting_square: bool):
+        """
+        Calculates the possible moves for a piece standing on the given square.
+
+        Args:
+            position (tuple[int, int]): The square of the piece.
+            piece_name (str): The name of the piece.
+            on_starting_square (bool): Whether the piece has not moved yet.
+
+        Returns:
+            set: A set of possible moves for the piece.
+        """
+        return bits_to_squares(self._targets(square_index(position), piece_name, on_starting_square))
+
+    def _pawn_targets(self, sq: int, color: str, on_starting_square: bool):
+        enemy = self.colors['b' if color == 'w' else 'w']
+        targets = PAWN_ATTACKS[color][sq] & enemy
+        empty = ~(self.colors['w'] | self.colors['b'])
+        step = PAWN_DIRECTION[color]
+        for _ in range(2 if on_starting_square else 1):
+            sq += step
+            if 0 <= sq < 64 and empty >> sq & 1:
+                targets |= 1 << sq
+            else:
+                break
+        return targets
+
+    def _targets(self, sq: int, piece_name: str, on_starting_square: bool):
+        color = piece_name[0]
+        kind = piece_name[2:]
+        own = self.colors[color]
+        if kind == 'pawn':
+            return self._pawn_targets(sq, color, on_starting_square)
+        if kind == 'knight':
+            return KNIGHT_ATTACKS[sq] & ~own
+        if kind == 'king':
+            return KING_ATTACKS[sq] & ~own
+        occupied = self.colors['w'] | self.colors['b']
+        if kind == 'rook':
+            return slider_attacks(sq, occupied, LINEAR_RAYS) & ~own
+        if kind == 'bishop':
+            return slider_attacks(sq, occupied, DIAGONAL_RAYS) & ~own
+        return slider_attacks(sq, occupied, ALL_RAYS) & ~own
+
+    def is_square_attacked(self, sq: int, by_color: str, occupied: int = None, captured: int = 0):
+        """
+        Checks whether any piece of the given colour attacks a square.
+
+        Args:
+            sq (int): The bit index of the square.
+            by_color (str): The attacking colour.
+            occupied (int): Occupancy to test against, defaults to the current one.
+            captured (int): Bitboard of attacking pieces to ignore, e.g. one just captured.
+
+        Returns:
+            bool: True if the square is attacked, False otherwise.
+        """
+        pieces = self.pieces
+        keep = ~captured
+        if KNIGHT_ATTACKS[sq] & pieces[by_color + '_knight'] & keep:
+            return True
+        if KING_ATTACKS[sq] & pieces[by_color + '_king']:
+            return True
+        if PAWN_ATTACKERS[by_color][sq] & pieces[by_color + '_pawn'] & keep:
+            return True
+        if occupied is None:
+            occupied = self.colors['w'] | self.colors['b']
+        queens = pieces[by_color + '_queen']
+        rooks = (pieces[by_color + '_rook'] | queens) & keep
+        if rooks and slider_attacks(sq, occupied, LINEAR_RAYS) & rooks:
+            return True
+        bishops = (pieces[by_color + '_bishop'] | queens) & keep
+        if bishops and slider_attacks(sq, occupied, DIAGONAL_RAYS) & bishops:
+            return True
+        return False
+
+    def _castling_targets(self, color: str):
+        king = self.pieces[color + '_king']
+        if not king & self.unmoved:
+            return 0
+        enemy = 'b' if color == 'w' else 'w'
+        if self.is_square_attacked(king.bit_length() - 1, enemy):
+            return 0
+
+        # The king may not pass through or land on an attacked square
+        row = 0 if color == 'b' else 56
+        rook = self.pieces[color + '_rook'] & self.unmoved
+        occupied = self.colors['w'] | self.colors['b']
+        targets = 0
+        if rook >> row & 1 and not occupied >> (row + 1) & 0b111:
+            if not self.is_square_attacked(row + 3, enemy) and not self.is_square_attacked(row + 2, enemy):
+                targets |= 1 << (row + 2)
+        if rook >> (row + 7) & 1 and not occupied >> (row + 5) & 0b11:
+            if not self.is_square_attacked(row + 5, enemy) and not self.is_square_attacked(row + 6, enemy):
+                targets |= 1 << (row + 6)
+        return targets
+
+    def get_castling_moves(self, color: str):
+        """
+        Get the castling moves available for the king of the given colour.
+
+        Args:
+            color (str): The colour of the king.
+
+        Returns:
+            set: A set of castling moves (tuples) available for the king.
+        """
+        return bits_to_squares(self._castling_targets(color))
+
+    def get_legal_moves(self, color: str = None):
+        """
+        Returns every legal move for one side.
+
+        Args:
+            color (str): The side to generate for, defaults to the side to move.
+
+        Returns:
+            list[tuple[tuple[int, int], tuple[int, int]]]: (start, end) pairs.
+        """
+        moves = []
+        for start, targets in self._iter_legal_targets(color or self.turn):
+            start = SQUARE_COORDS[start]
+            while targets:
+                target = targets & -targets
+                moves.append((start, SQUARE_COORDS[target.bit_length() - 1]))
+                targets ^= target
+        return moves
+
+    def get_legal_moves_by_square(self, color: str = None):
+        """
+        Returns the legal moves of one side grouped by the square they start from.
+
+        Args:
+            color (str): The side to generate for, defaults to the side to move.
+
+        Returns:
+            dict[tuple[int, int], set]: Start square mapped to its legal destinations.
+        """
+        return {SQUARE_COORDS[start]: bits_to_squares(targets)
+                for start, targets in self._iter_legal_targets(color or self.turn) if targets}
+
+    def has_any_legal_move(self, color: str = None):
+        """
+        Checks whether one side has at least one legal move, stopping at the first.
+
+        Args:
+            color (str): The side to test, defaults to the side to move.
+
+        Returns:
+            bool: True if a legal move exists, False on checkmate or stalemate.
+        """
+        return any(targets for _, targets in self._iter_legal_targets(color or self.turn))
+
+    def _king_constraints(self, color: str, king_sq: int, occupied: int):
+        # Walks the eight rays out of the king once: an enemy slider first on a ray gives check and
+        # a block mask of the squares up to it, one behind a lone own piece pins that piece to the ray
+        enemy = 'b' if color == 'w' else 'w'
+        pieces = self.pieces
+        own = self.colors[color]
+        queens = pieces[enemy + '_queen']
+        checkers = KNIGHT_ATTACKS[king_sq] & pieces[enemy + '_knight'] | PAWN_ATTACKERS[enemy][king_sq] & pieces[enemy + '_pawn']
+        block = checkers
+        pins = {}
+        for rays, sliders in ((LINEAR_RAYS, pieces[enemy + '_rook'] | queens), (DIAGONAL_RAYS, pieces[enemy + '_bishop'] | queens)):
+            if not sliders:
+                continue
+            for table, positive in rays:
+                ray = table[king_sq]
+                blockers = ray & occupied
+                if not blockers:
+                    continue
+                first = blockers & -blockers if positive else 1 << (blockers.bit_length() - 1)
+                if first & sliders:
+                    checkers |= first
+                    block |= ray ^ table[first.bit_length() - 1]
+                elif first & own:
+                    blockers ^= first
+                    if blockers:
+                        second = blockers & -blockers if positive else 1 << (blockers.bit_length() - 1)
+                        if second & sliders:
+                            pins[first.bit_length() - 1] = ray ^ table[second.bit_length() - 1]
+        return checkers, block, pins
+
+    def _iter_legal_targets(self, color: str):
+        # Yields (start, targets) for each piece of one side, targets a bitboard of its legal destinations
+        enemy = 'b' if color == 'w' else 'w'
+        occupied = self.colors['w'] | self.colors['b']
+        king = self.pieces[color + '_king']
+        if king:
+            checkers, block, pins = self._king_constraints(color, king.bit_length() - 1, occupied)
+            double_check = checkers & (checkers - 1)
+        else:
+            checkers, block, pins, double_check = 0, 0, {}, 0
+
+        # Like the list generator, the king goes last since it rarely has moves and each one costs an attack test
+        own = self.colors[color] ^ king
+        if not double_check:
+            while own:
+                lsb = own & -own
+                start = lsb.bit_length() - 1
+                own ^= lsb
+                # Other pieces only need the masks: block or capture a single checker and stay on any pin ray
+                targets = self._targets(start, self.squares[start], bool(self.unmoved & lsb))
+                if checkers:
+                    targets &= block
+                if start in pins:
+                    targets &= pins[start]
+                yield start, targets
+        if king:
+            start = king.bit_length() - 1
+            candidates = KING_ATTACKS[start] & ~self.colors[color] | self._castling_targets(color)
+            targets = 0
+            while candidates:
+                target = candidates & -candidates
+                candidates ^= target
+                # The king is lifted so squares behind it on a checking ray count as attacked
+                if not self.is_square_attacked(target.bit_length() - 1, enemy, occupied ^ king | target, target):
+                    targets |= target
+            yield start, targets
@@ -0,0 +1,260 @@
+"""
+Opening book for Chess Without En Passant.
+
+A book maps Position.hash to weighted moves. It is built by replaying archived
+games with this project's rules, so Polyglot books, whose keys and moves assume
+en passant, cannot be used. On disk it is a header followed by fixed 16-byte
+entries sorted by key, little-endian:
+
+    header   magic, version and entry count
+    entry    key (8 bytes), move as encoded by encode_move (2), weight (2), reserved (4)
+
+OpeningBook memory-maps the file and binary-searches the keys in place, so
+opening a book of any size needs no load step and a lookup reads a handful
+of entries.
+"""
+from array import array
+from bisect import bisect_left
+from gamerecord import GameArchive
+from pgn import read_games
+from rules import Position, decode_move, encode_move, parse_move
+import mmap
+import struct
+import sys
+
+MAGIC = b'CWEPBOOK'
+VERSION = 1
+HEADER = struct.Struct('<8sHH4x')  # magic, version, reserved, followed by the entry count
+COUNT = struct.Struct('<Q')
+ENTRY = struct.Struct('<QHH4x')  # key, move, weight
+ENTRY_OFFSET = HEADER.size + COUNT.size
+MAX_WEIGHT = 0xFFFF
+BOOK_PLIES = 20  # Plies of each game added to a book
+RESULT_POINTS = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)}  # (white, black)
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class BookBuilder:
+    def __init__(self, max_plies: int = BOOK_PLIES):
+        """
+        Initializes an empty book under construction.
+
+        Args:
+            max_plies (int): How many plies of each game to add.
+        """
+        self.max_plies = max_plies
+        self.weights = {}
+
+    def add_game(self, moves, result: str = '*', fen: str = None):
+        """
+        Replays the opening of a game and credits each move to the position it was played in.
+
+        A move earns 2 points when its side went on to win, 1 for a draw or an
+        unfinished game and none for a loss.
+
+        Args:
+            moves (Iterable[int]): The moves, encoded with encode_move.
+            result (str): The PGN result token.
+            fen (str): The starting position, or None for the standard start.
+        """
+        position = Position(fen)
+        points = dict(zip('wb', RESULT_POINTS.get(result, (1, 1))))
+        for ply, move in enumerate(moves):
+            if ply == self.max_plies:
+                break
+            key = (position.hash, move)
+            self.weights[key] = self.weights.get(key, 0) + points[position.turn]
+            start, end, promotion = decode_move(move)
+            position.make_move(start, end, promotion or 'queen')
+
+    def add_archive(self, archive):
+        """
+        Adds every game of a GameArchive.
+
+        Args:
+            archive (GameArchive): The games to add.
+        """
+        for game in range(len(archive)):
+            self.add_game(archive.moves(game).tolist(), archive.result(game), archive.fen(game))
+
+    def write(self, path):
+        """
+        Writes the book, dropping moves that earned nothing.
+
+        Weights are scaled down to fit 16 bits when the most played move exceeds them.
+
+        Args:
+            path: The book file to create.
+
+        Returns:
+            int: The number of entries written.
+        """
+        entries = sorted((key, -weight, move) for (key, move), weight in self.weights.items() if weight)
+        scale = max([-weight for _, weight, _ in entries] + [MAX_WEIGHT]) / MAX_WEIGHT
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0))
+            file.write(COUNT.pack(len(entries)))
+            for key, weight, move in entries:
+                file.write(ENTRY.pack(key, move, max(round(-weight / scale), 1)))
+        return len(entries)
+
+
+class OpeningBook:
+    def __init__(self, path):
+        """
+        Opens a book by memory-mapping it.
+
+        Args:
+            path: The book file.
+
+        Raises:
+            ValueError: If the file is not a book of a supported version.
+        """
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < ENTRY_OFFSET:
+            self.map.close()
+            raise ValueError(f'Not an opening book: {path}')
+        magic, version, _ = HEADER.unpack_from(self.map)
+        self.entry_count, = COUNT.unpack_from(self.map, HEADER.size)
+        if magic != MAGIC or version != VERSION or len(self.map) != ENTRY_OFFSET + self.entry_count * ENTRY.size:
+            self.map.close()
+            raise ValueError(f'Not an opening book of version {VERSION}: {path}')
+
+        # Every other 8-byte word past the header is a key: a sorted sequence bisect can search in place
+        self.view = memoryview(self.map)
+        self.keys = self.view[ENTRY_OFFSET:].cast('Q')[::ENTRY.size // COUNT.size]
+        if not LITTLE_ENDIAN:
+            self.keys = array('Q', self.keys)
+            self.keys.byteswap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.entry_count
+
+    def entries(self, key: int):
+        """
+        Looks up the moves stored for a position key.
+
+        Args:
+            key (int): The position's Zobrist key.
+
+        Returns:
+            list[tuple[int, int]]: (encoded move, weight) pairs, heaviest first.
+        """
+        index = bisect_left(self.keys, key)
+        entries = []
+        while index < self.entry_count and self.keys[index] == key:
+            _, move, weight = ENTRY.unpack_from(self.map, ENTRY_OFFSET + index * ENTRY.size)
+            entries.append((move, weight))
+            index += 1
+        return entries
+
+    def moves(self, position: Position):
+        """
+        Returns the book moves that are legal in a position.
+
+        Moves are checked against the position, so a key collision cannot
+        produce an illegal move. The check uses the position's cached legal
+        moves, which the caller usually needs next anyway, and is skipped
+        entirely when the position is not in the book.
+
+        Args:
+            position (Position): The position to look up.
+
+        Returns:
+            list[tuple[tuple, int]]: ((start, end, promotion), weight) pairs, heaviest first.
+        """
+        entries = self.entries(position.hash)
+        if not entries:
+            return []
+        legal = position.get_cached_legal_moves()
+        moves = []
+        for move, weight in entries:
+            start, end, promotion = decode_move(move)
+            if end in legal.get(start, ()) and bool(promotion) == position.is_promotion(start, end):
+                moves.append(((start, end, promotion), weight))
+        return moves
+
+    def choose_move(self, position: Position, rng=None):
+        """
+        Picks a book move for a position.
+
+        Args:
+            position (Position): The position to move in.
+            rng (random.Random): Picks in proportion to weight if given; otherwise the heaviest move is played.
+
+        Returns:
+            tuple: (start, end, promotion), or None when the position is not in the book.
+        """
+        moves = self.moves(position)
+        if not moves:
+            return None
+        if rng is None:
+            return moves[0][0]
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+    def close(self):
+        """
+        Releases the key view and unmaps the file.
+        """
+        self.keys = None
+        self.view.release()
+        self.map.close()
+
+
+def build_book(sources, path, max_plies: int = BOOK_PLIES):
+    """
+    Builds a book from game files.
+
+    Args:
+        sources (Iterable): PGN files (ending in .pgn) and game record files.
+        path: The book file to create.
+        max_plies (int): How many plies of each game to add.
+
+    Returns:
+        int: The number of entries written.
+    """
+    builder = BookBuilder(max_plies)
+    for source in sources:
+        if str(source).endswith('.pgn'):
+            with open(source) as stream:
+                for game in read_games(stream, skip_invalid=True):
+                    moves = [encode_move(*parse_move(move)) for move in game['moves'][:max_plies]]
+                    builder.add_game(moves, game['result'], game['tags'].get('FEN'))
+        else:
+            with GameArchive(source) as archive:
+                builder.add_archive(archive)
+    return builder.write(path)
+
+
+if __name__ == '__main__':
+    import argparse
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Build an opening book for Chess Without En Passant')
+    parser.add_argument('sources', nargs='+', help='PGN (.pgn) or game record files')
+    parser.add_argument('--output', required=True, help='book file to write')
+    parser.add_argument('--plies', type=int, default=BOOK_PLIES, help='plies of each game to add')
+    args = parser.parse_args()
+
+    start_time = perf_counter()
+    entries = build_book(args.sources, args.output, args.plies)
+    print(f'{entries} entries in {perf_counter() - start_time:.2f}s')
+
+    with OpeningBook(args.output) as book:
+        # moves() is what the engine calls; fresh positions pay for their legal moves once, repeats hit the cache
+        positions = [Position() for _ in range(1000)]
+        start_time = perf_counter()
+        for position in positions:
+            book.moves(position)
+        print(f'{(perf_counter() - start_time) / len(positions) * 1e6:.1f}us per first probe of a position')
+        start_time = perf_counter()
+        for _ in range(10000):
+            book.moves(positions[0])
+        print(f'{(perf_counter() - start_time) / 10000 * 1e6:.1f}us per repeated probe')
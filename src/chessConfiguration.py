@@ -1,4 +1,5 @@
 from pathlib import Path
+from rules import START_PIECE_POS
 import pygame
 
 
@@ -31,31 +32,20 @@ class Configuration:
             'check': Path('../assets/check.mp3'),
             'game': Path('../assets/game.mp3'),
             'move': Path('../assets/move.mp3'),
-            'promote': Path('../assets/promote.mp3')
+            'promote': Path('../assets/promote.mp3'),
+
+            'games': Path('../games.pgn')  # Finished games are appended here
         }
 
         # Starting positions for each chess piece
-        self.start_piece_pos = {
-            'w_pawn': [(i, 6) for i in range(8)],
-            'w_knight': [(1, 7), (6, 7)],
-            'w_bishop': [(2, 7), (5, 7)],
-            'w_rook': [(0, 7), (7, 7)],
-            'w_queen': [(3, 7)],
-            'w_king': [(4, 7)],
-
-            'b_pawn': [(i, 1) for i in range(8)],
-            'b_knight': [(1, 0), (6, 0)],
-            'b_bishop': [(2, 0), (5, 0)],
-            'b_rook': [(0, 0), (7, 0)],
-            'b_queen': [(3, 0)],
-            'b_king': [(4, 0)],
-        }
+        self.start_piece_pos = {piece_name: list(positions) for piece_name, positions in START_PIECE_POS.items()}
 
         self.wait_time = 1  # Wait time between switching main menu and chessboard (in seconds)
         self.button_font_size = 48  # Font size for buttons
         self.result_font_size = 35  # Font size for displaying results
 
         self.square_size = 80  # Size of each chessboard square
+        self.piece_size = 64  # Size of each piece image
         self.transparency = 164  # Transparency value for colors
 
         # Color definitions
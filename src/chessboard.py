@@ -1,42 +1,82 @@
 from chessConfiguration import Configuration
+from assets import get_assets
 from piece import Piece
-from audio import Audio
+from rules import Position
+from pgn import san_body, san_suffix
+from audio import get_audio
 import pygame
 
 
-class Chessboard:
-    def __init__(self):
-        self.config = Configuration()
-        self.audio = Audio()
-
-        self.board = [[None for _ in range(8)] for _ in range(8)]
-        self.setup_board()
-        self.turn = 'w'
+class Chessboard(Position):
+    piece_class = Piece
 
-    def setup_board(self):
+    def __init__(self, fen: str = None):
         """
-        Sets up the chessboard with the initial piece positions.
+        Initializes the chessboard at the start position, or from FEN.
+
+        Nothing is loaded from disk: piece images and sounds are only looked up when used.
+
+        Args:
+            fen (str): The position to set up instead of the start position.
         """
-        for piece_name, positions in self.config.start_piece_pos.items():
-            for position in positions:
-                piece = Piece(piece_name, position)
-                x, y = position
-                self.board[x][y] = piece
+        self.config = Configuration()
+        self.dirty_squares = set()  # Squares whose pixels no longer match the board
+        self.overlay_squares = set()  # Squares covered by a highlight until the next render
+        self.san_moves = []  # The moves played through the board, in SAN
+        super().__init__(fen)
 
     def move_piece(self, piece: Piece, new_position: tuple[int, int]):
         """
-        Moves a piece on the chessboard to a new position.
+        Moves a piece on the chessboard and marks both squares for redrawing.
 
         Args:
             piece (Piece): The piece to be moved.
             new_position (tuple[int, int]): The new position (x, y) of the piece.
         """
-        old_x, old_y = piece.position
-        new_x, new_y = new_position
+        self.dirty_squares.update((piece.position, new_position))
+        super().move_piece(piece, new_position)
+
+    def put_piece(self, position: tuple[int, int], piece: Piece):
+        """
+        Puts a piece on a square and marks the square for redrawing.
+
+        Args:
+            position (tuple[int, int]): The square to fill.
+            piece (Piece): The piece to put there, or None to empty the square.
+        """
+        self.dirty_squares.add(position)
+        super().put_piece(position, piece)
+
+    def get_square_rect(self, square: tuple[int, int]):
+        """
+        Returns the screen rectangle of a chessboard square.
+
+        Args:
+            square (tuple[int, int]): The (x, y) coordinates of the square.
+
+        Returns:
+            pygame.Rect: The square's area on the screen.
+        """
+        x, y = square
+        return pygame.Rect(x * self.config.square_size, y * self.config.square_size,
+                           self.config.square_size, self.config.square_size)
 
-        self.board[old_x][old_y] = None
-        self.board[new_x][new_y] = piece
-        piece.position = new_position
+    def draw_overlay(self, screen: pygame.Surface, square: tuple[int, int], color: tuple[int, int, int, int]):
+        """
+        Tints a square with a reused overlay surface until the next render.
+
+        Args:
+            screen (pygame.Surface): The game screen.
+            square (tuple[int, int]): The square to tint.
+            color (tuple[int, int, int, int]): The RGBA tint.
+
+        Returns:
+            pygame.Rect: The tinted area.
+        """
+        rect = self.get_square_rect(square)
+        screen.blit(get_assets().get_overlay(color), rect)
+        self.overlay_squares.add(square)
+        return rect
 
     def get_square_at_pixel(self, pixel_pos: tuple[float, float]):
         """
@@ -60,18 +100,11 @@ class Chessboard:
         Args:
             screen (pygame.Surface): The surface on which to draw the highlight.
             board: The chessboard configuration.
-            king (Piece): The king piece.
+            king (Piece): The king of the side to move.
 
         """
-        if king.is_in_check(board):
-            king_x, king_y = king.position
-            check_color_surface = self.config.get_square_color_surface()
-            check_color_surface.fill(self.config.check_color)
-            check_rect = pygame.Rect(
-                king_x * self.config.square_size, king_y * self.config.square_size, self.config.square_size,
-                self.config.square_size)
-            screen.blit(check_color_surface, check_rect)
-            pygame.display.update()
+        if self.get_status().check:
+            pygame.display.update(self.draw_overlay(screen, king.position, self.config.check_color))
 
     def highlight_squares(self, screen: pygame.Surface, piece: Piece):
         """
@@ -81,72 +114,99 @@ class Chessboard:
             screen (pygame.Surface): The surface on which to draw the highlights.
             piece (Piece): The selected piece.
         """
+        rects = []
         for pos in piece.possible_moves:
             x, y = pos
-            color_surface = self.config.get_square_color_surface()
-            color_surface.fill(self.config.red if self.board[x][y] is not None else self.config.blue)
-            rect = pygame.Rect(x * self.config.square_size, y * self.config.square_size,
-                               self.config.square_size, self.config.square_size)
-            screen.blit(color_surface, rect)
+            rects.append(self.draw_overlay(screen, pos, self.config.red if self.board[x][y] is not None else self.config.blue))
 
-        pygame.display.update()
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit(1)
+        pygame.display.update(rects)
 
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    return
-
-    def click_on_piece(self, screen: pygame.Surface):
+    def click_on_piece(self, screen: pygame.Surface, square: tuple[int, int]):
         """
-        Handles the user's click on a piece and triggers corresponding actions.
+        Selects the piece the player clicked if it belongs to the side to move, and highlights its moves.
 
         Args:
             screen (pygame.Surface): The game screen.
+            square (tuple[int, int]): The clicked square.
 
         Returns:
-            str or bool: The result of the game (win/lose/draw) or False if the game is ongoing.
+            Piece or None: The selected piece, or None if the click selects nothing.
         """
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit(1)
+        x, y = square
+        piece = self.board[x][y]
+        if piece is None or piece.piece_name[0] != self.turn:
+            return None
 
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    pressed_square = self.get_square_at_pixel(pygame.mouse.get_pos())
-                    x, y = pressed_square
-                    piece = self.board[x][y]
+        piece.update_possible_moves(self)
+        self.highlight_check(screen, self.board, self.get_king(self.turn))
+        self.highlight_squares(screen, piece)
+        return piece
 
-                    if piece and piece.piece_name[0] == self.turn:
-                        if piece.update_piece(screen, self):
-                            self.turn = 'w' if self.turn == 'b' else 'b'
-                            king = piece.get_piece(self.board, self.turn + '_king')
+    def click_on_target(self, screen: pygame.Surface, piece: Piece, square: tuple[int, int], promotion: str = 'queen'):
+        """
+        Moves the selected piece to the clicked square if it can go there, then redraws what changed.
 
-                            if king.is_in_check(self.board, False) and king.no_possible_legal_moves(self, self.turn):
-                                return f'{"Black" if self.turn == "w" else "White"} Wins by Checkmate'
+        Args:
+            screen (pygame.Surface): The game screen.
+            piece (Piece): The selected piece.
+            square (tuple[int, int]): The clicked square.
+            promotion (str): The piece a pawn reaching the last rank becomes.
 
-                            if king.no_possible_legal_moves(self, self.turn):
-                                return 'Draw by Stalemate'
-                            return False
+        Returns:
+            str or bool: The result of the game (win/lose/draw) or False if the game is ongoing or nothing moved.
+        """
+        # The same cached check update_piece makes, so a move that goes through always has its SAN
+        san = None
+        if square in self.get_cached_legal_moves().get(piece.position, ()):
+            san = san_body(self, piece.position, square, promotion if self.is_promotion(piece.position, square) else None)
+        moved = piece.update_piece(self, square, promotion)
+        self.render(screen)
+        if not moved:
+            return False
+
+        # One sweep of the new position's legal moves serves the status, then the next selection and move
+        self.get_cached_legal_moves()
+        status = self.get_status()
+        self.san_moves.append(san + san_suffix(self))
+        if status.check:
+            get_audio().play_check()
+        return status.result
 
     def display_board(self, screen: pygame.Surface):
         """
-        Displays the chessboard on the screen.
+        Displays the whole chessboard on the screen.
 
         Args:
             screen (pygame.Surface): The game screen.
         """
-        for x in range(8):
-            for y in range(8):
-                if (x + y) % 2 == 0:
-                    image = pygame.image.load(self.config.get_path('light_square')).convert_alpha()
-                else:
-                    image = pygame.image.load(self.config.get_path('dark_square')).convert_alpha()
-                screen.blit(image, (x * self.config.square_size, y * self.config.square_size))
-
-                piece = self.board[x][y]
-                if piece is not None:
-                    screen.blit(piece.image, piece.rect)
+        screen.blit(get_assets().board_background, (0, 0))
+        for piece in self.pieces['w'] | self.pieces['b']:
+            screen.blit(piece.image, piece.rect)
+        self.dirty_squares.clear()
+        self.overlay_squares.clear()
+
+    def render(self, screen: pygame.Surface):
+        """
+        Redraws only the squares that changed or carry a highlight, and pushes just those areas to the window.
+
+        Args:
+            screen (pygame.Surface): The game screen, showing the board as last drawn.
+
+        Returns:
+            list[pygame.Rect]: The areas that were redrawn.
+        """
+        background = get_assets().board_background
+        rects = []
+        for x, y in self.dirty_squares | self.overlay_squares:
+            rect = self.get_square_rect((x, y))
+            screen.blit(background, rect, rect)
+            piece = self.board[x][y]
+            if piece is not None:
+                screen.blit(piece.image, piece.rect)
+            rects.append(rect)
+
+        self.dirty_squares.clear()
+        self.overlay_squares.clear()
+        if rects:
+            pygame.display.update(rects)
+        return rects
@@ -0,0 +1,475 @@
+"""
+Alpha-beta search for computer opponents in Chess Without En Passant.
+
+Iterative deepening negamax with a quiescence search, move ordering by
+transposition-table move, MVV-LVA, killer moves and history, and a fixed-size
+replace-by-depth transposition table keyed by Position.hash. Searches run on
+top of Position.make_move/unmake_move and the legal move generator in rules.py,
+so they follow the same rules as the game, without en passant.
+"""
+from book import OpeningBook
+from rules import Position, PROMOTION_PIECES, encode_move, decode_move, other_color
+from tablebase import Tablebase
+from time import perf_counter
+
+MATE = 100000
+MATE_BOUND = MATE - 1000
+INFINITY = MATE + 1
+MAX_PLY = 64
+CHECK_INTERVAL = 512
+
+# Transposition table entry flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+PIECE_VALUES = {'pawn': 100, 'knight': 320, 'bishop': 330, 'rook': 500, 'queen': 900, 'king': 0}
+
+# Piece-square bonuses from white's side of the board, indexed [y][x] with y = 0 on black's back rank
+PIECE_SQUARE_TABLES = {
+    'pawn': [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [50, 50, 50, 50, 50, 50, 50, 50],
+        [10, 10, 20, 30, 30, 20, 10, 10],
+        [5, 5, 10, 25, 25, 10, 5, 5],
+        [0, 0, 0, 20, 20, 0, 0, 0],
+        [5, -5, -10, 0, 0, -10, -5, 5],
+        [5, 10, 10, -20, -20, 10, 10, 5],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    'knight': [
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+        [-40, -20, 0, 0, 0, 0, -20, -40],
+        [-30, 0, 10, 15, 15, 10, 0, -30],
+        [-30, 5, 15, 20, 20, 15, 5, -30],
+        [-30, 0, 15, 20, 20, 15, 0, -30],
+        [-30, 5, 10, 15, 15, 10, 5, -30],
+        [-40, -20, 0, 5, 5, 0, -20, -40],
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+    ],
+    'bishop': [
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 10, 10, 5, 0, -10],
+        [-10, 5, 5, 10, 10, 5, 5, -10],
+        [-10, 0, 10, 10, 10, 10, 0, -10],
+        [-10, 10, 10, 10, 10, 10, 10, -10],
+        [-10, 5, 0, 0, 0, 0, 5, -10],
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+    ],
+    'rook': [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 10, 10, 10, 10, 10, 10, 5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [0, 0, 0, 5, 5, 0, 0, 0],
+    ],
+    'queen': [
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 5, 5, 5, 0, -10],
+        [-5, 0, 5, 5, 5, 5, 0, -5],
+        [0, 0, 5, 5, 5, 5, 0, -5],
+        [-10, 5, 5, 5, 5, 5, 0, -10],
+        [-10, 0, 5, 0, 0, 0, 0, -10],
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+    ],
+    'king': [
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-20, -30, -30, -40, -40, -30, -30, -20],
+        [-10, -20, -20, -20, -20, -20, -20, -10],
+        [20, 20, 0, 0, 0, 0, 20, 20],
+        [20, 30, 10, 0, 0, 10, 30, 20],
+    ],
+}
+
+# Material plus placement for every piece name and square, from white's point of view
+SQUARE_VALUES = {}
+for _kind, _table in PIECE_SQUARE_TABLES.items():
+    SQUARE_VALUES['w_' + _kind] = [[PIECE_VALUES[_kind] + _table[y][x] for y in range(8)] for x in range(8)]
+    SQUARE_VALUES['b_' + _kind] = [[-(PIECE_VALUES[_kind] + _table[7 - y][x]) for y in range(8)] for x in range(8)]
+
+
+def evaluate(position: Position):
+    """
+    Scores a position statically from the side to move's point of view.
+
+    Args:
+        position (Position): The position to score.
+
+    Returns:
+        int: The score in centipawns.
+    """
+    score = 0
+    for x, column in enumerate(position.board):
+        for y, piece in enumerate(column):
+            if piece is not None:
+                score += SQUARE_VALUES[piece.piece_name][x][y]
+    return score if position.turn == 'w' else -score
+
+
+class TranspositionTable:
+    def __init__(self, size: int = 1 << 18):
+        """
+        Initializes a fixed-size transposition table.
+
+        Each slot holds one entry and a new entry only evicts an entry from the
+        current search when it was searched at least as deep.
+
+        Args:
+            size (int): The number of slots, rounded down to a power of two.
+        """
+        self.size = 1 << max(size.bit_length() - 1, 0)
+        self.mask = self.size - 1
+        self.keys = [0] * self.size
+        self.entries = [None] * self.size
+        self.age = 0
+
+    def new_search(self):
+        """
+        Marks existing entries as stale so that the next search may replace them freely.
+        """
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        """
+        Empties the table.
+        """
+        self.keys = [0] * self.size
+        self.entries = [None] * self.size
+
+    def probe(self, key: int):
+        """
+        Looks up the entry stored for a position key.
+
+        Args:
+            key (int): The position's Zobrist key.
+
+        Returns:
+            tuple: (depth, score, flag, move) or None when the position is not stored.
+        """
+        index = key & self.mask
+        if self.keys[index] == key:
+            return self.entries[index]
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int):
+        """
+        Stores a search result unless a deeper result from this search holds the slot.
+
+        Args:
+            key (int): The position's Zobrist key.
+            depth (int): The remaining depth the result was searched to.
+            score (int): The score, mate scores relative to this position.
+            flag (int): EXACT, LOWER or UPPER.
+            move (int): The best move as encoded by encode_move, or 0.
+        """
+        index = key & self.mask
+        old = self.entries[index]
+        if old is None or self.keys[index] == key or depth >= old[0] or old[4] != self.age:
+            self.keys[index] = key
+            self.entries[index] = (depth, score, flag, move, self.age)
+
+
+class SearchStopped(Exception):
+    pass
+
+
+class Engine:
+    def __init__(self, table: TranspositionTable = None, book: OpeningBook = None, tablebase: Tablebase = None):
+        """
+        Initializes an engine with its own transposition table and ordering heuristics.
+
+        Args:
+            table (TranspositionTable): The table to use, a new one by default.
+            book (OpeningBook): Book moves are played without searching while the game is in it.
+            tablebase (Tablebase): Endgames in its tables are played perfectly without searching.
+        """
+        self.table = table if table is not None else TranspositionTable()
+        self.book = book
+        self.tablebase = tablebase
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history = {}
+        self.nodes = 0
+        self.next_check = 0
+        self.depth = 0
+        self.score = 0
+        self.deadline = None
+        self.max_nodes = None
+        self.stop_event = None
+        self.path = []
+
+    def best_move(self, position: Position, max_time: float = None, max_nodes: int = None, max_depth: int = None):
+        """
+        Searches a position by iterative deepening within a time or node budget.
+
+        The result of the deepest completed iteration is returned, so a budget
+        bounds the CPU spent per move. Positions found in the engine's book or
+        tablebase are answered from them without searching. The position is
+        left unchanged.
+
+        Args:
+            position (Position): The position to search.
+            max_time (float): Seconds to search for, unlimited if None.
+            max_nodes (int): Nodes to search, unlimited if None.
+            max_depth (int): Deepest iteration, MAX_PLY if None.
+
+        Returns:
+            tuple: (start, end, promotion) of the best move, promotion None unless a pawn
+            promotes, or None when there is no legal move.
+        """
+        if self.book is not None:
+            move = self.book.choose_move(position)
+            if move is not None:
+                return move
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(position)
+            if move is not None:
+                return move
+        self.table.new_search()
+        return self.search(position, max_time, max_nodes, max_depth)
+
+    def search(self, position: Position, max_time: float = None, max_nodes: int = None, max_depth: int = None,
+               start_depth: int = 1, root_moves: list = None):
+        """
+        Runs the iterative deepening loop of best_move without starting a new table generation.
+
+        Args:
+            position (Position): The position to search.
+            max_time (float): Seconds to search for, unlimited if None.
+            max_nodes (int): Nodes to search, unlimited if None.
+            max_depth (int): Deepest iteration, MAX_PLY if None.
+            start_depth (int): The first iteration's depth.
+            root_moves (list[int]): Encoded root moves in the order to try them, all legal moves if None.
+
+        Returns:
+            tuple: (start, end, promotion) of the best move, or None when there is no legal move.
+        """
+        moves = list(root_moves) if root_moves is not None else self.generate_moves(position)
+        if not moves:
+            return None
+
+        self.deadline = perf_counter() + max_time if max_time is not None else None
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.next_check = 0
+        self.depth = 0
+        self.path = []
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+
+        best = moves[0]
+        for depth in range(start_depth, (max_depth or MAX_PLY) + 1):
+            try:
+                score, move = self._search_root(position, moves, depth)
+            except SearchStopped:
+                break
+            best, self.score, self.depth = move, score, depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) > MATE_BOUND:
+                break
+        return decode_move(best)
+
+    def generate_moves(self, position: Position, captures_only: bool = False):
+        """
+        Returns the encoded legal moves of the side to move, one per promotion piece.
+
+        Args:
+            position (Position): The position to generate for.
+            captures_only (bool): Keep only captures and promotions, for quiescence.
+
+        Returns:
+            list[int]: Moves encoded with encode_move.
+        """
+        board = position.board
+        moves = []
+        for start, ends in position.get_legal_moves_by_square().items():
+            pawn = board[start[0]][start[1]].piece_name[2:] == 'pawn'
+            for end in ends:
+                if pawn and end[1] in (0, 7):
+                    moves.extend(encode_move(start, end, promotion) for promotion in PROMOTION_PIECES)
+                elif not captures_only or board[end[0]][end[1]] is not None:
+                    moves.append(encode_move(start, end))
+        return moves
+
+    def _check_budget(self):
+        # The clock is read every CHECK_INTERVAL nodes, the node budget is exact
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchStopped
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise SearchStopped
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchStopped
+        self.next_check = self.nodes + CHECK_INTERVAL
+        if self.max_nodes is not None:
+            self.next_check = min(self.next_check, self.max_nodes)
+
+    def _order(self, position: Position, moves: list, tt_move: int, ply: int):
+        board = position.board
+        killers = self.killers[ply]
+        history = self.history
+
+        def score(move):
+            if move == tt_move:
+                return 1 << 30
+            start, end = move & 63, move >> 6 & 63
+            victim = board[end % 8][end // 8]
+            value = 0
+            if move >> 12:
+                value += 1 << 26
+            if victim is not None:
+                attacker = board[start % 8][start // 8]
+                return value + (1 << 27) + 10 * PIECE_VALUES[victim.piece_name[2:]] - PIECE_VALUES[attacker.piece_name[2:]]
+            if move == killers[0] or move == killers[1]:
+                return value + (1 << 25)
+            return value + history.get(move & 0xFFF, 0)
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def _make(self, position: Position, move: int):
+        start, end, promotion = decode_move(move)
+        position.make_move(start, end, promotion or 'queen')
+
+    def _in_check(self, position: Position):
+        king = position.get_king(position.turn)
+        return king is not None and position.is_square_attacked(king.position, other_color(position.turn))
+
+    def _search_root(self, position: Position, moves: list, depth: int):
+        alpha, beta = -INFINITY, INFINITY
+        best_move = moves[0]
+        self.path.append(position.hash)
+        try:
+            for move in moves:
+                self._make(position, move)
+                try:
+                    score = -self._negamax(position, depth - 1, -beta, -alpha, 1)
+                finally:
+                    position.unmake_move()
+                if score > alpha:
+                    alpha, best_move = score, move
+        finally:
+            self.path.pop()
+        self.table.store(position.hash, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int):
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self._check_budget()
+
+        key = position.hash
+        # Repeating a position on the search path is scored as a draw
+        if key in self.path:
+            return 0
+        if ply >= MAX_PLY:
+            return evaluate(position)
+
+        in_check = self._in_check(position)
+        if in_check:
+            depth += 1
+        if depth <= 0:
+            return self._quiescence(position, alpha, beta, ply)
+
+        original_alpha = alpha
+        tt_move = 0
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, entry_score, flag, tt_move = entry[:4]
+            if entry_depth >= depth:
+                if entry_score > MATE_BOUND:
+                    entry_score -= ply
+                elif entry_score < -MATE_BOUND:
+                    entry_score += ply
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        moves = self.generate_moves(position)
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        best_score, best_move = -INFINITY, 0
+        self.path.append(key)
+        try:
+            for move in self._order(position, moves, tt_move, ply):
+                self._make(position, move)
+                try:
+                    score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    position.unmake_move()
+                if score > best_score:
+                    best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                if alpha >= beta:
+                    end = move >> 6 & 63
+                    if position.board[end % 8][end // 8] is None:
+                        killers = self.killers[ply]
+                        if move != killers[0]:
+                            killers[1], killers[0] = killers[0], move
+                        self.history[move & 0xFFF] = self.history.get(move & 0xFFF, 0) + depth * depth
+                    break
+        finally:
+            self.path.pop()
+
+        flag = EXACT
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        stored = best_score
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        self.table.store(key, depth, stored, flag, best_move)
+        return best_score
+
+    def _quiescence(self, position: Position, alpha: int, beta: int, ply: int):
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self._check_budget()
+
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        for move in self._order(position, self.generate_moves(position, True), 0, ply):
+            self._make(position, move)
+            try:
+                score = -self._quiescence(position, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def best_move(position: Position, max_time: float = None, max_nodes: int = None, max_depth: int = None):
+    """
+    Searches a position with a fresh engine; see Engine.best_move.
+
+    Args:
+        position (Position): The position to search.
+        max_time (float): Seconds to search for, unlimited if None.
+        max_nodes (int): Nodes to search, unlimited if None.
+        max_depth (int): Deepest iteration, MAX_PLY if None.
+
+    Returns:
+        tuple: (start, end, promotion) of the best move, or None when there is no legal move.
+    """
+    if max_time is None and max_nodes is None and max_depth is None:
+        max_time = 1.0
+    return Engine().best_move(position, max_time, max_nodes, max_depth)
@@ -0,0 +1,151 @@
+"""
+FEN and EPD for Chess Without En Passant.
+
+Standard notation with one difference: there is no en passant, so the en
+passant field is always written as "-" and ignored when read. Castling rights
+correspond to on_starting_square flags, which Position sets from them.
+"""
+from zobrist import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+FEN_PIECES = {
+    'K': 'w_king', 'Q': 'w_queen', 'R': 'w_rook', 'B': 'w_bishop', 'N': 'w_knight', 'P': 'w_pawn',
+    'k': 'b_king', 'q': 'b_queen', 'r': 'b_rook', 'b': 'b_bishop', 'n': 'b_knight', 'p': 'b_pawn',
+}
+PIECE_LETTERS = {piece_name: letter for letter, piece_name in FEN_PIECES.items()}
+CASTLING_LETTERS = [('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE)]
+CASTLING_RIGHTS = dict(CASTLING_LETTERS)
+
+
+def parse_fen(fen: str):
+    """
+    Splits a FEN string into its parts.
+
+    The move counters may be left out, as in EPD, and default to 0 and 1.
+
+    Args:
+        fen (str): The FEN string.
+
+    Returns:
+        tuple: (pieces, turn, castling_rights, halfmove_clock, fullmove_number) where pieces
+        is a list of (piece_name, (x, y)) and castling_rights a zobrist castling mask.
+
+    Raises:
+        ValueError: If the string is not valid FEN.
+    """
+    fields = fen.split()
+    if len(fields) not in (4, 6):
+        raise ValueError(f'Invalid FEN: {fen!r}')
+    placement, turn, castling = fields[:3]
+
+    rows = placement.split('/')
+    if len(rows) != 8:
+        raise ValueError(f'Invalid FEN placement: {placement!r}')
+    pieces = []
+    for y, row in enumerate(rows):
+        x = 0
+        for char in row:
+            if char in '12345678':
+                x += int(char)
+            elif char in FEN_PIECES and x < 8:
+                pieces.append((FEN_PIECES[char], (x, y)))
+                x += 1
+            else:
+                raise ValueError(f'Invalid FEN placement: {placement!r}')
+        if x != 8:
+            raise ValueError(f'Invalid FEN placement: {placement!r}')
+
+    if turn not in ('w', 'b'):
+        raise ValueError(f'Invalid FEN side to move: {turn!r}')
+
+    rights = 0
+    if castling != '-':
+        for char in castling:
+            right = CASTLING_RIGHTS.get(char)
+            if right is None or rights & right:
+                raise ValueError(f'Invalid FEN castling rights: {castling!r}')
+            rights |= right
+
+    try:
+        halfmove_clock, fullmove_number = (int(fields[4]), int(fields[5])) if len(fields) == 6 else (0, 1)
+    except ValueError:
+        raise ValueError(f'Invalid FEN move counters: {fen!r}') from None
+    return pieces, turn, rights, halfmove_clock, fullmove_number
+
+
+def format_fen(board, turn: str, castling_rights: int, halfmove_clock: int = 0, fullmove_number: int = 1):
+    """
+    Writes a position as FEN.
+
+    Args:
+        board: The chessboard representation.
+        turn (str): The side to move.
+        castling_rights (int): A zobrist castling mask.
+        halfmove_clock (int): Plies since the last capture or pawn move.
+        fullmove_number (int): The number of the current move.
+
+    Returns:
+        str: The FEN string, with "-" for en passant.
+    """
+    rows = []
+    for y in range(8):
+        row = ''
+        empty = 0
+        for x in range(8):
+            piece = board[x][y]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += PIECE_LETTERS[piece.piece_name]
+        rows.append(row + (str(empty) if empty else ''))
+    castling = ''.join(letter for letter, right in CASTLING_LETTERS if castling_rights & right) or '-'
+    return f'{"/".join(rows)} {turn} {castling} - {halfmove_clock} {fullmove_number}'
+
+
+def parse_epd(line: str):
+    """
+    Splits an EPD line into its position and operations.
+
+    Args:
+        line (str): Four FEN fields followed by operations such as 'bm Qh5; id "mate";'.
+
+    Returns:
+        tuple[str, dict[str, str]]: The four position fields and the operations by opcode,
+        with quotes removed from their operands.
+
+    Raises:
+        ValueError: If the line has fewer than four fields.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f'Invalid EPD: {line!r}')
+    operations = {}
+    if len(fields) == 5:
+        for operation in fields[4].split(';'):
+            operation = operation.strip()
+            if operation:
+                opcode, _, operand = operation.partition(' ')
+                operations[opcode] = operand.strip().strip('"')
+    return ' '.join(fields[:4]), operations
+
+
+def format_epd(fen: str, operations: dict = None):
+    """
+    Writes an EPD line from a FEN string and operations.
+
+    Args:
+        fen (str): The position; move counters are dropped.
+        operations (dict[str, str]): Operands by opcode, quoted when they contain spaces.
+
+    Returns:
+        str: The EPD line.
+    """
+    line = ' '.join(fen.split()[:4])
+    for opcode, operand in (operations or {}).items():
+        operand = f'"{operand}"' if ' ' in str(operand) else operand
+        line += f' {opcode} {operand};'
+    return line
@@ -0,0 +1,298 @@
+"""
+Binary game records for Chess Without En Passant.
+
+A record file holds many games at two bytes per move, using encode_move from
+rules. All numbers are little-endian:
+
+    header   magic, version, game count and the offset of the index
+    games    per game: ply count, result, FEN length, the FEN (empty for the
+             standard start) padded to an even length, then the moves
+    index    one 8-byte offset per game, aligned to 8 bytes
+
+GameArchive memory-maps a file, so opening it costs nothing however many games
+it holds, and game i's moves are a view straight into the map. A GameCursor
+walks a game with make_move and unmake_move to reach any ply from the last one.
+"""
+from array import array
+from pgn import read_games
+from rules import Position, decode_move, encode_move, parse_move
+import mmap
+import struct
+import sys
+
+MAGIC = b'CWEPGAME'
+VERSION = 1
+HEADER = struct.Struct('<8sHH4xQQ')  # magic, version, reserved, game count, index offset
+GAME_HEADER = struct.Struct('<IBxH')  # plies, result, FEN length
+RESULTS = ['*', '1-0', '0-1', '1/2-1/2']
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class GameRecordWriter:
+    def __init__(self, path):
+        """
+        Initializes a writer that creates a record file.
+
+        The header is patched and the index written when the writer is closed.
+
+        Args:
+            path: The file to create.
+        """
+        self.file = open(path, 'wb')
+        self.offsets = array('Q')
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_game(self, moves, result: str = '*', fen: str = None):
+        """
+        Appends one game.
+
+        Args:
+            moves (Iterable[int]): The moves, encoded with encode_move.
+            result (str): The PGN result token.
+            fen (str): The starting position, or None for the standard start.
+        """
+        moves = array('H', moves)
+        fen = (fen or '').encode('ascii')
+        if not LITTLE_ENDIAN:
+            moves.byteswap()
+        self.offsets.append(self.file.tell())
+        self.file.write(GAME_HEADER.pack(len(moves), RESULTS.index(result), len(fen)))
+        self.file.write(fen + b'\0' * (len(fen) % 2))
+        self.file.write(moves.tobytes())
+
+    def close(self):
+        """
+        Writes the index, fills in the header and closes the file.
+        """
+        if self.file.closed:
+            return
+        self.file.write(b'\0' * (-self.file.tell() % 8))
+        index_offset = self.file.tell()
+        offsets = array('Q', self.offsets)
+        if not LITTLE_ENDIAN:
+            offsets.byteswap()
+        self.file.write(offsets.tobytes())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets), index_offset))
+        self.file.close()
+
+
+class GameArchive:
+    def __init__(self, path):
+        """
+        Opens a record file for reading by memory-mapping it.
+
+        Args:
+            path: The record file.
+
+        Raises:
+            ValueError: If the file is not a record file of a supported version.
+        """
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError(f'Not a game record file: {path}')
+        magic, version, _, self.game_count, index_offset = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'Not a game record file of version {VERSION}: {path}')
+        self.offsets = self._numbers(index_offset, self.game_count, 'Q')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.game_count
+
+    def _numbers(self, offset: int, count: int, typecode: str):
+        """
+        Views count numbers in the map without copying them, unless they need byte swapping.
+        """
+        numbers = self.view[offset:offset + count * struct.calcsize(typecode)].cast(typecode)
+        if not LITTLE_ENDIAN:
+            numbers = array(typecode, numbers)
+            numbers.byteswap()
+        return numbers
+
+    def _game_header(self, game: int):
+        if not 0 <= game < self.game_count:
+            raise IndexError(f'Game {game} out of range')
+        offset = self.offsets[game]
+        plies, result, fen_length = GAME_HEADER.unpack_from(self.map, offset)
+        return offset + GAME_HEADER.size, plies, result, fen_length
+
+    def moves(self, game: int):
+        """
+        Returns the encoded moves of a game.
+
+        Args:
+            game (int): The game index.
+
+        Returns:
+            memoryview: The moves as 16-bit integers, viewing the file directly.
+        """
+        offset, plies, _, fen_length = self._game_header(game)
+        return self._numbers(offset + fen_length + fen_length % 2, plies, 'H')
+
+    def move(self, game: int, ply: int):
+        """
+        Returns one move of a game.
+
+        Args:
+            game (int): The game index.
+            ply (int): The ply, counting from 0.
+
+        Returns:
+            tuple: (start, end, promotion) as returned by decode_move.
+        """
+        return decode_move(self.moves(game)[ply])
+
+    def result(self, game: int):
+        """
+        Returns the PGN result token of a game.
+        """
+        return RESULTS[self._game_header(game)[2]]
+
+    def fen(self, game: int):
+        """
+        Returns the starting position of a game, or None for the standard start.
+        """
+        offset, _, _, fen_length = self._game_header(game)
+        return bytes(self.view[offset:offset + fen_length]).decode('ascii') if fen_length else None
+
+    def cursor(self, game: int, position_class=Position):
+        """
+        Returns a cursor at the start of a game.
+
+        Args:
+            game (int): The game index.
+            position_class: Position or a subclass, such as Chessboard, to replay the game on.
+
+        Returns:
+            GameCursor: The cursor.
+        """
+        return GameCursor(self, game, position_class)
+
+    def position(self, game: int, ply: int, position_class=Position):
+        """
+        Replays a game up to a ply.
+
+        Args:
+            game (int): The game index.
+            ply (int): The number of moves to play.
+            position_class: Position or a subclass to replay the game on.
+
+        Returns:
+            Position: The position after ply moves.
+        """
+        cursor = self.cursor(game, position_class)
+        cursor.seek(ply)
+        return cursor.position
+
+    def close(self):
+        """
+        Releases the index and unmaps the file.
+
+        Raises:
+            BufferError: If views returned by moves are still in use.
+        """
+        self.offsets = None
+        self.view.release()
+        self.map.close()
+
+
+class GameCursor:
+    def __init__(self, archive: GameArchive, game: int, position_class=Position):
+        """
+        Initializes a cursor at ply 0 of a game.
+
+        Args:
+            archive (GameArchive): The archive holding the game.
+            game (int): The game index.
+            position_class: Position or a subclass to replay the game on.
+        """
+        # The moves are fetched from the archive on each seek, so a cursor holds no view of the map
+        self.archive = archive
+        self.game = game
+        self.plies = len(archive.moves(game))
+        self.position = position_class(archive.fen(game))
+        self.ply = 0
+
+    def __len__(self):
+        return self.plies
+
+    def seek(self, ply: int):
+        """
+        Moves to a ply by playing or taking back only the moves in between.
+
+        Args:
+            ply (int): The ply to move to, from 0 to the length of the game.
+
+        Returns:
+            Position: The position at that ply.
+
+        Raises:
+            IndexError: If the ply is outside the game.
+        """
+        if not 0 <= ply <= self.plies:
+            raise IndexError(f'Ply {ply} out of range')
+        while self.ply > ply:
+            self.position.unmake_move()
+            self.ply -= 1
+        moves = self.archive.moves(self.game) if self.ply < ply else ()
+        while self.ply < ply:
+            start, end, promotion = decode_move(moves[self.ply])
+            self.position.make_move(start, end, promotion or 'queen')
+            self.ply += 1
+        return self.position
+
+
+def convert_pgn(pgn_path, record_path, skip_invalid: bool = False):
+    """
+    Converts a PGN file to a record file, validating every move on the way.
+
+    Args:
+        pgn_path: The PGN file to read.
+        record_path: The record file to create.
+        skip_invalid (bool): Leave out games with an illegal move instead of raising.
+
+    Returns:
+        int: The number of games written.
+
+    Raises:
+        ValueError: If a game contains an illegal move and skip_invalid is False.
+    """
+    with open(pgn_path) as stream, GameRecordWriter(record_path) as writer:
+        for game in read_games(stream, skip_invalid):
+            result = game['result'] if game['result'] in RESULTS else '*'
+            writer.write_game((encode_move(*parse_move(move)) for move in game['moves']), result, game['tags'].get('FEN'))
+        return len(writer.offsets)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Convert PGN to binary game records for Chess Without En Passant')
+    parser.add_argument('pgn', help='PGN file to read')
+    parser.add_argument('output', help='record file to write')
+    parser.add_argument('--skip-invalid', action='store_true', help='leave out games with illegal moves')
+    args = parser.parse_args()
+
+    start_time = perf_counter()
+    games = convert_pgn(args.pgn, args.output, args.skip_invalid)
+    seconds = perf_counter() - start_time
+    print(f'{games} games in {seconds:.2f}s: {os.path.getsize(args.pgn):,} bytes of PGN, '
+          f'{os.path.getsize(args.output):,} bytes of records')
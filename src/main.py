@@ -1,24 +1,34 @@
 from chessConfiguration import Configuration
+from assets import get_assets
 from chessboard import Chessboard
-from audio import Audio
-from time import sleep
+from audio import get_audio
+from pgn import PGNWriter, result_token
+from datetime import date
 import pygame
+import sys
+
+# Posted once when the final position has been shown for wait_time seconds
+RESULT_SHOWN = pygame.USEREVENT + 1
 
 
 class Main:
     def __init__(self):
         pygame.init()
         self.WIDTH, self.HEIGHT = 640, 640
-        self.FPS = 1
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
-        self.clock = pygame.time.Clock()
 
         self.config = Configuration()
         self.chessboard = Chessboard()
-        self.audio = Audio()
-        self.game_started = False
+        self.audio = get_audio()
 
+        # Game states: 'menu' -> 'select' -> 'target' (-> 'promote') -> 'select' ... -> 'result' -> 'menu'
+        self.state = None
+        self.running = True
         self.result = ''
+        self.menu_buttons = {}
+        self.selected_piece = None
+        self.target_square = None
+        self.promotion_choices = []
 
         pygame.display.set_caption('Chess')
 
@@ -27,18 +37,18 @@ class Main:
         Resets the chessboard and game state.
         """
         self.chessboard = Chessboard()
-        self.game_started = False
+        self.selected_piece = None
+        self.target_square = None
+        self.promotion_choices = []
 
     def display_menu(self):
         """
         Displays the main menu screen.
         """
-        background = self.config.get_path('menu_bg')
-        background = pygame.transform.scale(pygame.image.load(background).convert_alpha(), (self.WIDTH, self.HEIGHT))
-        self.screen.blit(background, (0, 0))
+        assets = get_assets()
+        self.screen.blit(assets.get_menu_background((self.WIDTH, self.HEIGHT)), (0, 0))
 
-        font_path = self.config.get_path('font')
-        button_font = pygame.freetype.Font(font_path, self.config.button_font_size)
+        button_font = assets.get_font(self.config.button_font_size)
 
         play_text, play_text_rect = button_font.render('Play', self.config.white)
         play_text_rect.center = (self.WIDTH // 2, self.HEIGHT // 2)
@@ -48,7 +58,7 @@ class Main:
 
         self.screen.blit(play_text, play_text_rect)
         self.screen.blit(quit_text, quit_text_rect)
-        result_font = pygame.freetype.Font(font_path, self.config.result_font_size)
+        result_font = assets.get_font(self.config.result_font_size)
 
         if self.result:
             result_text, result_text_rect = result_font.render(self.result, self.config.white)
@@ -57,55 +67,120 @@ class Main:
 
         result_text_rect.midtop = (self.WIDTH // 2, self.HEIGHT // 4)
         self.screen.blit(result_text, result_text_rect)
-
-        if self.result:
-            sleep(self.config.wait_time)
         pygame.display.update()
 
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if play_text_rect.collidepoint(pygame.mouse.get_pos()):
-                        self.reset_game()
-                        return
-                    elif quit_text_rect.collidepoint(pygame.mouse.get_pos()):
-                        pygame.quit()
-                        exit(1)
-                elif event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit(1)
-
-    def update_display(self):
-        """
-        Updates the game display.
-        """
-        if not self.game_started:
-            self.audio.play_game()
-            self.display_menu()
-            self.game_started = True
+        self.menu_buttons = {'play': play_text_rect, 'quit': quit_text_rect}
 
+    def enter_menu(self):
+        """
+        Starts the game music and shows the main menu.
+        """
+        self.state = 'menu'
+        self.audio.play_game()
+        self.display_menu()
+
+    def start_board(self):
+        """
+        Starts a new game on a freshly drawn board.
+        """
+        self.reset_game()
+        self.state = 'select'
         self.chessboard.display_board(self.screen)
         pygame.display.flip()
-        self.clock.tick(self.FPS)
 
-        game_result = self.chessboard.click_on_piece(self.screen)
+    def finish_move(self, game_result):
+        """
+        Moves on after a move attempt: back to selecting a piece, or to showing the result.
+
+        Args:
+            game_result (str or bool): The result returned by the chessboard.
+        """
+        self.selected_piece = None
+        self.promotion_choices = []
         if game_result:
             self.result = game_result
-            self.chessboard.display_board(self.screen)
-            pygame.display.update()
-            self.game_started = False
+            self.save_game()
+            self.state = 'result'
+            pygame.time.set_timer(RESULT_SHOWN, self.config.wait_time * 1000, 1)
+        else:
+            self.state = 'select'
+
+    def save_game(self):
+        """
+        Appends the finished game to the PGN archive. A failed write is reported but does not end the game.
+        """
+        tags = {'Event': 'Chess Without En Passant', 'Date': date.today().strftime('%Y.%m.%d'), 'Termination': self.result}
+        path = self.config.get_path('games')
+        try:
+            with open(path, 'a') as stream:
+                PGNWriter(stream).write_game(self.chessboard.san_moves, result_token(self.result), tags)
+        except OSError as error:
+            print(f'Could not save the game to {path}: {error}', file=sys.stderr)
+
+    def handle_event(self, event: pygame.event.Event):
+        """
+        Advances the game state machine by one event.
+
+        Args:
+            event (pygame.event.Event): The event to handle.
+        """
+        if event.type == pygame.QUIT:
+            self.running = False
+            return
+
+        if event.type == RESULT_SHOWN and self.state == 'result':
+            self.enter_menu()
+            return
+
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return
+
+        if self.state == 'menu':
+            if self.menu_buttons['play'].collidepoint(event.pos):
+                self.start_board()
+            elif self.menu_buttons['quit'].collidepoint(event.pos):
+                self.running = False
+
+        elif self.state == 'select':
+            square = self.chessboard.get_square_at_pixel(event.pos)
+            self.selected_piece = self.chessboard.click_on_piece(self.screen, square)
+            if self.selected_piece is not None:
+                self.state = 'target'
+
+        elif self.state == 'target':
+            square = self.chessboard.get_square_at_pixel(event.pos)
+            if square in self.selected_piece.possible_moves and self.chessboard.is_promotion(self.selected_piece.position, square):
+                self.chessboard.render(self.screen)
+                self.target_square = square
+                self.promotion_choices = self.selected_piece.pawn_promotion(self.screen, square)
+                self.state = 'promote'
+            else:
+                self.finish_move(self.chessboard.click_on_target(self.screen, self.selected_piece, square))
+
+        elif self.state == 'promote':
+            for piece_name, rect in self.promotion_choices:
+                if rect.collidepoint(event.pos):
+                    # The choices were drawn over board squares, which need repainting
+                    for _, choice_rect in self.promotion_choices:
+                        self.chessboard.dirty_squares.add(self.chessboard.get_square_at_pixel(choice_rect.center))
+                    self.finish_move(self.chessboard.click_on_target(self.screen, self.selected_piece,
+                                                                     self.target_square, piece_name))
+                    break
 
     def start_game(self):
         """
-        Starts the chess game loop.
+        Runs the game until the window is closed.
+
+        A single loop sleeps in pygame.event.wait until there is input, so an idle game uses no CPU.
         """
-        while True:
+        self.enter_menu()
+        while self.running:
+            self.handle_event(pygame.event.wait())
             for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit(1)
-
-            self.update_display()
+                if not self.running:
+                    break
+                self.handle_event(event)
+        pygame.quit()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,233 @@
+"""
+Lazy SMP parallel search for Chess Without En Passant.
+
+Worker processes search the same position with their own Engine and share one
+transposition table that lives in a multiprocessing.shared_memory buffer, so
+no worker holds the GIL of another. Entries are written without locks: each
+slot stores its data word next to key XOR data, and a probe only accepts the
+slot when the two words still agree with the key, which rejects entries torn
+by a concurrent write. Helpers start at alternating depths and with rotated
+root moves so that they fill the table ahead of the main worker.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from engine import Engine, TranspositionTable
+from multiprocessing import shared_memory
+from rules import Position
+import multiprocessing
+import os
+
+# Data word layout: score (24 bits, biased) | move (16) | depth (8) | flag (8) | age (8)
+_SCORE_BIAS = 1 << 23
+_MASK_64 = (1 << 64) - 1
+
+
+def _pack(depth: int, score: int, flag: int, move: int, age: int):
+    return (score + _SCORE_BIAS) << 40 | move << 24 | depth << 16 | flag << 8 | age
+
+
+def _unpack(data: int):
+    return (data >> 16 & 0xFF, (data >> 40) - _SCORE_BIAS, data >> 8 & 0xFF, data >> 24 & 0xFFFF, data & 0xFF)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    def __init__(self, size: int = 1 << 20, name: str = None):
+        """
+        Creates a transposition table in shared memory, or attaches to an existing one.
+
+        Args:
+            size (int): The number of slots, rounded down to a power of two.
+            name (str): The shared memory block to attach to, a new block if None.
+        """
+        self.size = 1 << max(size.bit_length() - 1, 0)
+        self.mask = self.size - 1
+        self.age = 0
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=self.size * 16)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.words = self.memory.buf.cast('Q')
+        if self.owner:
+            self.clear()
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def clear(self):
+        """
+        Empties the table.
+        """
+        self.memory.buf[:self.size * 16] = bytes(self.size * 16)
+
+    def probe(self, key: int):
+        """
+        Looks up the entry stored for a position key.
+
+        Args:
+            key (int): The position's Zobrist key.
+
+        Returns:
+            tuple: (depth, score, flag, move, age) or None when the position is not stored.
+        """
+        index = (key & self.mask) << 1
+        data = self.words[index + 1]
+        if data and self.words[index] ^ data == key:
+            return _unpack(data)
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int):
+        """
+        Stores a search result unless a deeper result from this search holds the slot.
+
+        Args:
+            key (int): The position's Zobrist key.
+            depth (int): The remaining depth the result was searched to.
+            score (int): The score, mate scores relative to this position.
+            flag (int): EXACT, LOWER or UPPER.
+            move (int): The best move as encoded by encode_move, or 0.
+        """
+        index = (key & self.mask) << 1
+        old = self.words[index + 1]
+        if old and self.words[index] ^ old != key and (old >> 16 & 0xFF) > depth and (old & 0xFF) == self.age:
+            return
+        data = _pack(depth, score, flag, move, self.age)
+        self.words[index] = (key ^ data) & _MASK_64
+        self.words[index + 1] = data
+
+    def close(self):
+        """
+        Detaches from the shared memory, and frees it if this table created it.
+        """
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+# Per-process worker state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(table_name: str, table_size: int, stop_event):
+    table = SharedTranspositionTable(table_size, table_name)
+    engine = Engine(table)
+    engine.stop_event = stop_event
+    _worker['engine'] = engine
+
+
+def _search(position: Position, index: int, age: int, max_time: float, max_nodes: int, max_depth: int):
+    engine = _worker['engine']
+    engine.table.age = age
+    root_moves = engine.generate_moves(position)
+    if index and root_moves:
+        shift = index % len(root_moves)
+        root_moves = root_moves[shift:] + root_moves[:shift]
+    move = engine.search(position, max_time, max_nodes, max_depth, 1 + index % 2, root_moves)
+    return engine.depth, engine.score, move, engine.nodes
+
+
+class ParallelEngine:
+    def __init__(self, workers: int = None, table_size: int = 1 << 20):
+        """
+        Starts the worker processes and the shared transposition table.
+
+        Args:
+            workers (int): The number of processes searching each position, one per core if None.
+            table_size (int): The number of shared table slots, 16 bytes each.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.table = SharedTranspositionTable(table_size)
+        self.stop_event = multiprocessing.Event()
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.table.name, self.table.size, self.stop_event))
+        self.nodes = 0
+        self.depth = 0
+        self.score = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared table.
+        """
+        self.pool.shutdown()
+        self.table.close()
+
+    def best_move(self, position: Position, max_time: float = None, max_nodes: int = None, max_depth: int = None):
+        """
+        Searches a position on every worker and returns the move of the deepest completed search.
+
+        The search ends when the main worker finishes; the helpers are then stopped.
+
+        Args:
+            position (Position): The position to search, left unchanged.
+            max_time (float): Seconds to search for, unlimited if None.
+            max_nodes (int): Nodes to search across all workers, unlimited if None.
+            max_depth (int): Deepest iteration, MAX_PLY if None.
+
+        Returns:
+            tuple: (start, end, promotion) of the best move, or None when there is no legal move.
+        """
+        self.table.new_search()
+        self.stop_event.clear()
+        root = position.copy()
+        worker_nodes = max(max_nodes // self.workers, 1) if max_nodes is not None else None
+        futures = [self.pool.submit(_search, root, index, self.table.age, max_time, worker_nodes, max_depth)
+                   for index in range(self.workers)]
+        results = [futures[0].result()]
+        self.stop_event.set()
+        results += [future.result() for future in futures[1:]]
+
+        # The main worker wins ties
+        depth, score, move, _ = max(results, key=lambda result: result[0])
+        self.depth, self.score = depth, score
+        self.nodes = sum(result[3] for result in results)
+        return move
+
+
+def parallel_best_move(position: Position, workers: int = None, max_time: float = None, max_nodes: int = None,
+                       max_depth: int = None):
+    """
+    Searches a position with a temporary ParallelEngine; see ParallelEngine.best_move.
+
+    Args:
+        position (Position): The position to search.
+        workers (int): The number of processes, one per core if None.
+        max_time (float): Seconds to search for, unlimited if None.
+        max_nodes (int): Nodes to search across all workers, unlimited if None.
+        max_depth (int): Deepest iteration, MAX_PLY if None.
+
+    Returns:
+        tuple: (start, end, promotion) of the best move, or None when there is no legal move.
+    """
+    if max_time is None and max_nodes is None and max_depth is None:
+        max_time = 1.0
+    with ParallelEngine(workers) as engine:
+        return engine.best_move(position, max_time, max_nodes, max_depth)
+
+
+if __name__ == '__main__':
+    import argparse
+    from perft import PERFT_POSITIONS, build_position
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Parallel search benchmark for Chess Without En Passant')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='worker counts to compare')
+    parser.add_argument('--position', default='castling', choices=PERFT_POSITIONS)
+    parser.add_argument('--time', type=float, default=5.0, help='seconds per search')
+    parser.add_argument('--nodes', type=int, help='total node budget per search instead of a time limit')
+    args = parser.parse_args()
+
+    for worker_count in args.workers:
+        with ParallelEngine(worker_count) as parallel_engine:
+            start_time = perf_counter()
+            best = parallel_engine.best_move(build_position(PERFT_POSITIONS[args.position][0]),
+                                             None if args.nodes else args.time, args.nodes)
+            seconds = perf_counter() - start_time
+        print(f'{worker_count} workers: depth {parallel_engine.depth}, {parallel_engine.nodes} nodes '
+              f'({parallel_engine.nodes / max(seconds, 1e-9):,.0f} nodes/s), best {best}')
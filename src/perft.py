@@ -0,0 +1,187 @@
+"""
+Perft node counts for Chess Without En Passant.
+
+Counts the leaf nodes of the legal move tree to a fixed depth. Matching the
+reference counts below is the regression oracle for every move-generator
+backend, and nodes per second is their throughput benchmark.
+
+Usage (from the src directory):
+    python perft.py                       # check the corpus on both backends
+    python perft.py 4 --position castling --backend bitboard --divide
+    python perft.py 4 --bitboard-position # search a BitboardPosition directly
+"""
+from bitboard import BitboardPosition
+from rules import Position, PROMOTION_PIECES, MOVE_BACKENDS, get_move_backend, move_name, parse_move, set_move_backend
+from time import perf_counter
+import argparse
+
+# Positions reached from the start by coordinate moves, or given as FEN, with their node counts by depth.
+# Counts match standard chess with every en passant capture removed.
+PERFT_POSITIONS = {
+    'start': ('', [20, 400, 8902, 197281, 4865351]),
+    'castling': ('e2e4 e7e5 g1f3 b8c6 f1c4 f8c5 d2d3 g8f6 c1g5 d7d6 b1c3 c8g4 d1d2 d8d7', [44, 1896, 80731, 3427165]),
+    'no_en_passant': ('e2e4 a7a6 e4e5 d7d5', [30, 753, 23265, 605363]),
+    'promotion': ('h2h4 g7g5 h4g5 h7h6 g5h6 f8g7 h6h7 e7e6', [27, 761, 21862, 646262]),
+    'queen_raid': ('d2d4 e7e6 c2c4 f8b4 b1c3 d8g5 c1d2 g5e3', [28, 1208, 32386, 1340604]),
+    'mate_in_one': ('e2e4 f7f6 d2d4 g7g5', [37, 715, 26486, 563455]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2038, 97766, 4079596]),
+    'rook_endgame': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2810, 43087]),
+    'underpromotion': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9463, 422146]),
+    'discovered_check': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+}
+
+
+def build_position(moves: str = '', backend: str = 'list'):
+    """
+    Plays coordinate moves from the start position, or sets up a FEN position.
+
+    Args:
+        moves (str): Space separated moves such as 'e2e4 e7e5', or a FEN string.
+        backend (str): 'list' for a Position, 'bitboard' for a BitboardPosition.
+
+    Returns:
+        Position or BitboardPosition: The resulting position.
+    """
+    if '/' in moves:
+        position = Position.from_fen(moves)
+        moves = ''
+    else:
+        position = Position()
+    for move in moves.split():
+        start, end, promotion = parse_move(move)
+        position.play_move(start, end, promotion or 'queen')
+    if backend == 'bitboard':
+        return BitboardPosition.from_board(position.board, position.turn)
+    return position
+
+
+def _expand(position, start: tuple[int, int], end: tuple[int, int]):
+    # A promotion is four different moves
+    return PROMOTION_PIECES if position.is_promotion(start, end) else (None,)
+
+
+def perft(position, depth: int):
+    """
+    Counts the leaf nodes of the legal move tree.
+
+    Args:
+        position (Position or BitboardPosition): The root position, restored on return.
+        depth (int): The number of plies to search.
+
+    Returns:
+        int: The number of leaf nodes.
+    """
+    if depth == 0:
+        return 1
+
+    nodes = 0
+    for start, end in position.get_legal_moves():
+        for promotion in _expand(position, start, end):
+            if depth == 1:
+                nodes += 1
+                continue
+            position.make_move(start, end, promotion or 'queen')
+            nodes += perft(position, depth - 1)
+            position.unmake_move()
+    return nodes
+
+
+def divide(position, depth: int):
+    """
+    Counts the leaf nodes below each root move.
+
+    Args:
+        position (Position or BitboardPosition): The root position, restored on return.
+        depth (int): The number of plies to search, at least 1.
+
+    Returns:
+        dict[str, int]: Coordinate move name mapped to its node count.
+    """
+    counts = {}
+    for start, end in position.get_legal_moves():
+        for promotion in _expand(position, start, end):
+            position.make_move(start, end, promotion or 'queen')
+            counts[move_name(start, end, promotion)] = perft(position, depth - 1)
+            position.unmake_move()
+    return dict(sorted(counts.items()))
+
+
+def _check_corpus(label: str, backend: str, max_depth: int):
+    # Runs the corpus on positions built for one backend and prints their throughput
+    failures = []
+    nodes = 0
+    elapsed = 0.0
+    for name, (moves, counts) in PERFT_POSITIONS.items():
+        position = build_position(moves, backend)
+        for depth, expected in enumerate(counts[:max_depth], start=1):
+            start_time = perf_counter()
+            result = perft(position, depth)
+            elapsed += perf_counter() - start_time
+            nodes += result
+            if result != expected:
+                failures.append(f'{label} {name} depth {depth}: {result} != {expected}')
+    print(f'{label}: {nodes} nodes in {elapsed:.2f}s ({nodes / max(elapsed, 1e-9):,.0f} nodes/s)')
+    return failures
+
+
+def run_suite(max_depth: int = 3, backends=None):
+    """
+    Checks every corpus position against its reference counts.
+
+    Position is searched under each backend in turn, and the bitboard backend's
+    BitboardPosition is also searched on its own. The backend selected before
+    the call is restored afterwards.
+
+    Args:
+        max_depth (int): The deepest depth to check.
+        backends (list[str]): The backends to check, defaults to all of them.
+
+    Returns:
+        list[str]: A description of every mismatch, empty when all counts match.
+    """
+    failures = []
+    previous_backend = get_move_backend()
+    try:
+        for backend in backends or MOVE_BACKENDS:
+            set_move_backend(backend)
+            failures += _check_corpus(f'Position ({backend})', 'list', max_depth)
+            if backend == 'bitboard':
+                failures += _check_corpus('BitboardPosition', 'bitboard', max_depth)
+    finally:
+        set_move_backend(previous_backend)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Perft for Chess Without En Passant')
+    parser.add_argument('depth', type=int, nargs='?', help='search one position to this depth')
+    parser.add_argument('--position', default='start', choices=PERFT_POSITIONS, help='corpus position to search')
+    parser.add_argument('--backend', default='list', choices=MOVE_BACKENDS, help='move generator behind Position')
+    parser.add_argument('--bitboard-position', action='store_true', help='search a BitboardPosition instead of a Position')
+    parser.add_argument('--divide', action='store_true', help='print the node count of every root move')
+    parser.add_argument('--max-depth', type=int, default=3, help='deepest depth checked by the suite')
+    args = parser.parse_args()
+
+    if args.depth is None:
+        suite_failures = run_suite(args.max_depth)
+        print('\n'.join(suite_failures) or 'All perft counts match')
+        exit(1 if suite_failures else 0)
+
+    set_move_backend(args.backend)
+    root = build_position(PERFT_POSITIONS[args.position][0], 'bitboard' if args.bitboard_position else 'list')
+    start_time = perf_counter()
+    if args.divide:
+        root_counts = divide(root, args.depth)
+        for root_move, count in root_counts.items():
+            print(f'{root_move}: {count}')
+        total = sum(root_counts.values())
+    else:
+        total = perft(root, args.depth)
+    seconds = perf_counter() - start_time
+
+    reference = PERFT_POSITIONS[args.position][1]
+    expected_total = reference[args.depth - 1] if args.depth <= len(reference) else None
+    print(f'Nodes: {total} ({total / max(seconds, 1e-9):,.0f} nodes/s)')
+    if expected_total is not None and total != expected_total:
+        print(f'Expected {expected_total}')
+        exit(1)
@@ -0,0 +1,359 @@
+"""
+PGN for Chess Without En Passant.
+
+PGNWriter appends finished games to a stream one at a time, and read_games
+replays an archive game by game, holding only the game being read, so files
+of any size can be processed in constant memory. Every move read is checked
+against this variant's rules; an en passant capture is an illegal move here.
+"""
+from rules import Position, PROMOTION_PIECES, move_name, parse_square, square_name
+import re
+
+SAN_PIECES = {'king': 'K', 'queen': 'Q', 'rook': 'R', 'bishop': 'B', 'knight': 'N', 'pawn': ''}
+SAN_KINDS = {letter: kind for kind, letter in SAN_PIECES.items() if letter}
+RESULT_TOKENS = {'1-0', '0-1', '1/2-1/2', '*'}
+MAX_LINE_LENGTH = 80
+TAG_PAIR = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+TAG_ESCAPE = re.compile(r'\\(.)')
+
+
+def result_token(result):
+    """
+    Converts a game result from Position.get_result to a PGN result.
+
+    Args:
+        result (str or bool): The result string, or False for an unfinished game.
+
+    Returns:
+        str: '1-0', '0-1', '1/2-1/2' or '*'.
+    """
+    if not result:
+        return '*'
+    if result.startswith('White Wins'):
+        return '1-0'
+    if result.startswith('Black Wins'):
+        return '0-1'
+    return '1/2-1/2'
+
+
+def san_body(position: Position, start: tuple[int, int], end: tuple[int, int], promotion: str = None):
+    """
+    Writes a legal move in SAN without its check or mate suffix.
+
+    Args:
+        position (Position): The position before the move.
+        start (tuple[int, int]): The square of the piece to move.
+        end (tuple[int, int]): The destination square.
+        promotion (str): The promotion piece, if any.
+
+    Returns:
+        str: The move, e.g. 'Nbd2', 'exd5', 'e8=Q' or 'O-O'.
+    """
+    x, y = start
+    piece = position.board[x][y]
+    kind = piece.piece_name[2:]
+    capture = position.board[end[0]][end[1]] is not None
+
+    if kind == 'king' and abs(end[0] - x) == 2:
+        return 'O-O' if end[0] == 6 else 'O-O-O'
+
+    if kind == 'pawn':
+        san = (square_name(start)[0] + 'x' if capture else '') + square_name(end)
+        if promotion or position.is_promotion(start, end):
+            san += '=' + SAN_PIECES[promotion or 'queen']
+        return san
+
+    # Name the origin file, rank or square only as far as needed to tell twins apart
+    twins = [other for other, ends in position.get_cached_legal_moves().items()
+             if other != start and end in ends and position.board[other[0]][other[1]].piece_name == piece.piece_name]
+    origin = ''
+    if twins:
+        if all(other[0] != x for other in twins):
+            origin = square_name(start)[0]
+        elif all(other[1] != y for other in twins):
+            origin = square_name(start)[1]
+        else:
+            origin = square_name(start)
+    return SAN_PIECES[kind] + origin + ('x' if capture else '') + square_name(end)
+
+
+def san_suffix(position: Position):
+    """
+    Returns the SAN suffix for the position a move has just reached.
+
+    Args:
+        position (Position): The position after the move.
+
+    Returns:
+        str: '#' for mate, '+' for check, otherwise ''.
+    """
+    status = position.get_status()
+    if status.checkmate:
+        return '#'
+    return '+' if status.check else ''
+
+
+def move_to_san(position: Position, start: tuple[int, int], end: tuple[int, int], promotion: str = None):
+    """
+    Writes a legal move in SAN, including check and mate.
+
+    Args:
+        position (Position): The position before the move; it is left unchanged.
+        start (tuple[int, int]): The square of the piece to move.
+        end (tuple[int, int]): The destination square.
+        promotion (str): The promotion piece, if any.
+
+    Returns:
+        str: The move in SAN.
+    """
+    san = san_body(position, start, end, promotion)
+    position.make_move(start, end, promotion or 'queen')
+    san += san_suffix(position)
+    position.unmake_move()
+    return san
+
+
+def parse_san(position: Position, san: str):
+    """
+    Finds the legal move a SAN string stands for.
+
+    Args:
+        position (Position): The position to move in.
+        san (str): The move, with or without check, mate and annotation marks.
+
+    Returns:
+        tuple: (start, end, promotion) where promotion is None for ordinary moves.
+
+    Raises:
+        ValueError: If the move is malformed, illegal or ambiguous.
+    """
+    text = san.rstrip('+#!?')
+    legal = position.get_legal_moves_by_square()
+    board = position.board
+
+    if text in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        king = position.get_king(position.turn)
+        end = (6 if len(text) == 3 else 2, king.position[1])
+        if end in legal.get(king.position, ()) and abs(end[0] - king.position[0]) == 2:
+            return king.position, end, None
+        raise ValueError(f'Illegal move {san!r}')
+
+    promotion = None
+    if '=' in text:
+        text, letter = text.split('=', 1)
+        promotion = SAN_KINDS.get(letter)
+        if promotion not in PROMOTION_PIECES:
+            raise ValueError(f'Invalid promotion in {san!r}')
+
+    kind = 'pawn'
+    if text and text[0] in SAN_KINDS:
+        kind, text = SAN_KINDS[text[0]], text[1:]
+    text = text.replace('x', '')
+    try:
+        end = parse_square(text[-2:])
+    except ValueError:
+        raise ValueError(f'Invalid move {san!r}') from None
+    origin = text[:-2]
+
+    candidates = [start for start, ends in legal.items()
+                  if end in ends and board[start[0]][start[1]].piece_name[2:] == kind and _matches_origin(start, origin)]
+    if len(candidates) != 1:
+        raise ValueError(f'{"Ambiguous" if candidates else "Illegal"} move {san!r}')
+    start = candidates[0]
+    if position.is_promotion(start, end):
+        promotion = promotion or 'queen'
+    elif promotion:
+        raise ValueError(f'Illegal promotion {san!r}')
+    return start, end, promotion
+
+
+def _matches_origin(start: tuple[int, int], origin: str):
+    # origin is the file, rank or square a SAN move gives for its piece, or ''
+    name = square_name(start)
+    return name == origin if len(origin) == 2 else origin in name
+
+
+class PGNWriter:
+    def __init__(self, stream):
+        """
+        Initializes a writer that appends games to a text stream.
+
+        Args:
+            stream: A text file or other object with write and flush.
+        """
+        self.stream = stream
+
+    def write_game(self, san_moves: list, result: str = '*', tags: dict = None, first_move: int = 1,
+                   black_first: bool = False):
+        """
+        Writes one game and flushes it, so a game is never left half written.
+
+        Args:
+            san_moves (list[str]): The moves in SAN.
+            result (str): The PGN result token.
+            tags (dict[str, str]): Tag pairs; Seven Tag Roster values override its '?' defaults.
+            first_move (int): The move number of the first move.
+            black_first (bool): Whether black plays the first move.
+        """
+        header = {'Event': '?', 'Site': '?', 'Date': '????.??.??', 'Round': '?', 'White': '?', 'Black': '?', 'Result': result}
+        header.update((name, value) for name, value in (tags or {}).items() if name != 'Result')
+        for name, value in header.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+            self.stream.write(f'[{name} "{value}"]\n')
+        self.stream.write('\n')
+
+        tokens = []
+        number = first_move
+        for ply, san in enumerate(san_moves):
+            white = (ply % 2 == 0) != black_first
+            if white:
+                tokens.append(f'{number}.')
+            elif ply == 0:
+                tokens.append(f'{number}...')
+            tokens.append(san)
+            if not white:
+                number += 1
+        tokens.append(result)
+
+        line = ''
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > MAX_LINE_LENGTH:
+                self.stream.write(line + '\n')
+                line = token
+            else:
+                line = f'{line} {token}' if line else token
+        self.stream.write(line + '\n\n')
+        self.stream.flush()
+
+
+class _Tokenizer:
+    def __init__(self):
+        """
+        Splits movetext into tokens line by line, dropping comments, variations, NAGs and move numbers.
+
+        Brace comments and variations may span lines, so whether a line starts inside
+        one carries over from the previous line.
+        """
+        self.comment = False
+        self.depth = 0
+
+    @property
+    def nested(self):
+        return self.comment or self.depth > 0
+
+    def feed(self, line: str):
+        """
+        Tokenizes one stripped line of movetext.
+
+        Args:
+            line (str): The line.
+
+        Returns:
+            list[str]: The SAN moves and result tokens on it.
+        """
+        if not self.comment and line.startswith('%'):
+            return []
+        tokens = []
+        token = ''
+        for char in line:
+            if self.comment:
+                self.comment = char != '}'
+                continue
+            if char == '{':
+                self.comment = True
+            elif char == ';':
+                break
+            elif char == '(':
+                self.depth += 1
+            elif char == ')':
+                self.depth = max(self.depth - 1, 0)
+            elif self.depth == 0 and not char.isspace():
+                token += char
+                continue
+            if token:
+                tokens.append(token)
+                token = ''
+        if token and self.depth == 0:
+            tokens.append(token)
+        return [token for token in map(_strip_move_number, tokens) if token and not token.startswith('$')]
+
+
+def _strip_move_number(token: str):
+    # Move numbers may be glued to the move: '12.e4' or '12...e5'
+    return token.lstrip('0123456789').lstrip('.') if token[0].isdigit() and '.' in token else token
+
+
+def read_games(stream, skip_invalid: bool = False):
+    """
+    Reads games from a PGN stream one at a time, replaying and validating every move.
+
+    A game ends at its result token or where the next game's tags start. Neither
+    counts inside a comment or a variation.
+
+    Args:
+        stream: A text file or any iterable of lines.
+        skip_invalid (bool): Skip games with an illegal move instead of raising.
+
+    Yields:
+        dict: 'tags', 'moves' (coordinate names), 'result' (the PGN result token) and
+        'position' (the final Position) for each game.
+
+    Raises:
+        ValueError: If a game has an invalid FEN tag or an illegal move and skip_invalid is False.
+    """
+    tokenizer = _Tokenizer()
+    tags = {}
+    tokens = []
+    has_movetext = False
+    game_number = 0
+    for line in stream:
+        line = line.strip()
+        if line.startswith('[') and line.endswith(']') and not tokenizer.nested:
+            if has_movetext:
+                # A game without a result token ends where the next one's tags start
+                game_number += 1
+                game = _replay(tags, tokens, game_number, skip_invalid)
+                if game is not None:
+                    yield game
+                tags, tokens, has_movetext = {}, [], False
+            match = TAG_PAIR.fullmatch(line)
+            if match is not None:
+                tags[match.group(1)] = TAG_ESCAPE.sub(r'\1', match.group(2))
+            continue
+        if not line:
+            continue
+        has_movetext = True
+        for token in tokenizer.feed(line):
+            tokens.append(token)
+            if token in RESULT_TOKENS:
+                game_number += 1
+                game = _replay(tags, tokens, game_number, skip_invalid)
+                if game is not None:
+                    yield game
+                tags, tokens, has_movetext = {}, [], False
+
+    if tags or has_movetext:
+        game = _replay(tags, tokens, game_number + 1, skip_invalid)
+        if game is not None:
+            yield game
+
+
+def _replay(tags: dict, tokens: list, game_number: int, skip_invalid: bool):
+    position = None
+    moves = []
+    result = tags.get('Result', '*')
+    try:
+        position = Position.from_fen(tags['FEN']) if 'FEN' in tags else Position()
+        for token in tokens:
+            if token in RESULT_TOKENS:
+                result = token
+                break
+            start, end, promotion = parse_san(position, token)
+            position.make_move(start, end, promotion or 'queen')
+            moves.append(move_name(start, end, promotion))
+    except ValueError as error:
+        if skip_invalid:
+            return None
+        location = f'Game {game_number}, ply {len(moves) + 1}' if position is not None else f'Game {game_number}'
+        raise ValueError(f'{location}: {error}') from None
+    return {'tags': tags, 'moves': moves, 'result': result, 'position': position}
@@ -0,0 +1,1477 @@
+"""
+Pure-Python rules for Chess Without En Passant.
+
+Nothing in this module imports pygame, so positions can be built, searched and
+judged without a display, a mixer or any asset on disk. The pygame classes in
+piece.py and chessboard.py are thin rendering adapters on top of these ones.
+"""
+from bitboard import BitboardPosition
+from operator import attrgetter
+from fen import format_fen, parse_fen
+from zobrist import CASTLING_KEYS, PIECE_KEYS, TURN_KEY, castling_rights, compute_hash
+from zobrist import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+# Starting positions for each chess piece
+START_PIECE_POS = {
+    'w_pawn': [(i, 6) for i in range(8)],
+    'w_knight': [(1, 7), (6, 7)],
+    'w_bishop': [(2, 7), (5, 7)],
+    'w_rook': [(0, 7), (7, 7)],
+    'w_queen': [(3, 7)],
+    'w_king': [(4, 7)],
+
+    'b_pawn': [(i, 1) for i in range(8)],
+    'b_knight': [(1, 0), (6, 0)],
+    'b_bishop': [(2, 0), (5, 0)],
+    'b_rook': [(0, 0), (7, 0)],
+    'b_queen': [(3, 0)],
+    'b_king': [(4, 0)],
+}
+
+# The castling rights that keep a king or a corner rook on its starting square
+KING_CASTLING_RIGHTS = {'w': WHITE_KINGSIDE | WHITE_QUEENSIDE, 'b': BLACK_KINGSIDE | BLACK_QUEENSIDE}
+ROOK_CASTLING_RIGHTS = {(7, 7): WHITE_KINGSIDE, (0, 7): WHITE_QUEENSIDE, (7, 0): BLACK_KINGSIDE, (0, 0): BLACK_QUEENSIDE}
+
+PROMOTION_PIECES = ['queen', 'rook', 'bishop', 'knight']
+PROMOTION_LETTERS = {'queen': 'q', 'rook': 'r', 'bishop': 'b', 'knight': 'n'}
+
+# Plies without a capture or pawn move after which the game is drawn
+FIFTY_MOVE_PLIES = 100
+REPETITION_LIMIT = 3
+LEGAL_MOVE_CACHE_SIZE = 16  # Positions whose legal moves a Position remembers, see get_cached_legal_moves
+
+# Move generators that can back RulesPiece and Position; see set_move_backend
+MOVE_BACKENDS = ['list', 'bitboard']
+move_backend = 'list'
+
+
+def other_color(color: str):
+    """
+    Returns the colour that moves after the given one.
+
+    Args:
+        color (str): 'w' or 'b'.
+
+    Returns:
+        str: The opposite colour.
+    """
+    return 'b' if color == 'w' else 'w'
+
+
+def square_name(position: tuple[int, int]):
+    """
+    Returns the algebraic name of a square, e.g. (4, 6) -> 'e2'.
+
+    Args:
+        position (tuple[int, int]): The (x, y) square.
+
+    Returns:
+        str: The square name.
+    """
+    x, y = position
+    return 'abcdefgh'[x] + str(8 - y)
+
+
+def parse_square(name: str):
+    """
+    Returns the (x, y) square for an algebraic name, e.g. 'e2' -> (4, 6).
+
+    Args:
+        name (str): The square name.
+
+    Returns:
+        tuple[int, int]: The (x, y) square.
+
+    Raises:
+        ValueError: If the name is not a square.
+    """
+    if len(name) != 2 or name[0] not in 'abcdefgh' or name[1] not in '12345678':
+        raise ValueError(f'Invalid square {name!r}')
+    return 'abcdefgh'.index(name[0]), 8 - int(name[1])
+
+
+def move_name(start: tuple[int, int], end: tuple[int, int], promotion: str = None):
+    """
+    Returns the coordinate notation of a move, e.g. 'e2e4' or 'e7e8q'.
+
+    Args:
+        start (tuple[int, int]): The square of the piece to move.
+        end (tuple[int, int]): The destination square.
+        promotion (str): The promotion piece, if any.
+
+    Returns:
+        str: The move name.
+    """
+    return square_name(start) + square_name(end) + (PROMOTION_LETTERS[promotion] if promotion else '')
+
+
+def parse_move(name: str):
+    """
+    Parses coordinate notation such as 'e2e4' or 'e7e8q'.
+
+    Args:
+        name (str): The move name.
+
+    Returns:
+        tuple: (start, end, promotion) where promotion is None unless given.
+
+    Raises:
+        ValueError: If the name is not a move.
+    """
+    promotion = None
+    if len(name) == 5:
+        promotion = {letter: piece for piece, letter in PROMOTION_LETTERS.items()}.get(name[4])
+        if promotion is None:
+            raise ValueError(f'Invalid promotion in {name!r}')
+    elif len(name) != 4:
+        raise ValueError(f'Invalid move {name!r}')
+    return parse_square(name[:2]), parse_square(name[2:4]), promotion
+
+
+def encode_move(start: tuple[int, int], end: tuple[int, int], promotion: str = None):
+    """
+    Packs a move into 16 bits: 6 for each square and 3 for the promotion piece.
+
+    Args:
+        start (tuple[int, int]): The square of the piece to move.
+        end (tuple[int, int]): The destination square.
+        promotion (str): The promotion piece, if any.
+
+    Returns:
+        int: The encoded move, never 0 for a real move.
+    """
+    code = PROMOTION_PIECES.index(promotion) + 1 if promotion else 0
+    return (start[1] * 8 + start[0]) | (end[1] * 8 + end[0]) << 6 | code << 12
+
+
+def decode_move(code: int):
+    """
+    Unpacks a move made by encode_move.
+
+    Args:
+        code (int): The encoded move.
+
+    Returns:
+        tuple: (start, end, promotion) where promotion is None for ordinary moves.
+    """
+    start, end, promotion = code & 63, code >> 6 & 63, code >> 12 & 7
+    return (start % 8, start // 8), (end % 8, end // 8), PROMOTION_PIECES[promotion - 1] if promotion else None
+
+
+def set_move_backend(backend: str):
+    """
+    Selects the move generator used by RulesPiece and Position.
+
+    'list' walks ``board[x][y]`` square by square, 'bitboard' converts the board
+    to a BitboardPosition and uses its precomputed attack tables. A Position keeps
+    its bitboards current move by move, so neither its whole-side queries nor
+    RulesPiece queries on its grid convert the board; only bare grids are converted.
+
+    Args:
+        backend (str): One of MOVE_BACKENDS.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    global move_backend
+    if backend not in MOVE_BACKENDS:
+        raise ValueError(f'Unknown move backend {backend!r}')
+    move_backend = backend
+
+
+def get_move_backend():
+    """
+    Returns the move generator selected with set_move_backend.
+
+    Returns:
+        str: One of MOVE_BACKENDS.
+    """
+    return move_backend
+
+
+KNIGHT_OFFSETS = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+KING_OFFSETS = [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1) if x or y]
+LINEAR_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIAGONAL_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+def is_square_attacked(board, square: tuple[int, int], by_color: str):
+    """
+    Checks whether any piece of the given colour attacks a square.
+
+    Rather than generating every enemy move, this looks outward from the square:
+    knight hops, pawn diagonals, king adjacency and the first piece on each ray.
+
+    Args:
+        board: The chessboard representation.
+        square (tuple[int, int]): The (x, y) square to test.
+        by_color (str): The attacking colour.
+
+    Returns:
+        bool: True if the square is attacked, False otherwise.
+    """
+    x, y = square
+    knight, king, pawn = by_color + '_knight', by_color + '_king', by_color + '_pawn'
+    rook, bishop, queen = by_color + '_rook', by_color + '_bishop', by_color + '_queen'
+
+    for dx, dy in KNIGHT_OFFSETS:
+        if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+            piece = board[x + dx][y + dy]
+            if piece is not None and piece.piece_name == knight:
+                return True
+    for dx, dy in KING_OFFSETS:
+        if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+            piece = board[x + dx][y + dy]
+            if piece is not None and piece.piece_name == king:
+                return True
+
+    # A pawn captures towards the enemy and only from ranks 1-6
+    pawn_y = y + 1 if by_color == 'w' else y - 1
+    if 0 < pawn_y < 7:
+        for pawn_x in (x - 1, x + 1):
+            if 0 <= pawn_x <= 7:
+                piece = board[pawn_x][pawn_y]
+                if piece is not None and piece.piece_name == pawn:
+                    return True
+
+    for directions, sliders in ((LINEAR_DIRECTIONS, (rook, queen)), (DIAGONAL_DIRECTIONS, (bishop, queen))):
+        for dx, dy in directions:
+            coord_x, coord_y = x + dx, y + dy
+            while 0 <= coord_x <= 7 and 0 <= coord_y <= 7:
+                piece = board[coord_x][coord_y]
+                if piece is not None:
+                    if piece.piece_name in sliders:
+                        return True
+                    break
+                coord_x += dx
+                coord_y += dy
+    return False
+
+
+def attacked_squares(board, piece_name: str, square: tuple[int, int]):
+    """
+    Returns every square a piece attacks from the given square.
+
+    Unlike the move generators this ignores the colour of the piece on a target
+    square and counts pawn diagonals whether or not there is anything to capture.
+
+    Args:
+        board: The chessboard representation.
+        piece_name (str): The name of the attacking piece.
+        square (tuple[int, int]): The (x, y) square it stands on.
+
+    Returns:
+        list[tuple[int, int]]: The attacked squares.
+    """
+    x, y = square
+    kind = piece_name[2:]
+    squares = []
+    if kind == 'pawn':
+        forward = y + (1 if piece_name[0] == 'b' else -1)
+        if 0 < y < 7:
+            squares.extend((pawn_x, forward) for pawn_x in (x - 1, x + 1) if 0 <= pawn_x <= 7)
+        return squares
+    if kind == 'knight' or kind == 'king':
+        for dx, dy in (KNIGHT_OFFSETS if kind == 'knight' else KING_OFFSETS):
+            if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+                squares.append((x + dx, y + dy))
+        return squares
+
+    directions = []
+    if kind == 'rook' or kind == 'queen':
+        directions += LINEAR_DIRECTIONS
+    if kind == 'bishop' or kind == 'queen':
+        directions += DIAGONAL_DIRECTIONS
+    for dx, dy in directions:
+        coord_x, coord_y = x + dx, y + dy
+        while 0 <= coord_x <= 7 and 0 <= coord_y <= 7:
+            squares.append((coord_x, coord_y))
+            if board[coord_x][coord_y] is not None:
+                break
+            coord_x += dx
+            coord_y += dy
+    return squares
+
+
+class AttackMap:
+    def __init__(self, board):
+        """
+        Builds the per-colour attack map of a board.
+
+        For every square the map keeps the set of pieces attacking it, so a check
+        test is a single lookup. Position keeps it current through move_piece and
+        promote, which only re-scan the moved piece and the sliders whose rays ran
+        through the squares that changed.
+
+        Args:
+            board: The chessboard representation.
+        """
+        self.board = board
+        self.attackers = {color: [[set() for _ in range(8)] for _ in range(8)] for color in 'wb'}
+        self.attacks = {}
+
+        for x in range(8):
+            for y in range(8):
+                if board[x][y] is not None:
+                    self.add_piece(board[x][y], (x, y))
+
+    def is_attacked(self, square: tuple[int, int], by_color: str):
+        """
+        Checks whether any piece of the given colour attacks a square.
+
+        Args:
+            square (tuple[int, int]): The (x, y) square to test.
+            by_color (str): The attacking colour.
+
+        Returns:
+            bool: True if the square is attacked, False otherwise.
+        """
+        x, y = square
+        return bool(self.attackers[by_color][x][y])
+
+    def add_piece(self, piece: 'RulesPiece', square: tuple[int, int]):
+        """
+        Records the squares attacked by a piece standing on the given square.
+
+        Args:
+            piece (RulesPiece): The piece.
+            square (tuple[int, int]): The square it stands on.
+        """
+        squares = attacked_squares(self.board, piece.piece_name, square)
+        self.attacks[piece] = squares
+        grid = self.attackers[piece.piece_name[0]]
+        for x, y in squares:
+            grid[x][y].add(piece)
+
+    def remove_piece(self, piece: 'RulesPiece'):
+        """
+        Forgets the squares attacked by a piece that left the board or is about to move.
+
+        Args:
+            piece (RulesPiece): The piece.
+        """
+        squares = self.attacks.pop(piece, None)
+        if squares is None:
+            return
+        grid = self.attackers[piece.piece_name[0]]
+        for x, y in squares:
+            grid[x][y].discard(piece)
+
+    def sliders_through(self, squares):
+        """
+        Returns the sliding pieces whose rays currently reach any of the given squares.
+
+        Args:
+            squares (list[tuple[int, int]]): The squares whose occupancy is changing.
+
+        Returns:
+            set: The affected rooks, bishops and queens.
+        """
+        sliders = set()
+        for x, y in squares:
+            for color in 'wb':
+                for piece in self.attackers[color][x][y]:
+                    if piece.piece_name[2:] in ('rook', 'bishop', 'queen'):
+                        sliders.add(piece)
+        return sliders
+
+    def refresh(self, pieces):
+        """
+        Re-scans the attacks of pieces whose rays may have changed.
+
+        Args:
+            pieces (set): The pieces to re-scan.
+        """
+        for piece in pieces:
+            self.remove_piece(piece)
+            self.add_piece(piece, piece.position)
+
+
+class Board(list):
+    __slots__ = ('owner',)
+
+    def __init__(self, columns, owner: 'Position' = None):
+        """
+        Wraps the ``board[x][y]`` columns of a Position.
+
+        It is still a plain list of columns, but RulesPiece methods that are only
+        handed the grid can reach the position that keeps it, and with it the
+        bitboards and attack map the position updates move by move.
+
+        Args:
+            columns (list): The eight columns of pieces or None.
+            owner (Position): The position the grid belongs to.
+        """
+        super().__init__(columns)
+        self.owner = owner
+
+
+def board_bitboard(board):
+    """
+    Returns the bitboards for a board grid.
+
+    Args:
+        board: The chessboard representation.
+
+    Returns:
+        BitboardPosition: The bitboards a Position keeps current for its own grid,
+        or a fresh conversion of a bare grid.
+    """
+    owner = getattr(board, 'owner', None)
+    return owner.bitboard if owner is not None else BitboardPosition.from_board(board)
+
+
+def board_is_attacked(board, square: tuple[int, int], by_color: str):
+    """
+    Checks whether any piece of the given colour attacks a square of a board grid.
+
+    Args:
+        board: The chessboard representation.
+        square (tuple[int, int]): The (x, y) square to test.
+        by_color (str): The attacking colour.
+
+    Returns:
+        bool: True if the square is attacked. A Position's own grid answers from its
+        attack map in one lookup, a bare grid with is_square_attacked.
+    """
+    owner = getattr(board, 'owner', None)
+    if owner is not None:
+        return owner.attack_map.is_attacked(square, by_color)
+    return is_square_attacked(board, square, by_color)
+
+
+class RulesPiece:
+    __slots__ = ('piece_name', 'on_starting_square', 'position', 'possible_moves')
+
+    def __init__(self, piece_name: str, position: tuple[int, int]):
+        """
+        Initializes a chess piece with its name and position on the board.
+
+        Args:
+            piece_name (str): The name of the chess piece.
+            position (tuple[int, int]): The position of the chess piece on the board.
+        """
+        self.piece_name = piece_name
+        self.on_starting_square = True
+        self.position = position
+        self.possible_moves = frozenset()
+
+    def get_piece(self, board, piece_name: str):
+        """
+        Returns the chess piece with the given name from the board.
+
+        Args:
+            board: The current chessboard.
+            piece_name (str): The name of the chess piece to find.
+
+        Returns:
+            The chess piece with the given name if found, None otherwise.
+        """
+        for x in range(8):
+            for y in range(8):
+                if board[x][y] is not None and board[x][y].piece_name == piece_name:
+                    return board[x][y]
+
+        return None
+
+    def get_piece_at(self, board, x: int, y: int):
+        """
+        Returns the chess piece at the given position on the board.
+
+        Args:
+            board: The current chessboard.
+            x (int): The x-coordinate of the position.
+            y (int): The y-coordinate of the position.
+
+        Returns:
+            The chess piece at the given position if present, None otherwise.
+        """
+        return board[x][y]
+
+    def enemy_piece_controls(self, board, x: int, y: int):
+        """
+        Checks if there is an enemy piece that controls the given position on the board.
+
+        Args:
+            board: The current chessboard.
+            x (int): The x-coordinate of the position.
+            y (int): The y-coordinate of the position.
+
+        Returns:
+            True if there is an enemy piece controlling the position, False otherwise.
+        """
+        return board_is_attacked(board, (x, y), other_color(self.piece_name[0]))
+
+    def get_diagonal_moves(self, board, position: tuple[int, int]):
+        """
+        Calculates the possible diagonal moves for a given position on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+            position: The current position of the piece.
+
+        Returns:
+            A set of possible diagonal moves.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_diagonal_moves(position, self.piece_name[0])
+
+        possible_moves = set()
+        directions = [-1, 1]
+
+        for x in directions:
+            for y in directions:
+                coord_x, coord_y = position
+                while 0 <= coord_x + x <= 7 and 0 <= coord_y + y <= 7:
+                    coord_x += x
+                    coord_y += y
+                    if board[coord_x][coord_y] is not None:
+                        if board[coord_x][coord_y].piece_name[0] != self.piece_name[0]:
+                            possible_moves.add((coord_x, coord_y))
+                        break
+                    possible_moves.add((coord_x, coord_y))
+
+        return possible_moves
+
+    def get_linear_moves(self, board, position: tuple[int, int]):
+        """
+        Calculates the possible linear (horizontal and vertical) moves for a given position on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+            position: The current position of the piece.
+
+        Returns:
+            A set of possible linear moves.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_linear_moves(position, self.piece_name[0])
+
+        possible_moves = set()
+        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+        for x, y in directions:
+            coord_x, coord_y = position
+            while 0 <= coord_x + x <= 7 and 0 <= coord_y + y <= 7:
+                coord_x += x
+                coord_y += y
+                if board[coord_x][coord_y] is not None:
+                    if board[coord_x][coord_y].piece_name[0] != self.piece_name[0]:
+                        possible_moves.add((coord_x, coord_y))
+                    break
+                possible_moves.add((coord_x, coord_y))
+
+        return possible_moves
+
+    def get_knight_moves(self, board, position: tuple[int, int]):
+        """
+        Calculates the possible knight moves for a given position on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+            position: The current position of the piece.
+
+        Returns:
+            A set of possible knight moves.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_knight_moves(position, self.piece_name[0])
+
+        possible_moves = set()
+        directions = [(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)]
+        pos_x, pos_y = position
+
+        for x, y in directions:
+            new_x = pos_x + x
+            new_y = pos_y + y
+
+            if 0 <= new_x <= 7 and 0 <= new_y <= 7:
+                if board[new_x][new_y] is not None:
+                    if board[new_x][new_y].piece_name[0] != self.piece_name[0]:
+                        possible_moves.add((new_x, new_y))
+                else:
+                    possible_moves.add((new_x, new_y))
+
+        return possible_moves
+
+    def get_pawn_moves(self, board, position: tuple[int, int]):
+        """
+        Calculates the possible moves for a pawn at a given position on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+            position: The current position of the pawn.
+
+        Returns:
+            A set of possible pawn moves.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_pawn_moves(position, self.piece_name[0], self.on_starting_square)
+
+        possible_moves = set()
+        directions = [1, 2] if self.piece_name[0] == 'b' else [-1, -2]
+        x, y = position
+        val = 1 if self.piece_name[0] == 'b' else -1
+
+        if 0 < y < 7:
+            if x < 7:
+                if board[x + 1][y + val] is not None:
+                    if board[x + 1][y + val].piece_name[0] != self.piece_name[0]:
+                        possible_moves.add((x + 1, y + val))
+            if x > 0:
+                if board[x - 1][y + val] is not None:
+                    if board[x - 1][y + val].piece_name[0] != self.piece_name[0]:
+                        possible_moves.add((x - 1, y + val))
+
+        for move_number in range(2 if self.on_starting_square else 1):
+            if 0 <= y + directions[move_number] <= 7 and not board[x][y + directions[move_number]]:
+                possible_moves.add((x, y + directions[move_number]))
+            else:
+                break
+
+        return possible_moves
+
+    def get_king_moves(self, board, position: tuple[int, int]):
+        """
+        Calculates the possible moves for a king at a given position on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+            position: The current position of the king.
+
+        Returns:
+            A set of possible king moves.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_king_moves(position, self.piece_name[0])
+
+        possible_moves = set()
+        directions = [-1, 0, 1]
+        pos_x, pos_y = position
+
+        for x in directions:
+            for y in directions:
+                if x == y == 0:
+                    continue
+                if 0 <= pos_x + x <= 7 and 0 <= pos_y + y <= 7:
+                    if not (board[pos_x + x][pos_y + y] is not None and board[pos_x + x][pos_y + y].piece_name[0] == self.piece_name[0]):
+                        possible_moves.add((pos_x + x, pos_y + y))
+
+        return possible_moves
+
+    def get_possible_moves(self, board):
+        """
+        Calculates the possible moves for a piece on the chessboard.
+
+        Args:
+            board: The chessboard representation.
+
+        Returns:
+            A set of possible moves for the piece.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_possible_moves(self.position, self.piece_name, self.on_starting_square)
+
+        possible_moves = set()
+        piece_name = self.piece_name.split('_')[-1]
+
+        if piece_name == 'rook' or piece_name == 'queen':
+            possible_moves |= self.get_linear_moves(board, self.position)
+        if piece_name == 'bishop' or piece_name == 'queen':
+            possible_moves |= self.get_diagonal_moves(board, self.position)
+        if piece_name == 'knight':
+            possible_moves |= self.get_knight_moves(board, self.position)
+        if piece_name == 'pawn':
+            possible_moves |= self.get_pawn_moves(board, self.position)
+        if piece_name == 'king':
+            possible_moves |= self.get_king_moves(board, self.position)
+
+        return possible_moves
+
+    def is_in_check(self, board):
+        """
+        Checks if the piece is currently in check.
+
+        Args:
+            board (list): The current chessboard state.
+
+        Returns:
+            bool: True if the piece is in check, False otherwise.
+        """
+        return board_is_attacked(board, self.position, other_color(self.piece_name[0]))
+
+    def no_possible_legal_moves(self, position, turn: str):
+        """
+        Checks if the current player has any legal moves.
+
+        Args:
+            position (Position): The position object.
+            turn (str): The current player's turn.
+
+        Returns:
+            bool: True if the current player has no legal moves, False otherwise.
+        """
+        return not position.has_any_legal_move(turn)
+
+    def get_castling_moves(self, board):
+        """
+        Get the castling moves available for the king.
+
+        Args:
+            board (list): The current chessboard state.
+
+        Returns:
+            set: A set of castling moves (tuples) available for the king.
+        """
+        if move_backend == 'bitboard':
+            return board_bitboard(board).get_castling_moves(self.piece_name[0])
+
+        castling_moves = set()
+        piece_color = self.piece_name[0]
+        x1, x2, y = 0, 7, 0 if piece_color == 'b' else 7
+
+        if not self.is_in_check(board):
+            if self.on_starting_square and board[x1][y]:
+                if board[x1][y].piece_name == piece_color + '_rook' and board[x1][y].on_starting_square:
+                    if board[x1 + 1][y] is None and board[x1 + 2][y] is None and board[x1 + 3][y] is None and not self.enemy_piece_controls(board, x1 + 3, y) and not self.enemy_piece_controls(board, x1 + 2, y):
+                        castling_moves.add((x1 + 2, y))
+            if self.on_starting_square and board[x2][y]:
+                if board[x2][y].piece_name == piece_color + '_rook' and board[x2][y].on_starting_square:
+                    if board[x2 - 1][y] is None and board[x2 - 2][y] is None and not self.enemy_piece_controls(board, x2 - 2, y):
+                        castling_moves.add((x2 - 1, y))
+
+        return castling_moves
+
+    def castle(self, position, rook):
+        """
+        Perform castling move for the king and rook.
+
+        Args:
+            position (Position): The position object.
+            rook (RulesPiece): The rook piece involved in castling.
+        """
+        rook_x, rook_y = rook.position
+
+        king_pos_x = rook_x - 1 if rook_x == 7 else rook_x + 2
+        rook_pos_x = 3 if king_pos_x == 2 else 5
+
+        rook.on_starting_square = False
+        self.on_starting_square = False
+        position.move_piece(self, (king_pos_x, rook_y))
+        position.move_piece(rook, (rook_pos_x, rook_y))
+        position.update_castling_rights()
+
+    def get_legal_moves(self, position, possible_moves: set):
+        """
+        Get the legal moves for the piece.
+
+        Args:
+            position (Position): The position object.
+            possible_moves (set): The set of possible moves for the piece.
+
+        Returns:
+            set: The set of legal moves for the piece.
+        """
+        constraints = position.get_move_constraints(self.piece_name[0])
+        return position.filter_legal_moves(self, possible_moves, constraints)
+
+    def get_all_legal_moves(self, position):
+        """
+        Get every legal move for the piece, castling included.
+
+        Args:
+            position (Position): The position object.
+
+        Returns:
+            set: The set of legal moves for the piece.
+        """
+        possible_moves = self.get_possible_moves(position.board)
+        if self.piece_name.split('_')[-1] == 'king':
+            possible_moves |= self.get_castling_moves(position.board)
+        return self.get_legal_moves(position, possible_moves)
+
+
+class GameStatus:
+    __slots__ = ('check', 'checkmate', 'stalemate', 'insufficient_material', 'repetitions', 'halfmove_clock', 'result')
+
+    def __init__(self, check: bool, checkmate: bool, stalemate: bool, insufficient_material: bool,
+                 repetitions: int, halfmove_clock: int, result):
+        """
+        Holds everything that decides whether a position ends the game.
+
+        Args:
+            check (bool): Whether the side to move is in check.
+            checkmate (bool): Whether the side to move is checkmated.
+            stalemate (bool): Whether the side to move has no legal move and is not in check.
+            insufficient_material (bool): Whether neither side has the material to mate.
+            repetitions (int): How often the position has occurred, this time included.
+            halfmove_clock (int): Plies since the last capture or pawn move.
+            result (str or bool): The result of the game or False if the game is ongoing.
+        """
+        self.check = check
+        self.checkmate = checkmate
+        self.stalemate = stalemate
+        self.insufficient_material = insufficient_material
+        self.repetitions = repetitions
+        self.halfmove_clock = halfmove_clock
+        self.result = result
+
+    @property
+    def threefold_repetition(self):
+        return self.repetitions >= REPETITION_LIMIT
+
+    @property
+    def fifty_moves(self):
+        return self.halfmove_clock >= FIFTY_MOVE_PLIES
+
+    @property
+    def is_over(self):
+        return bool(self.result)
+
+
+class Position:
+    piece_class = RulesPiece
+
+    def __init__(self, fen: str = None):
+        """
+        Initializes a position with the pieces on their starting squares and white to move, or from FEN.
+
+        Args:
+            fen (str): The position to set up instead of the start position.
+        """
+        self._turn = 'w'
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.board = [[None for _ in range(8)] for _ in range(8)]
+        if fen is None:
+            self.setup_board()
+        else:
+            self.setup_fen(fen)
+        self.move_stack = []
+        self.hash_history = []
+
+    @classmethod
+    def from_fen(cls, fen: str):
+        """
+        Builds a position from FEN.
+
+        Args:
+            fen (str): The FEN string; the en passant field is ignored.
+
+        Returns:
+            Position: The position, of the class this is called on.
+        """
+        return cls(fen)
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        # Replacing the grid wholesale invalidates everything derived from it
+        self._board = Board(board, self)
+        self._rebuild()
+
+    @property
+    def turn(self):
+        return self._turn
+
+    @turn.setter
+    def turn(self, turn: str):
+        if turn != self._turn:
+            self.hash ^= TURN_KEY
+            self._turn = turn
+            self.bitboard.turn = turn
+
+    def _rebuild(self):
+        self.attack_map = AttackMap(self._board)
+        self.castling_rights = castling_rights(self._board)
+        self.hash = compute_hash(self._board, self._turn)
+        self._status = None
+        self._status_key = None
+        self._legal_move_cache = {}
+        self.pieces = {'w': set(), 'b': set()}
+        self.kings = {'w': None, 'b': None}
+        for column in self._board:
+            for piece in column:
+                if piece is not None:
+                    self._index_piece(piece)
+        self.bitboard = BitboardPosition.from_pieces(self.pieces['w'] | self.pieces['b'], self._turn)
+
+    def _index_piece(self, piece: RulesPiece):
+        self.pieces[piece.piece_name[0]].add(piece)
+        if piece.piece_name[2:] == 'king':
+            self.kings[piece.piece_name[0]] = piece
+
+    def _unindex_piece(self, piece: RulesPiece):
+        self.pieces[piece.piece_name[0]].discard(piece)
+        if self.kings[piece.piece_name[0]] is piece:
+            self.kings[piece.piece_name[0]] = None
+
+    def setup_board(self):
+        """
+        Sets up the chessboard with the initial piece positions.
+        """
+        for piece_name, positions in START_PIECE_POS.items():
+            for position in positions:
+                piece = self.piece_class(piece_name, position)
+                x, y = position
+                self.board[x][y] = piece
+        self._rebuild()
+
+    def setup_fen(self, fen: str):
+        """
+        Sets up the chessboard from FEN, deriving on_starting_square flags from the castling rights.
+
+        Kings and rooks keep their flag only while a castling right needs them, pawns while
+        they are on their starting rank, and other pieces while on one of their starting squares.
+
+        Args:
+            fen (str): The FEN string.
+
+        Raises:
+            ValueError: If the FEN is invalid or grants a castling right its pieces cannot have.
+        """
+        pieces, turn, rights, self.halfmove_clock, self.fullmove_number = parse_fen(fen)
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for piece_name, (x, y) in pieces:
+            piece = self.piece_class(piece_name, (x, y))
+            kind = piece_name[2:]
+            on_starting_square = (x, y) in START_PIECE_POS[piece_name]
+            if kind == 'king':
+                on_starting_square = on_starting_square and bool(rights & KING_CASTLING_RIGHTS[piece_name[0]])
+            elif kind == 'rook':
+                on_starting_square = on_starting_square and bool(rights & ROOK_CASTLING_RIGHTS[(x, y)])
+            elif kind == 'pawn':
+                on_starting_square = y == (6 if piece_name[0] == 'w' else 1)
+            piece.on_starting_square = on_starting_square
+            board[x][y] = piece
+
+        self._turn = turn
+        self.board = board
+        if self.castling_rights != rights:
+            raise ValueError(f'Invalid FEN castling rights for the position: {fen!r}')
+
+    def to_fen(self):
+        """
+        Writes the position as FEN, with the castling rights taken from the on_starting_square flags.
+
+        Returns:
+            str: The FEN string; the en passant field is always "-".
+        """
+        return format_fen(self.board, self.turn, self.castling_rights, self.halfmove_clock, self.fullmove_number)
+
+    def copy(self):
+        """
+        Copies the pieces, their flags and the side to move into a rules-only Position.
+
+        The copy has no move history and no pygame state, so it can be pickled to other processes.
+
+        Returns:
+            Position: The copy.
+        """
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for x, column in enumerate(self.board):
+            for y, piece in enumerate(column):
+                if piece is not None:
+                    board[x][y] = RulesPiece(piece.piece_name, (x, y))
+                    board[x][y].on_starting_square = piece.on_starting_square
+        position = Position.__new__(Position)
+        position._turn = self.turn
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.board = board
+        position.move_stack = []
+        position.hash_history = []
+        return position
+
+    def update_castling_rights(self):
+        """
+        Re-derives the castling rights after on_starting_square flags changed and updates the hash.
+        """
+        rights = castling_rights(self._board)
+        if rights != self.castling_rights:
+            self.hash ^= CASTLING_KEYS[self.castling_rights] ^ CASTLING_KEYS[rights]
+            self.castling_rights = rights
+
+    def move_piece(self, piece: RulesPiece, new_position: tuple[int, int]):
+        """
+        Moves a piece on the chessboard to a new position.
+
+        The bitboards take the piece's on_starting_square flag as it is now, so callers
+        that change the flag with the move set it first.
+
+        Args:
+            piece (RulesPiece): The piece to be moved.
+            new_position (tuple[int, int]): The new position (x, y) of the piece.
+        """
+        old_x, old_y = piece.position
+        new_x, new_y = new_position
+        captured = self.board[new_x][new_y]
+
+        attack_map = self.attack_map
+        sliders = attack_map.sliders_through([(old_x, old_y), new_position])
+        attack_map.remove_piece(piece)
+        if captured is not None and captured is not piece:
+            attack_map.remove_piece(captured)
+            sliders.discard(captured)
+            self._unindex_piece(captured)
+        sliders.discard(piece)
+
+        keys = PIECE_KEYS[piece.piece_name]
+        self.hash ^= keys[old_x][old_y] ^ keys[new_x][new_y]
+        if captured is not None and captured is not piece:
+            self.hash ^= PIECE_KEYS[captured.piece_name][new_x][new_y]
+
+        self.board[old_x][old_y] = None
+        self.board[new_x][new_y] = piece
+        piece.position = new_position
+
+        bitboard = self.bitboard
+        bitboard.remove_piece(new_position)
+        bitboard.remove_piece((old_x, old_y))
+        bitboard.put_piece(piece.piece_name, new_position, piece.on_starting_square)
+
+        attack_map.add_piece(piece, new_position)
+        attack_map.refresh(sliders)
+
+    def put_piece(self, position: tuple[int, int], piece: RulesPiece):
+        """
+        Puts a piece on a square, replacing whatever stood there.
+
+        Args:
+            position (tuple[int, int]): The square to fill.
+            piece (RulesPiece): The piece to put there, or None to empty the square.
+        """
+        x, y = position
+        old_piece = self.board[x][y]
+
+        attack_map = self.attack_map
+        sliders = attack_map.sliders_through([position]) if (old_piece is None) != (piece is None) else set()
+        if old_piece is not None:
+            attack_map.remove_piece(old_piece)
+            sliders.discard(old_piece)
+            self._unindex_piece(old_piece)
+            self.hash ^= PIECE_KEYS[old_piece.piece_name][x][y]
+
+        self.board[x][y] = piece
+        self.bitboard.remove_piece(position)
+        if piece is not None:
+            piece.position = position
+            self.bitboard.put_piece(piece.piece_name, position, piece.on_starting_square)
+            attack_map.add_piece(piece, position)
+            self._index_piece(piece)
+            self.hash ^= PIECE_KEYS[piece.piece_name][x][y]
+        attack_map.refresh(sliders)
+
+    def promote(self, position: tuple[int, int], piece_name: str):
+        """
+        Replaces the pawn on the given square with a newly promoted piece.
+
+        Args:
+            position (tuple[int, int]): The square of the promoting pawn.
+            piece_name (str): The full name of the new piece, e.g. 'w_queen'.
+
+        Returns:
+            RulesPiece: The newly promoted piece.
+        """
+        new_piece = self.piece_class(piece_name, position)
+        new_piece.on_starting_square = False
+        self.put_piece(position, new_piece)
+        return new_piece
+
+    def is_square_attacked(self, square: tuple[int, int], by_color: str):
+        """
+        Checks whether any piece of the given colour attacks a square.
+
+        Args:
+            square (tuple[int, int]): The (x, y) square to test.
+            by_color (str): The attacking colour.
+
+        Returns:
+            bool: True if the square is attacked, False otherwise.
+        """
+        return self.attack_map.is_attacked(square, by_color)
+
+    def get_king(self, color: str):
+        """
+        Returns the king of the given colour.
+
+        Args:
+            color (str): 'w' or 'b'.
+
+        Returns:
+            RulesPiece: The king, or None if the board has none.
+        """
+        return self.kings[color]
+
+    def get_move_constraints(self, color: str):
+        """
+        Works out once per position what limits the moves of one side.
+
+        Walks the eight rays out of the king to find sliders giving check and
+        friendly pieces pinned against it, then adds knight and pawn checkers.
+
+        Args:
+            color (str): The side whose moves are constrained.
+
+        Returns:
+            tuple: (king, checkers, block_squares, pins). ``checkers`` is the
+            number of pieces giving check, ``block_squares`` the squares that
+            capture or block a single checker (None when not in check) and
+            ``pins`` maps each pinned piece to the squares it may still move to.
+        """
+        king = self.get_king(color)
+        if king is None:
+            return None, 0, None, {}
+
+        board = self.board
+        enemy = other_color(color)
+        king_x, king_y = king.position
+        checkers = 0
+        block_squares = None
+        pins = {}
+
+        for directions, sliders in ((LINEAR_DIRECTIONS, (enemy + '_rook', enemy + '_queen')),
+                                    (DIAGONAL_DIRECTIONS, (enemy + '_bishop', enemy + '_queen'))):
+            for dx, dy in directions:
+                ray = []
+                pinned = None
+                x, y = king_x + dx, king_y + dy
+                while 0 <= x <= 7 and 0 <= y <= 7:
+                    ray.append((x, y))
+                    piece = board[x][y]
+                    if piece is not None:
+                        if piece.piece_name[0] == color:
+                            if pinned is not None:
+                                break
+                            pinned = piece
+                        else:
+                            if piece.piece_name in sliders:
+                                if pinned is None:
+                                    checkers += 1
+                                    block_squares = set(ray)
+                                else:
+                                    pins[pinned] = set(ray)
+                            break
+                    x += dx
+                    y += dy
+
+        knight = enemy + '_knight'
+        for dx, dy in KNIGHT_OFFSETS:
+            x, y = king_x + dx, king_y + dy
+            if 0 <= x <= 7 and 0 <= y <= 7 and board[x][y] is not None and board[x][y].piece_name == knight:
+                checkers += 1
+                block_squares = {(x, y)}
+
+        pawn = enemy + '_pawn'
+        pawn_y = king_y + 1 if enemy == 'w' else king_y - 1
+        if 0 < pawn_y < 7:
+            for x in (king_x - 1, king_x + 1):
+                if 0 <= x <= 7 and board[x][pawn_y] is not None and board[x][pawn_y].piece_name == pawn:
+                    checkers += 1
+                    block_squares = {(x, pawn_y)}
+
+        return king, checkers, block_squares, pins
+
+    def filter_legal_moves(self, piece: RulesPiece, possible_moves: set, constraints: tuple):
+        """
+        Keeps the possible moves of a piece that do not leave its king in check.
+
+        Args:
+            piece (RulesPiece): The piece to move.
+            possible_moves (set): Its possible moves, castling included for a king.
+            constraints (tuple): The result of get_move_constraints for its colour.
+
+        Returns:
+            set: The legal moves for the piece.
+        """
+        king, checkers, block_squares, pins = constraints
+        if king is None:
+            return set(possible_moves)
+
+        if piece is king:
+            attack_map = self.attack_map
+            enemy = other_color(piece.piece_name[0])
+            king_x, king_y = king.position
+            # The map stops a checking ray at the king, but the square behind it is attacked once the king steps there
+            behind = set()
+            for attacker in attack_map.attackers[enemy][king_x][king_y]:
+                if attacker.piece_name[2:] in ('rook', 'bishop', 'queen'):
+                    attacker_x, attacker_y = attacker.position
+                    behind.add((king_x + (king_x > attacker_x) - (king_x < attacker_x), king_y + (king_y > attacker_y) - (king_y < attacker_y)))
+            return {move for move in possible_moves if move not in behind and not attack_map.is_attacked(move, enemy)}
+
+        if checkers > 1:
+            return set()
+        legal_moves = possible_moves
+        if block_squares is not None:
+            legal_moves = legal_moves & block_squares
+        if piece in pins:
+            legal_moves = legal_moves & pins[piece]
+        return set(legal_moves)
+
+    def _iter_legal_moves(self, color: str):
+        constraints = self.get_move_constraints(color)
+        king, checkers = constraints[0], constraints[1]
+        # In double check only the king can move, otherwise it goes last since it rarely has moves
+        if checkers < 2:
+            # Sorted so the moves come out in board order whatever order the pieces were indexed in
+            for piece in sorted(self.pieces[color], key=attrgetter('position')):
+                if piece is not king:
+                    yield piece, piece.get_possible_moves(self.board), constraints
+        if king is not None:
+            yield king, king.get_possible_moves(self.board) | king.get_castling_moves(self.board), constraints
+
+    def get_legal_moves_by_square(self, color: str = None):
+        """
+        Returns the legal moves of one side grouped by the square they start from.
+
+        Args:
+            color (str): The side to generate for, defaults to the side to move.
+
+        Returns:
+            dict[tuple[int, int], set]: Start square mapped to its legal destinations.
+        """
+        if move_backend == 'bitboard':
+            return self.bitboard.get_legal_moves_by_square(color or self.turn)
+
+        moves = {}
+        for piece, possible_moves, constraints in self._iter_legal_moves(color or self.turn):
+            legal_moves = self.filter_legal_moves(piece, possible_moves, constraints)
+            if legal_moves:
+                moves[piece.position] = legal_moves
+        return moves
+
+    def get_cached_legal_moves(self):
+        """
+        Returns the legal moves of the side to move grouped by start square, generating them once per position.
+
+        Legal moves depend only on the pieces, the side to move and the castling rights,
+        which is exactly what the hash covers, so the hash keys a small cache. The
+        oldest entry is dropped once LEGAL_MOVE_CACHE_SIZE positions are held, so
+        taking moves back and forth stays within the cache.
+
+        Returns:
+            dict[tuple[int, int], frozenset]: Start square mapped to its legal destinations. Shared with the cache.
+        """
+        moves = self._legal_move_cache.get(self.hash)
+        if moves is None:
+            if len(self._legal_move_cache) >= LEGAL_MOVE_CACHE_SIZE:
+                del self._legal_move_cache[next(iter(self._legal_move_cache))]
+            moves = {start: frozenset(ends) for start, ends in self.get_legal_moves_by_square().items()}
+            self._legal_move_cache[self.hash] = moves
+        return moves
+
+    def has_any_legal_move(self, color: str = None):
+        """
+        Checks whether one side has at least one legal move, stopping at the first.
+
+        Args:
+            color (str): The side to test, defaults to the side to move.
+
+        Returns:
+            bool: True if a legal move exists, False on checkmate or stalemate.
+        """
+        if move_backend == 'bitboard':
+            return self.bitboard.has_any_legal_move(color or self.turn)
+
+        for piece, possible_moves, constraints in self._iter_legal_moves(color or self.turn):
+            if self.filter_legal_moves(piece, possible_moves, constraints):
+                return True
+        return False
+
+    def get_legal_moves(self):
+        """
+        Returns every legal move for the side to move.
+
+        Returns:
+            list[tuple[tuple[int, int], tuple[int, int]]]: (start, end) pairs.
+        """
+        if move_backend == 'bitboard':
+            return self.bitboard.get_legal_moves()
+
+        return [(start, end) for start, ends in self.get_legal_moves_by_square().items() for end in ends]
+
+    def is_promotion(self, start: tuple[int, int], end: tuple[int, int]):
+        """
+        Checks whether a move is a pawn reaching the last rank.
+
+        Args:
+            start (tuple[int, int]): The square of the piece to move.
+            end (tuple[int, int]): The destination square.
+
+        Returns:
+            bool: True if the move promotes a pawn.
+        """
+        x, y = start
+        return end[1] in (0, 7) and self.board[x][y].piece_name[2:] == 'pawn'
+
+    def play_move(self, start: tuple[int, int], end: tuple[int, int], promotion: str = 'queen'):
+        """
+        Plays a legal move for the side to move and passes the turn.
+
+        Args:
+            start (tuple[int, int]): The square of the piece to move.
+            end (tuple[int, int]): The destination square.
+            promotion (str): The piece a pawn reaching the last rank becomes.
+
+        Raises:
+            ValueError: If the move is not legal in this position.
+        """
+        x, y = start
+        piece = self.board[x][y]
+        if piece is None or piece.piece_name[0] != self.turn or end not in piece.get_all_legal_moves(self):
+            raise ValueError(f'Illegal move {start} -> {end}')
+
+        self.make_move(start, end, promotion)
+
+    def make_move(self, start: tuple[int, int], end: tuple[int, int], promotion: str = 'queen'):
+        """
+        Plays a move without checking its legality and pushes an undo record.
+
+        Castling is recognised by a king moving two files and a pawn reaching
+        the last rank is promoted. No sound is played and nothing is rescanned.
+
+        Args:
+            start (tuple[int, int]): The square of the piece to move.
+            end (tuple[int, int]): The destination square.
+            promotion (str): The piece a pawn reaching the last rank becomes.
+        """
+        x, y = start
+        piece = self.board[x][y]
+        end_x, end_y = end
+        captured = self.board[end_x][end_y]
+        on_starting_square = piece.on_starting_square
+        kind = piece.piece_name[2:]
+        rook = None
+        promoted = None
+        self.hash_history.append(self.hash)
+
+        # Flags are cleared before the pieces move, so the bitboards pick them up
+        piece.on_starting_square = False
+        if kind == 'king' and abs(end_x - x) == 2:
+            rook = self.board[0 if end_x == 2 else 7][y]
+            rook.on_starting_square = False
+            self.move_piece(piece, end)
+            self.move_piece(rook, (3 if end_x == 2 else 5, y))
+        else:
+            self.move_piece(piece, end)
+            if kind == 'pawn' and end_y in (0, 7):
+                promoted = self.promote(end, piece.piece_name[0] + '_' + promotion)
+
+        if self.turn == 'b':
+            self.fullmove_number += 1
+        self.turn = other_color(self.turn)
+        self.update_castling_rights()
+        self.move_stack.append((piece, start, captured, on_starting_square, rook, promoted, self.halfmove_clock))
+        self.halfmove_clock = 0 if kind == 'pawn' or captured is not None else self.halfmove_clock + 1
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with make_move.
+
+        Returns:
+            tuple[tuple[int, int], tuple[int, int]]: The (start, end) of the move taken back.
+        """
+        piece, start, captured, on_starting_square, rook, promoted, self.halfmove_clock = self.move_stack.pop()
+        end = promoted.position if promoted is not None else piece.position
+
+        if promoted is not None:
+            self.put_piece(end, piece)
+        piece.on_starting_square = on_starting_square
+        self.move_piece(piece, start)
+        if captured is not None:
+            self.put_piece(end, captured)
+        if rook is not None:
+            rook.on_starting_square = True
+            self.move_piece(rook, (0 if end[0] == 2 else 7, start[1]))
+
+        self.turn = other_color(self.turn)
+        if self.turn == 'b':
+            self.fullmove_number -= 1
+        self.update_castling_rights()
+        self.hash_history.pop()
+        return start, end
+
+    def count_repetitions(self):
+        """
+        Counts how often the current position has occurred in the game.
+
+        Only positions since the last capture or pawn move can repeat it, and only every
+        other one has the same side to move, so at most halfmove_clock / 2 hashes are compared.
+
+        Returns:
+            int: The number of occurrences, this one included.
+        """
+        history = self.hash_history
+        earliest = max(len(history) - self.halfmove_clock, 0)
+        return 1 + sum(1 for ply in range(len(history) - 2, earliest - 1, -2) if history[ply] == self.hash)
+
+    def has_insufficient_material(self):
+        """
+        Checks whether neither side can possibly mate: bare kings, a single minor piece,
+        or only bishops that all stand on squares of one color.
+
+        Returns:
+            bool: True if the position is a dead draw by material.
+        """
+        minors = []
+        for piece in self.pieces['w'] | self.pieces['b']:
+            kind = piece.piece_name[2:]
+            if kind in ('pawn', 'rook', 'queen'):
+                return False
+            if kind != 'king':
+                minors.append((kind, sum(piece.position) % 2))
+        if len(minors) <= 1:
+            return True
+        return all(kind == 'bishop' for kind, _ in minors) and len({color for _, color in minors}) == 1
+
+    def get_status(self):
+        """
+        Judges the position for the side to move, once per position.
+
+        The status is cached until the position or its history changes, so the
+        check test and the legal move sweep run once however often it is asked for.
+
+        Returns:
+            GameStatus: Check, checkmate, stalemate, draws by rule and the result.
+        """
+        key = (self.hash, self.halfmove_clock, len(self.hash_history))
+        if self._status_key == key:
+            return self._status
+
+        king = self.get_king(self.turn)
+        check = king is not None and self.is_square_attacked(king.position, other_color(self.turn))
+        cached_moves = self._legal_move_cache.get(self.hash)
+        has_move = bool(cached_moves) if cached_moves is not None else self.has_any_legal_move()
+        insufficient_material = self.has_insufficient_material()
+        repetitions = self.count_repetitions()
+
+        if not has_move and check:
+            result = f'{"Black" if self.turn == "w" else "White"} Wins by Checkmate'
+        elif not has_move:
+            result = 'Draw by Stalemate'
+        elif insufficient_material:
+            result = 'Draw by Insufficient Material'
+        elif repetitions >= REPETITION_LIMIT:
+            result = 'Draw by Threefold Repetition'
+        elif self.halfmove_clock >= FIFTY_MOVE_PLIES:
+            result = 'Draw by Fifty-Move Rule'
+        else:
+            result = False
+
+        self._status = GameStatus(check, not has_move and check, not has_move and not check, insufficient_material,
+                                  repetitions, self.halfmove_clock, result)
+        self._status_key = key
+        return self._status
+
+    def get_result(self):
+        """
+        Judges the position for the side to move; see get_status.
+
+        Returns:
+            str or bool: The result of the game (win/draw) or False if the game is ongoing.
+        """
+        return self.get_status().result
@@ -0,0 +1,184 @@
+"""
+Headless game simulation for Chess Without En Passant.
+
+Plays whole games without pygame, spread over a ProcessPoolExecutor, and
+streams one result per game in game order. Each game draws its moves from its
+own random.Random seeded from the run seed and the game number, so a run is
+reproducible whatever the worker count.
+
+Usage (from the src directory):
+    python simulate.py 1000 --policy random --workers 4 --seed 7
+"""
+from concurrent.futures import ProcessPoolExecutor
+from engine import Engine, TranspositionTable
+from rules import Position, PROMOTION_PIECES, move_name
+from time import perf_counter
+import random
+
+MOVE_LIMIT_RESULT = 'Draw by Move Limit'
+ENGINE_NODES = 500
+
+
+def random_policy(position: Position, rng: random.Random):
+    """
+    Picks a uniformly random legal move, each promotion piece counting as its own move.
+
+    Args:
+        position (Position): The position to move in.
+        rng (random.Random): The game's random source.
+
+    Returns:
+        tuple: (start, end, promotion) with promotion None unless a pawn promotes.
+    """
+    moves = []
+    for start, end in sorted(position.get_legal_moves()):
+        if position.is_promotion(start, end):
+            moves.extend((start, end, promotion) for promotion in PROMOTION_PIECES)
+        else:
+            moves.append((start, end, None))
+    return rng.choice(moves)
+
+
+def engine_policy(position: Position, rng: random.Random):
+    """
+    Plays the move of a node-budgeted engine search; deterministic for a given position.
+
+    Args:
+        position (Position): The position to move in.
+        rng (random.Random): The game's random source, unused.
+
+    Returns:
+        tuple: (start, end, promotion) with promotion None unless a pawn promotes.
+    """
+    return Engine(TranspositionTable(1 << 12)).best_move(position, max_nodes=ENGINE_NODES)
+
+
+POLICIES = {'random': random_policy, 'engine': engine_policy}
+
+
+def game_seed(seed: int, game: int):
+    """
+    Derives the seed of one game from the run seed.
+
+    Args:
+        seed (int): The run seed.
+        game (int): The game number.
+
+    Returns:
+        int: The game's seed.
+    """
+    return seed << 32 | game
+
+
+def play_game(game: int, seed: int = 0, policy='random', max_plies: int = 400, opening_plies: int = 0):
+    """
+    Plays one game to its end or to the ply limit.
+
+    Args:
+        game (int): The game number.
+        seed (int): The run seed.
+        policy (str or callable): A POLICIES name, or a picklable function (position, rng) -> move.
+        max_plies (int): Plies after which the game is stopped as MOVE_LIMIT_RESULT.
+        opening_plies (int): Plies played by random_policy before the policy takes over.
+
+    Returns:
+        dict: The game number, seed, outcome string, number of plies and coordinate moves.
+    """
+    choose = POLICIES[policy] if isinstance(policy, str) else policy
+    rng = random.Random(game_seed(seed, game))
+    position = Position()
+    moves = []
+    outcome = position.get_result()
+    while not outcome:
+        if len(moves) >= max_plies:
+            outcome = MOVE_LIMIT_RESULT
+            break
+        start, end, promotion = (random_policy if len(moves) < opening_plies else choose)(position, rng)
+        position.make_move(start, end, promotion or 'queen')
+        moves.append(move_name(start, end, promotion))
+        outcome = position.get_result()
+    return {'game': game, 'seed': game_seed(seed, game), 'outcome': outcome, 'plies': len(moves), 'moves': moves}
+
+
+def _play_games(games, seed, policy, max_plies, opening_plies):
+    return [play_game(game, seed, policy, max_plies, opening_plies) for game in games]
+
+
+def simulate(n_games: int, policy='random', workers: int = None, seed: int = 0, max_plies: int = 400,
+             opening_plies: int = 0, chunk_size: int = 8):
+    """
+    Plays games across worker processes and yields their results in game order.
+
+    Args:
+        n_games (int): The number of games to play.
+        policy (str or callable): A POLICIES name, or a picklable function (position, rng) -> move.
+        workers (int): The number of processes, one per core if None and in-process if 1.
+        seed (int): The run seed.
+        max_plies (int): Plies after which a game is stopped as MOVE_LIMIT_RESULT.
+        opening_plies (int): Plies played at random before the policy takes over.
+        chunk_size (int): Games handed to a worker at a time.
+
+    Yields:
+        dict: The result of each game, as returned by play_game.
+    """
+    chunks = [range(start, min(start + chunk_size, n_games)) for start in range(0, n_games, chunk_size)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from _play_games(chunk, seed, policy, max_plies, opening_plies)
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_play_games, chunk, seed, policy, max_plies, opening_plies) for chunk in chunks]
+        for future in futures:
+            yield from future.result()
+
+
+def summarize(results, seconds: float):
+    """
+    Aggregates game results into outcome counts and throughput.
+
+    Args:
+        results (list[dict]): Results yielded by simulate.
+        seconds (float): The wall-clock time the games took.
+
+    Returns:
+        dict: Outcome counts, total games and plies, and games and plies per second.
+    """
+    outcomes = {}
+    for result in results:
+        outcomes[result['outcome']] = outcomes.get(result['outcome'], 0) + 1
+    plies = sum(result['plies'] for result in results)
+    seconds = max(seconds, 1e-9)
+    return {'games': len(results), 'plies': plies, 'outcomes': dict(sorted(outcomes.items())),
+            'games_per_second': len(results) / seconds, 'plies_per_second': plies / seconds}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Headless game simulation for Chess Without En Passant')
+    parser.add_argument('games', type=int, help='number of games to play')
+    parser.add_argument('--policy', default='random', choices=POLICIES)
+    parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-plies', type=int, default=400)
+    parser.add_argument('--opening-plies', type=int, default=0, help='random plies before the policy takes over')
+    parser.add_argument('--output', help='write one JSON result per line to this file')
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else None
+    results = []
+    start_time = perf_counter()
+    for game_result in simulate(args.games, args.policy, args.workers, args.seed, args.max_plies, args.opening_plies):
+        results.append({key: value for key, value in game_result.items() if key != 'moves'})
+        if output:
+            output.write(json.dumps(game_result) + '\n')
+    if output:
+        output.close()
+
+    summary = summarize(results, perf_counter() - start_time)
+    for outcome, count in summary['outcomes'].items():
+        print(f'{outcome}: {count}')
+    print(f'{summary["games"]} games, {summary["plies"]} plies '
+          f'({summary["games_per_second"]:,.1f} games/s, {summary["plies_per_second"]:,.0f} plies/s)')
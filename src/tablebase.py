@@ -0,0 +1,655 @@
+"""
+Endgame tablebases for Chess Without En Passant.
+
+A table holds every placement of one set of pieces, such as KQvK or KRvKP
+(white's pieces, then black's), with either side to move. Each position is a
+single byte at a fixed index, so a probe is one read from a memory-mapped file:
+
+    0        draw
+    1..254   distance to mate in plies, plus one: odd distances are wins for
+             the side to move, even ones losses
+    255      not a legal position
+
+Tables are built by retrograde analysis. Every position's legal moves are
+counted once; captures and promotions lead into smaller tables built first and
+are scored straight away. Then, from the checkmates outwards, each newly
+solved position is unmoved to its predecessors: a predecessor of a loss is a
+win, and a predecessor whose every move reaches a win for the opponent is a
+loss. Both passes are spread over worker processes that share the table
+through multiprocessing.shared_memory.
+
+There is no en passant to unmove in this variant, so a table only depends on
+the pieces and the side to move. Castling is not modelled: positions with
+castling rights are not probed. Distances ignore any move-count draw rule.
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from rules import Position, PROMOTION_PIECES
+import mmap
+import os
+import struct
+
+MAGIC = b'CWEPTB\0\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHH4x16s')  # magic, version, piece count, reserved, signature
+MAX_PIECES = 5
+DRAW = 0
+INVALID = 255
+MAX_DTM = 253
+CHUNK_SIZE = 1 << 15
+FILE_SUFFIX = '.cwtb'
+
+# Piece kinds by letter, in the order pieces are listed in a signature
+LETTERS = 'KQRBNP'
+KINDS = ['king', 'queen', 'rook', 'bishop', 'knight', 'pawn']
+KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN = range(6)
+PROMOTION_KINDS = [KINDS.index(piece) for piece in PROMOTION_PIECES]
+
+
+def _leaper_targets(offsets):
+    return [[(y + dy) * 8 + x + dx for dx, dy in offsets if 0 <= x + dx < 8 and 0 <= y + dy < 8]
+            for y in range(8) for x in range(8)]
+
+
+def _rays(directions):
+    rays = []
+    for y in range(8):
+        for x in range(8):
+            square_rays = []
+            for dx, dy in directions:
+                ray = []
+                to_x, to_y = x + dx, y + dy
+                while 0 <= to_x < 8 and 0 <= to_y < 8:
+                    ray.append(to_y * 8 + to_x)
+                    to_x, to_y = to_x + dx, to_y + dy
+                square_rays.append(ray)
+            rays.append(square_rays)
+    return rays
+
+
+ORTHOGONAL = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIAGONAL = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+KING_TARGETS = _leaper_targets(ORTHOGONAL + DIAGONAL)
+KNIGHT_TARGETS = _leaper_targets([(2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2), (1, -2), (2, -1)])
+RAYS = {QUEEN: _rays(ORTHOGONAL + DIAGONAL), ROOK: _rays(ORTHOGONAL), BISHOP: _rays(DIAGONAL)}
+# White pawns move towards row 0, black pawns towards row 7
+PAWN_STEPS = [-8, 8]
+PAWN_CAPTURES = [_leaper_targets([(-1, -1), (1, -1)]), _leaper_targets([(-1, 1), (1, 1)])]
+PAWN_START_ROWS = [6, 1]
+PROMOTION_ROWS = [0, 7]
+
+# For each pair of squares: which sliders see one from the other, and the squares in between
+SLIDERS_BETWEEN = [[()] * 64 for _ in range(64)]
+SQUARES_BETWEEN = [[()] * 64 for _ in range(64)]
+for _square in range(64):
+    for _kind in (ROOK, BISHOP):
+        for _ray in RAYS[_kind][_square]:
+            for _distance, _target in enumerate(_ray):
+                SLIDERS_BETWEEN[_square][_target] = (QUEEN, _kind)
+                SQUARES_BETWEEN[_square][_target] = tuple(_ray[:_distance])
+
+
+def parse_signature(signature: str):
+    """
+    Reads a material signature such as 'KQvK' or 'KRPvKR'.
+
+    Args:
+        signature (str): White's pieces, 'v', then black's, each starting with the king.
+
+    Returns:
+        list[tuple[int, int]]: (color, kind) for every piece in table order, color 0 for white.
+
+    Raises:
+        ValueError: If the signature is malformed or has more than MAX_PIECES pieces.
+    """
+    sides = signature.upper().split('V')
+    pieces = []
+    for color, side in enumerate(sides):
+        if len(sides) != 2 or not side.startswith('K') or 'K' in side[1:] or any(letter not in LETTERS for letter in side):
+            raise ValueError(f'Invalid material signature: {signature!r}')
+        pieces += sorted((color, LETTERS.index(letter)) for letter in side)
+    if len(pieces) > MAX_PIECES:
+        raise ValueError(f'Tablebases hold at most {MAX_PIECES} pieces: {signature!r}')
+    return pieces
+
+
+def format_signature(pieces):
+    """
+    Writes the signature of a list of (color, kind, ...) pieces.
+
+    Args:
+        pieces (Iterable[tuple]): Pieces whose first two items are color and kind.
+
+    Returns:
+        str: The signature, e.g. 'KQvK'.
+    """
+    letters = [''.join(LETTERS[kind] for color, kind, *_ in sorted(pieces) if color == side) for side in (0, 1)]
+    return 'v'.join(letters)
+
+
+def table_index(turn: int, pieces):
+    """
+    Finds a position in its table.
+
+    Args:
+        turn (int): 0 for white to move, 1 for black.
+        pieces (Iterable[tuple[int, int, int]]): (color, kind, square) for every piece, square = y * 8 + x.
+
+    Returns:
+        tuple[str, int]: The table's signature and the position's index in it.
+    """
+    pieces = sorted(pieces)
+    index = turn
+    for _, _, square in pieces:
+        index = index * 64 + square
+    return format_signature(pieces), index
+
+
+def table_size(signature: str):
+    """
+    Returns the number of positions in a table.
+    """
+    return 2 * 64 ** len(parse_signature(signature))
+
+
+def sub_signatures(signature: str):
+    """
+    Lists the tables a table's captures and promotions lead into.
+
+    Args:
+        signature (str): The table.
+
+    Returns:
+        set[str]: The signatures of the smaller tables.
+    """
+    pieces = parse_signature(signature)
+    signatures = set()
+    for i, (color, kind) in enumerate(pieces):
+        if kind != KING:
+            signatures.add(format_signature(pieces[:i] + pieces[i + 1:]))
+        if kind == PAWN:
+            for promotion in PROMOTION_KINDS:
+                signatures.add(format_signature(pieces[:i] + [(color, promotion)] + pieces[i + 1:]))
+    return signatures
+
+
+def table_path(directory, signature: str):
+    """
+    Returns the file a table is stored in.
+    """
+    return Path(directory) / (format_signature(parse_signature(signature)) + FILE_SUFFIX)
+
+
+class TableFile:
+    def __init__(self, path):
+        """
+        Opens a table by memory-mapping it.
+
+        Args:
+            path: The table file.
+
+        Raises:
+            ValueError: If the file is not a table of a supported version.
+        """
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, piece_count, signature = HEADER.unpack_from(self.map) if len(self.map) >= HEADER.size else (b'', 0, 0, b'')
+        self.signature = signature.rstrip(b'\0').decode('ascii', 'replace')
+        if magic != MAGIC or version != VERSION or len(self.map) != HEADER.size + 2 * 64 ** piece_count:
+            self.map.close()
+            raise ValueError(f'Not a tablebase file of version {VERSION}: {path}')
+
+    def __getitem__(self, index: int):
+        return self.map[HEADER.size + index]
+
+    def close(self):
+        self.map.close()
+
+
+class _Generator:
+    def __init__(self, signature: str, directory, codes):
+        """
+        Holds what the passes over one table need: its layout, its codes and the smaller tables.
+
+        Args:
+            signature (str): The table being built.
+            directory: The directory holding the smaller tables.
+            codes: The table's codes, writable, shared between processes.
+        """
+        self.pieces = parse_signature(signature)
+        self.count = len(self.pieces)
+        self.weights = [64 ** (self.count - 1 - i) for i in range(self.count)]
+        self.half = 64 ** self.count
+        self.codes = codes
+        self.sub_tables = {sub: TableFile(table_path(directory, sub)) for sub in sub_signatures(signature)}
+
+    def close(self):
+        for table in self.sub_tables.values():
+            table.close()
+        self.codes = None
+
+    def decode(self, index: int):
+        turn, rest = divmod(index, self.half)
+        squares = [0] * self.count
+        for i in range(self.count - 1, -1, -1):
+            rest, squares[i] = divmod(rest, 64)
+        return turn, squares
+
+    def attacked(self, square: int, by_color: int, squares, occupied, captured: int = -1):
+        """
+        Tells whether the pieces of one color, less a captured one, attack a square.
+        """
+        for j, (color, kind) in enumerate(self.pieces):
+            if color != by_color or j == captured:
+                continue
+            origin = squares[j]
+            if kind == KING:
+                if square in KING_TARGETS[origin]:
+                    return True
+            elif kind == KNIGHT:
+                if square in KNIGHT_TARGETS[origin]:
+                    return True
+            elif kind == PAWN:
+                if square in PAWN_CAPTURES[color][origin]:
+                    return True
+            elif kind in SLIDERS_BETWEEN[origin][square]:
+                if not any(between in occupied for between in SQUARES_BETWEEN[origin][square]):
+                    return True
+        return False
+
+    def is_valid(self, turn: int, squares):
+        """
+        Tells whether a placement is a legal position: no shared squares, no pawn on
+        its first or last row and the side that just moved not in check.
+        """
+        occupied = set(squares)
+        if len(occupied) != self.count:
+            return False
+        for (color, kind), square in zip(self.pieces, squares):
+            if kind == PAWN and square // 8 in PROMOTION_ROWS:
+                return False
+        king = squares[self.pieces.index((1 - turn, KING))]
+        return not self.attacked(king, turn, squares, occupied)
+
+    def validate(self, start: int, stop: int):
+        """
+        Marks the invalid positions in a range of indexes.
+        """
+        codes = self.codes
+        for index in range(start, stop):
+            turn, squares = self.decode(index)
+            codes[index] = DRAW if self.is_valid(turn, squares) else INVALID
+
+    def moves(self, turn: int, squares):
+        """
+        Generates pseudo-legal moves as (piece, target, captured piece or -1, promotion kind or -1).
+        """
+        occupied = {square: j for j, square in enumerate(squares)}
+        for i, (color, kind) in enumerate(self.pieces):
+            if color != turn:
+                continue
+            origin = squares[i]
+            if kind == PAWN:
+                step = PAWN_STEPS[color]
+                promotions = PROMOTION_KINDS if (origin + step) // 8 == PROMOTION_ROWS[color] else (-1,)
+                if origin + step not in occupied:
+                    for promotion in promotions:
+                        yield i, origin + step, -1, promotion
+                    if origin // 8 == PAWN_START_ROWS[color] and origin + 2 * step not in occupied:
+                        yield i, origin + 2 * step, -1, -1
+                for target in PAWN_CAPTURES[color][origin]:
+                    j = occupied.get(target)
+                    if j is not None and self.pieces[j][0] != color:
+                        for promotion in promotions:
+                            yield i, target, j, promotion
+            elif kind == KING or kind == KNIGHT:
+                for target in (KING_TARGETS if kind == KING else KNIGHT_TARGETS)[origin]:
+                    j = occupied.get(target)
+                    if j is None:
+                        yield i, target, -1, -1
+                    elif self.pieces[j][0] != color:
+                        yield i, target, j, -1
+            else:
+                for ray in RAYS[kind][origin]:
+                    for target in ray:
+                        j = occupied.get(target)
+                        if j is None:
+                            yield i, target, -1, -1
+                            continue
+                        if self.pieces[j][0] != color:
+                            yield i, target, j, -1
+                        break
+
+    def exit_code(self, turn: int, squares, i: int, target: int, captured: int, promotion: int):
+        """
+        Looks up the code of the position a capture or promotion leads to in a smaller table.
+        """
+        pieces = [(color, promotion if j == i and promotion >= 0 else kind, target if j == i else square)
+                  for j, ((color, kind), square) in enumerate(zip(self.pieces, squares)) if j != captured]
+        signature, index = table_index(1 - turn, pieces)
+        return self.sub_tables[signature][index]
+
+    def initialise(self, start: int, stop: int):
+        """
+        Counts the legal moves of the positions in a range and scores their exits into smaller tables.
+
+        Returns:
+            tuple: (start, remaining, floors, solved) where remaining holds each position's legal moves
+            within the table, floors 255 for positions that cannot lose and otherwise the code of their
+            longest losing exit, and solved (index, distance) pairs known already.
+        """
+        codes = self.codes
+        remaining = bytearray(stop - start)
+        floors = bytearray(stop - start)
+        solved = []
+        for index in range(start, stop):
+            if codes[index] == INVALID:
+                continue
+            turn, squares = self.decode(index)
+            flip = self.half if turn == 0 else -self.half
+            moves = 0
+            legal = False
+            win = loss = None
+            draw = False
+            for i, target, captured, promotion in self.moves(turn, squares):
+                if captured < 0 and promotion < 0:
+                    if codes[index + (target - squares[i]) * self.weights[i] + flip] != INVALID:
+                        moves += 1
+                        legal = True
+                    continue
+                code = self.exit_code(turn, squares, i, target, captured, promotion)
+                if code == INVALID:
+                    continue
+                legal = True
+                if code == DRAW:
+                    draw = True
+                elif code % 2:
+                    # The opponent is lost after this move (an even distance)
+                    win = code if win is None else min(win, code)
+                else:
+                    loss = code if loss is None else max(loss, code)
+
+            offset = index - start
+            remaining[offset] = moves
+            if win is not None:
+                floors[offset] = INVALID
+                solved.append((index, win))
+            elif draw:
+                floors[offset] = INVALID
+            elif not legal:
+                king = squares[self.pieces.index((turn, KING))]
+                if self.attacked(king, 1 - turn, squares, set(squares)):
+                    solved.append((index, 0))
+                else:
+                    floors[offset] = INVALID
+            elif loss is not None:
+                floors[offset] = loss + 1
+                if moves == 0:
+                    solved.append((index, loss))
+        return start, bytes(remaining), bytes(floors), solved
+
+    def predecessors(self, indexes):
+        """
+        Unmoves solved positions to every position that reaches them with a quiet move.
+
+        Returns:
+            array: The predecessor indexes, including invalid ones.
+        """
+        found = array('Q')
+        for index in indexes:
+            turn, squares = self.decode(index)
+            mover = 1 - turn
+            flip = self.half if mover == 1 else -self.half
+            occupied = set(squares)
+            for i, (color, kind) in enumerate(self.pieces):
+                if color != mover:
+                    continue
+                origin = squares[i]
+                weight = self.weights[i]
+                if kind == PAWN:
+                    step = PAWN_STEPS[color]
+                    back = origin - step
+                    if 0 <= back < 64 and back not in occupied:
+                        found.append(index + (back - origin) * weight + flip)
+                        if (back - step) // 8 == PAWN_START_ROWS[color] and back - step not in occupied:
+                            found.append(index + (back - step - origin) * weight + flip)
+                elif kind == KING or kind == KNIGHT:
+                    for back in (KING_TARGETS if kind == KING else KNIGHT_TARGETS)[origin]:
+                        if back not in occupied:
+                            found.append(index + (back - origin) * weight + flip)
+                else:
+                    for ray in RAYS[kind][origin]:
+                        for back in ray:
+                            if back in occupied:
+                                break
+                            found.append(index + (back - origin) * weight + flip)
+        return found
+
+
+# Per-process worker state, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(signature: str, directory: str, memory_name: str):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _worker['memory'] = memory
+    _worker['generator'] = _Generator(signature, directory, memory.buf)
+
+
+def _validate(start: int, stop: int):
+    _worker['generator'].validate(start, stop)
+
+
+def _initialise(start: int, stop: int):
+    return _worker['generator'].initialise(start, stop)
+
+
+def _predecessors(indexes):
+    return _worker['generator'].predecessors(indexes)
+
+
+def _chunks(items, size: int):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def generate_table(signature: str, directory, workers: int = None):
+    """
+    Builds one table, and first any smaller table it needs that is not in the directory.
+
+    Args:
+        signature (str): The table to build, e.g. 'KRvK'.
+        directory: The directory tables are read from and written to.
+        workers (int): Worker processes, one per core if None; 1 builds in this process.
+
+    Returns:
+        Path: The table file.
+
+    Raises:
+        ValueError: If the signature is invalid or a mate is longer than the format can hold.
+    """
+    directory = Path(directory)
+    signature = format_signature(parse_signature(signature))
+    for sub in sorted(sub_signatures(signature)):
+        if not table_path(directory, sub).exists():
+            generate_table(sub, directory, workers)
+
+    workers = workers or os.cpu_count() or 1
+    size = table_size(signature)
+    ranges = [(start, min(start + CHUNK_SIZE, size)) for start in range(0, size, CHUNK_SIZE)]
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    pool = generator = None
+    try:
+        codes = memory.buf
+        if workers == 1:
+            generator = _Generator(signature, directory, codes)
+            validate, initialise, predecessors, map_ = generator.validate, generator.initialise, generator.predecessors, map
+        else:
+            pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(signature, str(directory), memory.name))
+            validate, initialise, predecessors, map_ = _validate, _initialise, _predecessors, pool.map
+        starts, stops = zip(*ranges)
+
+        list(map_(validate, starts, stops))
+
+        remaining = bytearray(size)
+        floors = bytearray(size)
+        # Positions waiting to be solved, by distance to mate in plies
+        buckets = {}
+        for start, chunk_remaining, chunk_floors, solved in map_(initialise, starts, stops):
+            remaining[start:start + len(chunk_remaining)] = chunk_remaining
+            floors[start:start + len(chunk_floors)] = chunk_floors
+            for index, distance in solved:
+                buckets.setdefault(distance, array('Q')).append(index)
+
+        distance = 0
+        while buckets:
+            if distance > MAX_DTM:
+                raise ValueError(f'{signature} has mates longer than {MAX_DTM} plies')
+            frontier = array('Q')
+            for index in buckets.pop(distance, ()):
+                if codes[index] == DRAW:
+                    codes[index] = distance + 1
+                    frontier.append(index)
+
+            for found in map_(predecessors, _chunks(frontier, CHUNK_SIZE)):
+                if distance % 2 == 0:
+                    # Moving into a lost position wins
+                    wins = buckets.setdefault(distance + 1, array('Q'))
+                    wins.extend(index for index in found if codes[index] == DRAW)
+                    continue
+                for index in found:
+                    if codes[index] != DRAW:
+                        continue
+                    remaining[index] -= 1
+                    if remaining[index] == 0 and floors[index] != INVALID:
+                        # Every move loses: the loser takes the longest way
+                        loss = max(distance + 1, floors[index] - 1)
+                        buckets.setdefault(loss, array('Q')).append(index)
+            distance += 1
+
+        path = table_path(directory, signature)
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(parse_signature(signature)), signature.encode('ascii')))
+            file.write(codes[:size])
+        return path
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if generator is not None:
+            generator.close()
+        memory.close()
+        memory.unlink()
+
+
+class Tablebase:
+    def __init__(self, directory):
+        """
+        Opens the tables in a directory, each on first use.
+
+        Args:
+            directory: The directory holding the table files.
+        """
+        self.directory = Path(directory)
+        self.tables = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _table(self, signature: str):
+        if signature not in self.tables:
+            path = table_path(self.directory, signature)
+            self.tables[signature] = TableFile(path) if path.exists() else None
+        return self.tables[signature]
+
+    def probe(self, position: Position):
+        """
+        Looks up a position.
+
+        Args:
+            position (Position): The position to look up.
+
+        Returns:
+            tuple[int, int]: (wdl, distance) where wdl is 1, 0 or -1 for a win, draw or loss of the
+            side to move and distance the plies to mate, None for draws. None when the position has
+            too many pieces, castling rights or no table.
+        """
+        pieces = [(int(piece.piece_name[0] == 'b'), KINDS.index(piece.piece_name[2:]), piece.position[1] * 8 + piece.position[0])
+                  for color in 'wb' for piece in position.pieces[color]]
+        if len(pieces) > MAX_PIECES or position.castling_rights:
+            return None
+        signature, index = table_index(int(position.turn == 'b'), pieces)
+        table = self._table(signature)
+        if table is None:
+            return None
+        code = table[index]
+        if code == INVALID:
+            return None
+        if code == DRAW:
+            return 0, None
+        return (1 if code % 2 == 0 else -1), code - 1
+
+    def best_move(self, position: Position):
+        """
+        Finds the move that wins fastest, holds a draw or loses slowest.
+
+        Args:
+            position (Position): The position to move in, left unchanged.
+
+        Returns:
+            tuple: (start, end, promotion) of the move, or None when the position is not in the tables
+            or has no legal move.
+        """
+        if self.probe(position) is None:
+            return None
+        best = None
+        best_score = None
+        for start, ends in position.get_legal_moves_by_square().items():
+            for end in ends:
+                for promotion in PROMOTION_PIECES if position.is_promotion(start, end) else (None,):
+                    position.make_move(start, end, promotion or 'queen')
+                    result = self.probe(position)
+                    position.unmake_move()
+                    if result is None:
+                        return None
+                    wdl, distance = result
+                    # wdl is the opponent's: their quick losses first, then draws, then their slow wins
+                    score = (wdl, distance if wdl < 0 else -(distance or 0))
+                    if best_score is None or score < best_score:
+                        best, best_score = (start, end, promotion), score
+        return best
+
+    def close(self):
+        """
+        Unmaps every open table.
+        """
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables = {}
+
+
+if __name__ == '__main__':
+    import argparse
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Build endgame tablebases for Chess Without En Passant')
+    parser.add_argument('signatures', nargs='+', help='tables to build, e.g. KQvK KRvK KPvK')
+    parser.add_argument('--directory', default='tablebases', help='where tables are read and written')
+    parser.add_argument('--workers', type=int, help='worker processes, one per core by default')
+    args = parser.parse_args()
+
+    Path(args.directory).mkdir(parents=True, exist_ok=True)
+    for signature in args.signatures:
+        start_time = perf_counter()
+        path = generate_table(signature, args.directory, args.workers)
+        with open(path, 'rb') as file:
+            codes = file.read()[HEADER.size:]
+        wins = sum(codes.count(code) for code in range(2, 255, 2))
+        losses = sum(codes.count(code) for code in range(1, 255, 2))
+        longest = max((code for code in range(1, 255) if code in codes), default=1) - 1
+        print(f'{path.name}: {wins:,} wins, {losses:,} losses, {codes.count(DRAW):,} draws, '
+              f'longest mate {longest} plies, {perf_counter() - start_time:.1f}s')
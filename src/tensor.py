@@ -0,0 +1,225 @@
+"""
+NumPy board tensors for Chess Without En Passant.
+
+Positions become one-hot piece planes for training evaluation models:
+
+    pieces     (N, 12, 8, 8)  one plane per piece in bitboard.PIECE_NAMES order,
+                              indexed [position, plane, y, x] with y = 0 on rank 8 as in FEN
+    turn       (N,)           0 for white to move, 1 for black, as in tablebase indexes
+    castling   (N, 4)         the K, Q, k and q rights
+
+Each position is first packed into 64 one-byte square codes (0 for empty, plane + 1
+otherwise) by walking only the pieces it has. Everything after that, the one-hot
+expansion, stacking into input planes and the way back, is whole-array NumPy work
+with no per-square Python loop.
+"""
+from bitboard import PIECE_NAMES
+from fen import CASTLING_LETTERS, PIECE_LETTERS
+from rules import Position
+import numpy as np
+import re
+
+PIECE_CODES = {piece_name: code for code, piece_name in enumerate(PIECE_NAMES, 1)}
+CASTLING_FLAGS = np.array([right for _, right in CASTLING_LETTERS], dtype=np.uint8)
+CODE_LETTERS = np.array(['1'] + [PIECE_LETTERS[piece_name] for piece_name in PIECE_NAMES])
+PLANE_COUNT = len(PIECE_NAMES) + 1 + len(CASTLING_LETTERS)  # Planes written by stack_planes
+_EMPTY_RUN = re.compile('1+')
+
+
+def encode_codes(positions):
+    """
+    Packs positions into square codes, touching only the pieces each one has.
+
+    Args:
+        positions (Iterable[Position]): The positions. A generator that mutates one position, such as a game
+            being replayed, works as well, since each position is read before the next is asked for.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (codes, turn, castling) where codes is (N, 64) uint8
+        indexed y * 8 + x, turn is (N,) uint8 and castling is (N,) uint8 zobrist castling masks.
+    """
+    codes = bytearray()
+    turns = bytearray()
+    rights = bytearray()
+    for position in positions:
+        offset = len(codes)
+        codes.extend(bytes(64))
+        for color in 'wb':
+            for piece in position.pieces[color]:
+                x, y = piece.position
+                codes[offset + y * 8 + x] = PIECE_CODES[piece.piece_name]
+        turns.append(position.turn == 'b')
+        rights.append(position.castling_rights)
+    return (np.frombuffer(codes, dtype=np.uint8).reshape(-1, 64), np.frombuffer(turns, dtype=np.uint8),
+            np.frombuffer(rights, dtype=np.uint8))
+
+
+def codes_to_planes(codes, dtype=np.uint8):
+    """
+    Expands square codes into one-hot piece planes.
+
+    Args:
+        codes (np.ndarray): (N, 64) square codes from encode_codes.
+        dtype: The element type of the planes, such as np.uint8 or np.float32.
+
+    Returns:
+        np.ndarray: (N, 12, 8, 8) contiguous planes.
+    """
+    codes = np.asarray(codes, dtype=np.uint8).reshape(-1, 1, 8, 8)
+    planes = codes == np.arange(1, len(PIECE_NAMES) + 1, dtype=np.uint8).reshape(1, -1, 1, 1)
+    # A bool array already holds the bytes 0 and 1, so uint8 planes are a view rather than a copy
+    return planes.view(np.uint8) if np.dtype(dtype) == np.uint8 else planes.astype(dtype)
+
+
+def planes_to_codes(planes):
+    """
+    Collapses one-hot piece planes back into square codes.
+
+    Args:
+        planes (np.ndarray): (N, 12, 8, 8) planes of any numeric type.
+
+    Returns:
+        np.ndarray: (N, 64) uint8 square codes.
+
+    Raises:
+        ValueError: If the planes have the wrong shape or put two pieces on a square.
+    """
+    planes = np.asarray(planes)
+    if planes.ndim != 4 or planes.shape[1:] != (len(PIECE_NAMES), 8, 8):
+        raise ValueError(f'Expected planes of shape (N, {len(PIECE_NAMES)}, 8, 8), got {planes.shape}')
+    # One whole-batch pass per plane adds its code where it is set and counts the pieces on each square
+    codes = np.zeros((len(planes), 64), dtype=np.uint8)
+    counts = np.zeros((len(planes), 64), dtype=np.uint8)
+    for code in range(1, len(PIECE_NAMES) + 1):
+        occupied = (planes[:, code - 1] != 0).reshape(-1, 64).view(np.uint8)
+        counts += occupied
+        codes += occupied * np.uint8(code)
+    if (counts > 1).any():
+        raise ValueError('Planes put more than one piece on a square')
+    return codes
+
+
+def castling_planes(castling):
+    """
+    Splits zobrist castling masks into one flag per right.
+
+    Args:
+        castling (np.ndarray): (N,) castling masks.
+
+    Returns:
+        np.ndarray: (N, 4) uint8 flags for the K, Q, k and q rights.
+    """
+    return ((np.asarray(castling, dtype=np.uint8).reshape(-1, 1) & CASTLING_FLAGS) != 0).view(np.uint8)
+
+
+def encode_positions(positions, dtype=np.uint8):
+    """
+    Turns positions into piece planes, side to move and castling rights.
+
+    Args:
+        positions (Iterable[Position]): The positions; see encode_codes.
+        dtype: The element type of the piece planes, such as np.uint8 or np.float32.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (pieces, turn, castling) of shapes (N, 12, 8, 8),
+        (N,) and (N, 4).
+    """
+    codes, turn, castling = encode_codes(positions)
+    return codes_to_planes(codes, dtype), turn, castling_planes(castling)
+
+
+def stack_planes(pieces, turn, castling, dtype=None):
+    """
+    Stacks piece planes with constant side-to-move and castling planes into one network input.
+
+    Args:
+        pieces (np.ndarray): (N, 12, 8, 8) piece planes.
+        turn (np.ndarray): (N,) side to move.
+        castling (np.ndarray): (N, 4) castling flags.
+        dtype: The element type of the result, defaults to that of pieces.
+
+    Returns:
+        np.ndarray: (N, 17, 8, 8) planes: the 12 piece planes, the side to move and the four rights.
+    """
+    pieces = np.asarray(pieces)
+    stacked = np.empty((len(pieces), PLANE_COUNT, 8, 8), dtype=dtype or pieces.dtype)
+    stacked[:, :len(PIECE_NAMES)] = pieces
+    stacked[:, len(PIECE_NAMES)] = np.asarray(turn).reshape(-1, 1, 1)
+    stacked[:, len(PIECE_NAMES) + 1:] = np.asarray(castling).reshape(-1, len(CASTLING_LETTERS), 1, 1)
+    return stacked
+
+
+def decode_positions(pieces, turn=None, castling=None, position_class=Position):
+    """
+    Rebuilds positions from piece planes, the reverse of encode_positions.
+
+    Args:
+        pieces (np.ndarray): (N, 12, 8, 8) piece planes.
+        turn (np.ndarray): (N,) side to move, white for every position if None.
+        castling (np.ndarray): (N, 4) castling flags, no rights if None.
+        position_class: Position or a subclass to build.
+
+    Returns:
+        list[Position]: The positions, with the move counters at 0 and 1.
+
+    Raises:
+        ValueError: If the planes are malformed or a castling right does not match the pieces.
+    """
+    return [position_class(fen) for fen in decode_fens(pieces, turn, castling)]
+
+
+def decode_fens(pieces, turn=None, castling=None):
+    """
+    Writes piece planes as FEN, the cheaper half of decode_positions.
+
+    Args:
+        pieces (np.ndarray): (N, 12, 8, 8) piece planes.
+        turn (np.ndarray): (N,) side to move, white for every position if None.
+        castling (np.ndarray): (N, 4) castling flags, no rights if None.
+
+    Returns:
+        list[str]: One FEN per position.
+
+    Raises:
+        ValueError: If the planes are malformed.
+    """
+    # Letters for all squares at once; only compressing runs of empty squares is per position
+    rows = CODE_LETTERS[planes_to_codes(pieces)].reshape(-1, 8, 8)
+    count = len(rows)
+    turn = np.zeros(count, dtype=np.uint8) if turn is None else np.asarray(turn).reshape(count)
+    castling = np.zeros((count, len(CASTLING_LETTERS)), dtype=np.uint8) if castling is None else np.asarray(castling).reshape(count, -1)
+
+    fens = []
+    for letters, black, rights in zip(rows.tolist(), turn.tolist(), castling.tolist()):
+        placement = '/'.join(_EMPTY_RUN.sub(lambda run: str(len(run.group())), ''.join(row)) for row in letters)
+        castling_field = ''.join(letter for (letter, _), flag in zip(CASTLING_LETTERS, rights) if flag) or '-'
+        fens.append(f'{placement} {"b" if black else "w"} {castling_field} - 0 1')
+    return fens
+
+
+if __name__ == '__main__':
+    import argparse
+    from gamerecord import GameArchive
+    from time import perf_counter
+
+    parser = argparse.ArgumentParser(description='Export every position of a game record file as NumPy tensors')
+    parser.add_argument('records', help='game record file to read')
+    parser.add_argument('--output', required=True, help='.npz file to write with pieces, turn and castling arrays')
+    parser.add_argument('--float', action='store_true', help='write float32 piece planes instead of uint8')
+    args = parser.parse_args()
+
+    def archive_positions(archive):
+        for game in range(len(archive)):
+            cursor = archive.cursor(game)
+            for ply in range(len(cursor) + 1):
+                yield cursor.seek(ply)
+
+    start_time = perf_counter()
+    with GameArchive(args.records) as archive:
+        codes, turn, castling = encode_codes(archive_positions(archive))
+    encoded = perf_counter()
+    pieces = codes_to_planes(codes, np.float32 if args.float else np.uint8)
+    expanded = perf_counter()
+    np.savez(args.output, pieces=pieces, turn=turn, castling=castling_planes(castling))
+    print(f'{len(codes)} positions: replayed and packed in {encoded - start_time:.2f}s, '
+          f'expanded in {expanded - encoded:.3f}s, {pieces.nbytes:,} bytes of planes')
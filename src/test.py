@@ -1,7 +1,32 @@
 from piece import Piece
 from chessboard import Chessboard
+from main import Main, RESULT_SHOWN
+from audio import Audio, get_audio
+from assets import Assets, get_assets
+from unittest import mock
+from engine import EXACT, LOWER, Engine, TranspositionTable
+from parallel import ParallelEngine, SharedTranspositionTable
+from perft import PERFT_POSITIONS, build_position, divide, perft, run_suite
+from simulate import MOVE_LIMIT_RESULT, play_game, simulate, summarize
+from rules import LEGAL_MOVE_CACHE_SIZE, AttackMap, Position, RulesPiece, decode_move, encode_move, parse_move, is_square_attacked, get_move_backend, set_move_backend
+import random
+from zobrist import BLACK_KINGSIDE, BLACK_QUEENSIDE, compute_hash
+from fen import START_FEN, format_epd, format_fen, parse_epd
+from pgn import PGNWriter, move_to_san, parse_san, read_games
+from gamerecord import GameArchive, GameRecordWriter, convert_pgn
+from book import MAX_WEIGHT, BookBuilder, OpeningBook, build_book
+from tablebase import INVALID, TableFile, Tablebase, generate_table, parse_signature, sub_signatures, table_path
+from tensor import codes_to_planes, decode_positions, encode_codes, encode_positions, planes_to_codes, stack_planes
+from batchmoves import batch_legal_moves, legal_move_arrays, legal_move_masks
+from bitboard import PIECE_NAMES, BitboardPosition
+from pathlib import Path
+import numpy as np
+import io
+import tempfile
+import subprocess
 import unittest
 import pygame
+import sys
 
 class TestChess(unittest.TestCase):
     @classmethod
@@ -211,6 +236,20 @@ class TestChess(unittest.TestCase):
         result = king.no_possible_legal_moves(chessboard, 'w')
         self.assertEqual(result, True, "Test Failed: Incorrect checkmate detection.")
 
+    def test_chessboard_make_move(self):
+        chessboard = Chessboard()
+        king = chessboard.board[4][7]
+        for start, end in [((6, 7), (5, 5)), ((6, 0), (5, 2)), ((6, 6), (6, 5)), ((6, 1), (6, 2)), ((5, 7), (6, 6)), ((5, 0), (6, 1))]:
+            chessboard.make_move(start, end)
+        chessboard.make_move((4, 7), (6, 7))
+        rook = chessboard.board[5][7]
+        self.assertEqual((king.position, rook.piece_name), ((6, 7), 'w_rook'), "Test Failed: Incorrect castling move.")
+        self.assertEqual(rook.rect.center, (5.5 * 80, 7.5 * 80), "Test Failed: Rook sprite did not follow the move.")
+
+        chessboard.unmake_move()
+        self.assertEqual(chessboard.board[7][7], rook, "Test Failed: Castling was not taken back.")
+        self.assertEqual(rook.rect.center, (7.5 * 80, 7.5 * 80), "Test Failed: Rook sprite did not return.")
+
     def test_get_castling_moves(self):
         king = Piece('w_king', (4, 7))
         rook1 = Piece('w_rook', (1, 7))
@@ -230,5 +269,1110 @@ class TestChess(unittest.TestCase):
         expected_moves = {(6, 7)}
         self.assertEqual(result, expected_moves, "Test Failed: Incorrect castling moves.")
 
+    def test_get_castling_moves_through_attacked_square(self):
+        king = Piece('w_king', (4, 7))
+        rook1 = Piece('w_rook', (0, 7))
+        rook2 = Piece('w_rook', (7, 7))
+        enemy_piece = Piece('b_rook', (5, 0))
+        board = [
+            [None, None, None, None, None, None, None, rook1],
+            [None, None, None, None, None, None, None, None],
+            [None, None, None, None, None, None, None, None],
+            [None, None, None, None, None, None, None, None],
+            [None, None, None, None, None, None, None, king],
+            [enemy_piece, None, None, None, None, None, None, None],
+            [None, None, None, None, None, None, None, None],
+            [None, None, None, None, None, None, None, rook2]
+        ]
+
+        result = king.get_castling_moves(board)
+        expected_moves = {(2, 7)}
+        self.assertEqual(result, expected_moves, "Test Failed: King may not castle through an attacked square.")
+
+class TestAssets(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.init()
+        cls.screen = pygame.display.set_mode((640, 640))
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.quit()
+
+    def test_atlas_images(self):
+        assets = Assets()
+        self.assertEqual(assets.get_image('w_queen').get_size(), (64, 64), "Test Failed: Piece image not pre-scaled.")
+        self.assertEqual(assets.get_image('dark_square').get_size(), (80, 80), "Test Failed: Square image not cropped.")
+        self.assertIs(assets.get_image('b_pawn').get_parent(), assets.atlas, "Test Failed: Image should come from the atlas.")
+        self.assertEqual(assets.board_background.get_size(), (640, 640), "Test Failed: Board background size.")
+
+    def test_display_board_without_file_access(self):
+        chessboard = Chessboard()
+        self.assertIs(chessboard.board[0][0].image, get_assets().get_image('b_rook'), "Test Failed: Pieces should share images.")
+        self.assertFalse(hasattr(chessboard.board[0][0], '__dict__'), "Test Failed: Pieces should only use slots.")
+        with mock.patch('pygame.image.load', side_effect=AssertionError('Test Failed: Image loaded while drawing.')):
+            chessboard.display_board(self.screen)
+
+    def test_render_dirty_squares(self):
+        chessboard = Chessboard()
+        chessboard.display_board(self.screen)
+        self.assertEqual(chessboard.render(self.screen), [], "Test Failed: Nothing should be redrawn.")
+
+        chessboard.make_move((4, 6), (4, 4))
+        rects = chessboard.render(self.screen)
+        self.assertEqual(sorted(map(tuple, rects)), [(320, 320, 80, 80), (320, 480, 80, 80)], "Test Failed: Incorrect dirty squares.")
+
+        full = self.screen.copy()
+        chessboard.display_board(full)
+        self.assertEqual(pygame.image.tostring(self.screen, 'RGB'), pygame.image.tostring(full, 'RGB'),
+                         "Test Failed: Incremental render differs from a full redraw.")
+
+    def test_overlays_are_reused(self):
+        chessboard = Chessboard()
+        chessboard.display_board(self.screen)
+        rect = chessboard.draw_overlay(self.screen, (0, 0), chessboard.config.red)
+        self.assertIs(get_assets().get_overlay(chessboard.config.red), get_assets().get_overlay(chessboard.config.red),
+                      "Test Failed: Overlay surface should be reused.")
+        self.assertEqual(chessboard.render(self.screen), [rect], "Test Failed: Overlay should be cleared on render.")
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.game = Main()
+        self.directory = tempfile.TemporaryDirectory()
+        self.game.config.paths['games'] = Path(self.directory.name) / 'games.pgn'
+        self.game.enter_menu()
+
+    def tearDown(self):
+        pygame.quit()
+        self.directory.cleanup()
+
+    def click(self, square):
+        self.game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(square[0] * 80 + 40, square[1] * 80 + 40), button=1))
+
+    def test_state_machine_plays_a_game(self):
+        self.game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.game.menu_buttons['play'].center, button=1))
+        self.assertEqual(self.game.state, 'select', "Test Failed: Play should start a game.")
+
+        self.click((4, 1))
+        self.assertEqual(self.game.state, 'select', "Test Failed: Black pieces cannot be selected on white's turn.")
+        self.click((5, 6))
+        self.assertEqual(self.game.state, 'target', "Test Failed: Clicking a white piece should select it.")
+        self.click((5, 3))
+        self.assertEqual(self.game.state, 'select', "Test Failed: An illegal target should drop the selection.")
+        self.assertEqual(self.game.chessboard.turn, 'w', "Test Failed: Nothing should have moved.")
+
+        for start, end in [((5, 6), (5, 5)), ((4, 1), (4, 3)), ((6, 6), (6, 4)), ((3, 0), (7, 4))]:
+            self.click(start)
+            self.click(end)
+        self.assertEqual(self.game.state, 'result', "Test Failed: Checkmate should end the game.")
+        self.assertEqual(self.game.result, 'Black Wins by Checkmate', "Test Failed: Incorrect result.")
+        with open(self.game.config.get_path('games')) as stream:
+            game = next(read_games(stream))
+        self.assertEqual(game['result'], '0-1', "Test Failed: Saved game has the wrong result.")
+        self.assertEqual(game['moves'], ['f2f3', 'e7e5', 'g2g4', 'd8h4'], "Test Failed: Saved game has the wrong moves.")
+
+        self.click((0, 0))
+        self.assertEqual(self.game.state, 'result', "Test Failed: Clicks should wait for the result timer.")
+        self.game.handle_event(pygame.event.Event(RESULT_SHOWN))
+        self.assertEqual(self.game.state, 'menu', "Test Failed: The menu should follow the result.")
+
+    def test_unwritable_archive_keeps_game_running(self):
+        self.game.config.paths['games'] = Path(self.directory.name) / 'missing' / 'games.pgn'
+        self.game.start_board()
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            for move in 'f2f3 e7e5 g2g4 d8h4'.split():
+                start, end, _ = parse_move(move)
+                self.click(start)
+                self.click(end)
+        self.assertEqual(self.game.state, 'result', "Test Failed: A failed save should still show the result.")
+        self.assertTrue(self.game.running, "Test Failed: A failed save should not stop the game.")
+        self.assertIn('Could not save the game', stderr.getvalue(), "Test Failed: A failed save should be reported.")
+
+    def test_selection_uses_cached_moves(self):
+        self.game.start_board()
+        chessboard = self.game.chessboard
+        with mock.patch.object(Position, 'get_legal_moves_by_square', wraps=chessboard.get_legal_moves_by_square) as sweep:
+            for _ in range(3):
+                self.click((6, 7))
+                self.click((6, 7))
+            self.assertEqual(sweep.call_count, 1, "Test Failed: Selecting pieces should reuse the position's moves.")
+            self.click((6, 7))
+            self.click((5, 5))
+            self.click((1, 0))
+            self.assertEqual(self.game.state, 'target', "Test Failed: Black should be able to select after the move.")
+            self.assertEqual(self.game.selected_piece.possible_moves, {(0, 2), (2, 2)}, "Test Failed: Incorrect knight moves.")
+            self.assertEqual(sweep.call_count, 2, "Test Failed: Legal moves should be generated once per position.")
+
+    def test_promotion_choice(self):
+        self.game.start_board()
+        for move in 'h2h4 g7g5 h4g5 h7h6 g5h6 f8g7 h6h7 e7e6'.split():
+            start, end, _ = parse_move(move)
+            self.click(start)
+            self.click(end)
+        self.click((7, 1))
+        self.click((6, 0))
+        self.assertEqual(self.game.state, 'promote', "Test Failed: Promotion should ask for a piece.")
+        knight_rect = dict(self.game.promotion_choices)['knight']
+        self.game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=knight_rect.center, button=1))
+        self.assertEqual(self.game.state, 'select', "Test Failed: Promotion should finish the move.")
+        self.assertEqual(self.game.chessboard.board[6][0].piece_name, 'w_knight', "Test Failed: Incorrect promotion.")
+
+    def test_quit(self):
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+        self.game.start_game()
+        self.assertFalse(self.game.running, "Test Failed: Closing the window should stop the loop.")
+
+
+class TestAudio(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pygame.init()
+
+    @classmethod
+    def tearDownClass(cls):
+        pygame.quit()
+
+    def setUp(self):
+        pygame.mixer.stop()
+
+    def test_effects_play_from_memory(self):
+        audio = Audio()
+        with mock.patch('pygame.mixer.music.load', side_effect=AssertionError('Test Failed: Effect loaded from disk.')):
+            audio.play_move()
+            audio.play_capture()
+        self.assertEqual(audio.channel_effects[:2], ['move', 'capture'], "Test Failed: Effects should overlap on free channels.")
+
+    def test_effect_restarts_on_its_channel(self):
+        audio = Audio()
+        audio.play_move()
+        audio.play_move()
+        self.assertEqual(audio.channel_effects.count('move'), 1, "Test Failed: An effect should not overlap itself.")
+
+    def test_priority_when_channels_are_busy(self):
+        audio = Audio(2)
+        audio.play_move()
+        audio.play_capture()
+        audio.play_check()
+        self.assertEqual(sorted(audio.channel_effects), ['capture', 'check'], "Test Failed: Check should cut off the move sound.")
+        audio.play_castle()
+        self.assertEqual(sorted(audio.channel_effects), ['capture', 'check'], "Test Failed: Castle cannot cut off equal priorities.")
+
+    def test_shared_audio(self):
+        self.assertIs(get_audio(), get_audio(), "Test Failed: Audio should be shared.")
+        self.assertIs(Piece('w_pawn', (0, 6)).audio, get_audio(), "Test Failed: Pieces should share the audio service.")
+
+
+class TestChessBitboard(TestChess):
+    def setUp(self):
+        set_move_backend('bitboard')
+
+    def tearDown(self):
+        set_move_backend('list')
+
+    def test_backends_agree_on_legal_moves(self):
+        rng = random.Random(7)
+        for _ in range(5):
+            position = Position()
+            for _ in range(60):
+                set_move_backend('list')
+                list_moves = position.get_legal_moves()
+                set_move_backend('bitboard')
+                bitboard_moves = position.get_legal_moves()
+                self.assertEqual(sorted(list_moves), sorted(bitboard_moves), "Test Failed: Backends disagree on legal moves.")
+                self.assertEqual(position.get_legal_moves_by_square(), {start: {end for s, end in list_moves if s == start} for start, _ in list_moves},
+                                 "Test Failed: Backends disagree on moves by square.")
+                self.assertEqual(position.has_any_legal_move(), bool(list_moves), "Test Failed: Backends disagree on having a move.")
+                if not list_moves:
+                    break
+                position.play_move(*rng.choice(sorted(list_moves)))
+
+    def test_pins_and_checks(self):
+        # The e2 knight is pinned, the f3 rook can only block and the g2 bishop can block or capture the checker
+        position = Position('4r1k1/8/8/8/8/5R2/4N1B1/4K2r w - - 0 1')
+        self.assertEqual(position.get_legal_moves_by_square(), {(5, 5): {(5, 7)}, (6, 6): {(5, 7), (7, 7)}, (4, 7): {(3, 6), (5, 6)}},
+                         "Test Failed: Incorrect moves under check with a pin.")
+        self.assertFalse(Position('rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3').has_any_legal_move(),
+                         "Test Failed: Checkmate should leave no legal move.")
+
+    def test_position_keeps_bitboards_current(self):
+        rng = random.Random(11)
+        position = Position('r3k2r/1P6/8/8/8/8/6p1/R3K2R w KQkq - 0 1')
+        for _ in range(40):
+            moves = position.get_legal_moves()
+            if not moves:
+                break
+            position.make_move(*rng.choice(sorted(moves)), rng.choice(['queen', 'knight']))
+            fresh = BitboardPosition.from_board(position.board)
+            kept = position.bitboard
+            self.assertEqual((kept.pieces, kept.squares, kept.unmoved, kept.turn), (fresh.pieces, fresh.squares, fresh.unmoved, position.turn),
+                             "Test Failed: Bitboards drifted from the board.")
+        while position.move_stack:
+            position.unmake_move()
+        fresh = BitboardPosition.from_board(position.board)
+        self.assertEqual((position.bitboard.pieces, position.bitboard.unmoved), (fresh.pieces, fresh.unmoved),
+                         "Test Failed: Bitboards drifted after taking moves back.")
+
+        with mock.patch.object(BitboardPosition, 'from_board', side_effect=AssertionError('converted')):
+            for piece in position.pieces['w']:
+                piece.get_possible_moves(position.board)
+            position.get_legal_moves_by_square()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            set_move_backend('magic')
+
+
+class TestPerft(unittest.TestCase):
+    def test_perft_corpus(self):
+        for backend in ('list', 'bitboard'):
+            for name, (moves, counts) in PERFT_POSITIONS.items():
+                position = build_position(moves, backend)
+                for depth, expected in enumerate(counts[:2], start=1):
+                    self.assertEqual(perft(position, depth), expected, f"Test Failed: Incorrect perft for {name} on {backend}.")
+
+    def test_perft_start_depth_3(self):
+        for backend in ('list', 'bitboard'):
+            self.assertEqual(perft(build_position('', backend), 3), 8902, f"Test Failed: Incorrect perft on {backend}.")
+
+    def test_perft_position_on_bitboard_backend(self):
+        set_move_backend('bitboard')
+        try:
+            for name, (moves, counts) in PERFT_POSITIONS.items():
+                position = build_position(moves)
+                self.assertIsInstance(position, Position, "Test Failed: Position expected.")
+                self.assertEqual(perft(position, 2), counts[1], f"Test Failed: Incorrect perft for {name} on Position with bitboards.")
+        finally:
+            set_move_backend('list')
+
+    def test_suite_covers_position_on_each_backend(self):
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(run_suite(1), [], "Test Failed: The suite should pass.")
+        self.assertEqual([line.split(':')[0] for line in stdout.getvalue().splitlines()],
+                         ['Position (list)', 'Position (bitboard)', 'BitboardPosition'], "Test Failed: Incorrect suite runs.")
+        self.assertEqual(get_move_backend(), 'list', "Test Failed: The suite should restore the backend.")
+
+    def test_divide(self):
+        position = build_position(PERFT_POSITIONS['promotion'][0])
+        counts = divide(position, 2)
+        self.assertEqual(sum(counts.values()), 761, "Test Failed: Divide does not add up.")
+        self.assertIn('h7g8n', counts, "Test Failed: Promotion choices missing from divide.")
+
+
+class TestRules(unittest.TestCase):
+    def test_rules_import_without_pygame(self):
+        result = subprocess.run([sys.executable, '-c', 'import rules, sys; rules.Position(); assert "pygame" not in sys.modules'],
+                                capture_output=True)
+        self.assertEqual(result.returncode, 0, "Test Failed: rules module should not import pygame.")
+
+    def test_position_start(self):
+        position = Position()
+        self.assertIsInstance(position.board[4][7], RulesPiece, "Test Failed: Missing white king.")
+        self.assertEqual(len(position.get_legal_moves()), 20, "Test Failed: Incorrect number of opening moves.")
+        self.assertFalse(position.get_result(), "Test Failed: Start position should be ongoing.")
+
+    def test_position_checkmate(self):
+        position = Position()
+        for start, end in [((5, 6), (5, 5)), ((4, 1), (4, 3)), ((6, 6), (6, 4)), ((3, 0), (7, 4))]:
+            position.play_move(start, end)
+        self.assertEqual(position.get_result(), 'Black Wins by Checkmate', "Test Failed: Incorrect checkmate detection.")
+
+    def test_status_is_cached(self):
+        position = build_position('f2f3 e7e5 g2g4')
+        with mock.patch.object(Position, 'has_any_legal_move', wraps=position.has_any_legal_move) as sweep:
+            status = position.get_status()
+            self.assertIs(position.get_status(), status, "Test Failed: Status should be cached.")
+            self.assertFalse(position.get_result(), "Test Failed: Game should be ongoing.")
+            self.assertEqual(sweep.call_count, 1, "Test Failed: Legal moves swept more than once.")
+            position.make_move((3, 0), (7, 4))
+            status = position.get_status()
+            self.assertTrue(status.check and status.checkmate and status.is_over, "Test Failed: Checkmate not detected.")
+            self.assertEqual(position.get_result(), 'Black Wins by Checkmate', "Test Failed: Incorrect result.")
+            self.assertEqual(sweep.call_count, 2, "Test Failed: Status not recomputed once after a move.")
+        position.unmake_move()
+        self.assertFalse(position.get_status().check, "Test Failed: Stale status after unmake.")
+
+    def test_legal_move_cache(self):
+        position = build_position('e2e4 e7e5 g1f3')
+        moves = position.get_cached_legal_moves()
+        self.assertEqual(moves, position.get_legal_moves_by_square(), "Test Failed: Cached moves differ from generated ones.")
+        self.assertIs(position.get_cached_legal_moves(), moves, "Test Failed: Moves should be cached.")
+        position.make_move((1, 0), (2, 2))
+        self.assertIsNot(position.get_cached_legal_moves(), moves, "Test Failed: Stale moves after a move.")
+        position.unmake_move()
+        self.assertIs(position.get_cached_legal_moves(), moves, "Test Failed: Moves should survive make and unmake.")
+
+        for move in 'b8c6 f1b5 g8f6 e1g1 f8c5 b1c3 d7d6 d2d3 c8g4 h2h3 g4h5 g2g4 h5g6 c1e3 d8d7 a2a3'.split():
+            position.play_move(*parse_move(move)[:2])
+            position.get_cached_legal_moves()
+        self.assertEqual(len(position._legal_move_cache), LEGAL_MOVE_CACHE_SIZE, "Test Failed: Cache should be bounded.")
+        self.assertNotIn(moves, position._legal_move_cache.values(), "Test Failed: Oldest moves should be dropped.")
+
+    def test_piece_index(self):
+        def assert_index_matches(position, context):
+            for color in 'wb':
+                pieces = {piece for column in position.board for piece in column if piece is not None and piece.piece_name[0] == color}
+                self.assertEqual(position.pieces[color], pieces, f"Test Failed: Stale {color} pieces after {context}.")
+                kings = [piece for piece in pieces if piece.piece_name == color + '_king']
+                self.assertIs(position.get_king(color), kings[0] if kings else None, f"Test Failed: Stale {color} king after {context}.")
+
+        # Castling both ways, captures, a promotion with capture and a king walk
+        position = Position('r3k2r/6P1/8/8/8/8/p7/RN2K2R w KQkq - 0 1')
+        moves = 'e1g1 e8c8 g7h8q a2b1q h8d8 c8d8'.split()
+        for move in moves:
+            position.play_move(*parse_move(move))
+            assert_index_matches(position, move)
+        self.assertEqual(len(position.pieces['b']), 2, "Test Failed: Captured pieces should leave the index.")
+        for move in reversed(moves):
+            position.unmake_move()
+            assert_index_matches(position, f'taking back {move}')
+        self.assertEqual(position.to_fen(), 'r3k2r/6P1/8/8/8/8/p7/RN2K2R w KQkq - 0 1', "Test Failed: Moves not taken back.")
+        assert_index_matches(position.copy(), 'copy')
+
+    def test_threefold_repetition(self):
+        position = build_position('g1f3 g8f6 f3g1 f6g8')
+        self.assertEqual(position.get_status().repetitions, 2, "Test Failed: Incorrect repetition count.")
+        self.assertFalse(position.get_result(), "Test Failed: Two occurrences are not a draw.")
+        for move in 'g1f3 g8f6 f3g1 f6g8'.split():
+            position.make_move(*parse_move(move)[:2])
+        self.assertTrue(position.get_status().threefold_repetition, "Test Failed: Threefold repetition not detected.")
+        self.assertEqual(position.get_result(), 'Draw by Threefold Repetition', "Test Failed: Incorrect result.")
+        position.unmake_move()
+        self.assertFalse(position.get_result(), "Test Failed: Repetition should be undone with the move.")
+
+        # Losing the castling rights makes the same placement a different position
+        position = build_position('e2e4 e7e5 e1e2 e8e7 e2e1 e7e8 e1e2 e8e7 e2e1 e7e8')
+        self.assertEqual(position.get_status().repetitions, 2, "Test Failed: Castling rights ignored.")
+
+    def test_fifty_move_rule(self):
+        position = Position.from_fen('7k/8/8/8/8/8/8/R6K w - - 99 80')
+        self.assertFalse(position.get_result(), "Test Failed: 99 plies are not a draw.")
+        position.make_move((0, 7), (0, 6))
+        self.assertTrue(position.get_status().fifty_moves, "Test Failed: Fifty-move rule not detected.")
+        self.assertEqual(position.get_result(), 'Draw by Fifty-Move Rule', "Test Failed: Incorrect result.")
+        position = Position.from_fen('7k/8/6K1/8/8/8/8/R7 w - - 99 80')
+        position.make_move((0, 7), (0, 0))
+        self.assertEqual(position.get_result(), 'White Wins by Checkmate', "Test Failed: Mate should beat the fifty-move rule.")
+
+    def test_insufficient_material(self):
+        for fen, insufficient in [('k7/8/8/8/8/8/8/K7 w - - 0 1', True), ('k7/8/8/8/8/8/8/KN6 w - - 0 1', True),
+                                  ('k7/8/8/8/8/8/8/KB1b4 w - - 0 1', True), ('k7/8/8/8/8/8/8/KBb5 w - - 0 1', False),
+                                  ('k7/8/8/8/8/8/8/KNN5 w - - 0 1', False), ('k7/8/8/8/8/8/8/KP6 w - - 0 1', False)]:
+            position = Position.from_fen(fen)
+            self.assertEqual(position.get_status().insufficient_material, insufficient, f"Test Failed: Incorrect material for {fen}.")
+            self.assertEqual(position.get_result() == 'Draw by Insufficient Material', insufficient, f"Test Failed: Incorrect result for {fen}.")
+
+    def test_is_square_attacked(self):
+        position = Position()
+        self.assertTrue(is_square_attacked(position.board, (4, 5), 'w'), "Test Failed: Pawn diagonal should attack.")
+        self.assertFalse(is_square_attacked(position.board, (4, 4), 'w'), "Test Failed: Pawn push should not attack.")
+        self.assertTrue(is_square_attacked(position.board, (5, 5), 'w'), "Test Failed: Knight should attack.")
+        self.assertFalse(is_square_attacked(position.board, (3, 3), 'b'), "Test Failed: Square should be safe.")
+
+    def test_attack_map_stays_in_sync(self):
+        rng = random.Random(3)
+        position = Position()
+        for _ in range(80):
+            moves = position.get_legal_moves()
+            if not moves:
+                break
+            position.play_move(*rng.choice(sorted(moves)))
+            fresh = AttackMap(position.board)
+            for color in 'wb':
+                for x in range(8):
+                    for y in range(8):
+                        expected = is_square_attacked(position.board, (x, y), color)
+                        self.assertEqual(position.is_square_attacked((x, y), color), expected, "Test Failed: Stale attack map.")
+                        self.assertEqual(fresh.is_attacked((x, y), color), expected, "Test Failed: Incorrect attack map.")
+
+    def test_make_unmake_move(self):
+        def snapshot(position):
+            return [(piece.piece_name, piece.position, piece.on_starting_square) if piece else None
+                    for column in position.board for piece in column], position.turn
+
+        rng = random.Random(11)
+        position = Position()
+        for _ in range(120):
+            moves = position.get_legal_moves()
+            if not moves:
+                break
+            before = snapshot(position)
+            for start, end in moves:
+                position.make_move(start, end, 'knight')
+                self.assertEqual(position.unmake_move(), (start, end), "Test Failed: Incorrect move taken back.")
+                self.assertEqual(snapshot(position), before, "Test Failed: unmake_move did not restore the position.")
+            position.make_move(*rng.choice(sorted(moves)))
+
+        while position.move_stack:
+            position.unmake_move()
+        self.assertEqual(snapshot(position), snapshot(Position()), "Test Failed: Could not unwind to the start.")
+        fresh = AttackMap(position.board)
+        for x in range(8):
+            for y in range(8):
+                for color in 'wb':
+                    self.assertEqual(position.is_square_attacked((x, y), color), fresh.is_attacked((x, y), color),
+                                     "Test Failed: Stale attack map after unmake_move.")
+
+    def test_pinned_piece_moves_along_pin(self):
+        king = RulesPiece('w_king', (4, 7))
+        rook = RulesPiece('w_rook', (4, 5))
+        enemy_piece = RulesPiece('b_queen', (4, 0))
+        enemy_king = RulesPiece('b_king', (0, 0))
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for piece in (king, rook, enemy_piece, enemy_king):
+            x, y = piece.position
+            board[x][y] = piece
+
+        position = Position()
+        position.board = board
+        expected_moves = {(4, 6), (4, 4), (4, 3), (4, 2), (4, 1), (4, 0)}
+        self.assertEqual(position.get_legal_moves_by_square()[(4, 5)], expected_moves, "Test Failed: Pinned rook left the pin ray.")
+        self.assertTrue(position.has_any_legal_move(), "Test Failed: Position has legal moves.")
+
+    def test_double_check_only_king_moves(self):
+        king = RulesPiece('w_king', (4, 7))
+        rook = RulesPiece('w_rook', (0, 0))
+        enemy_rook = RulesPiece('b_rook', (4, 0))
+        enemy_knight = RulesPiece('b_knight', (3, 5))
+        enemy_king = RulesPiece('b_king', (7, 0))
+        board = [[None for _ in range(8)] for _ in range(8)]
+        for piece in (king, rook, enemy_rook, enemy_knight, enemy_king):
+            x, y = piece.position
+            board[x][y] = piece
+
+        position = Position()
+        position.board = board
+        moves = position.get_legal_moves_by_square()
+        self.assertEqual(list(moves), [(4, 7)], "Test Failed: Only the king may move in double check.")
+        self.assertNotIn((4, 6), moves[(4, 7)], "Test Failed: King may not stay on the checking ray.")
+
+    def test_king_cannot_retreat_along_check(self):
+        position = Position('4k3/8/8/8/r3K3/8/8/8 w - - 0 1')
+        self.assertEqual(position.get_legal_moves_by_square(), {(4, 4): {(3, 3), (4, 3), (5, 3), (3, 5), (4, 5), (5, 5)}},
+                         "Test Failed: The king may not step back along the checking ray.")
+
+    def test_position_checks_use_attack_map(self):
+        position = Position('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        king = position.get_king('w')
+        with mock.patch('rules.is_square_attacked', side_effect=AssertionError('scanned')):
+            self.assertFalse(king.is_in_check(position.board), "Test Failed: King is not in check.")
+            self.assertEqual(king.get_castling_moves(position.board), {(2, 7), (6, 7)}, "Test Failed: Incorrect castling moves.")
+            self.assertEqual(len(position.get_legal_moves_by_square()[(4, 7)]), 7, "Test Failed: Incorrect king moves.")
+
+    def test_zobrist_hash_incremental(self):
+        rng = random.Random(19)
+        position = Position()
+        self.assertEqual(position.hash, compute_hash(position.board, 'w'), "Test Failed: Incorrect start hash.")
+        for _ in range(150):
+            moves = position.get_legal_moves()
+            if not moves:
+                break
+            start, end = rng.choice(sorted(moves))
+            position.make_move(start, end, rng.choice(['queen', 'knight']))
+            self.assertEqual(position.hash, compute_hash(position.board, position.turn), "Test Failed: Stale hash after make_move.")
+            if rng.random() < 0.3:
+                position.unmake_move()
+                self.assertEqual(position.hash, compute_hash(position.board, position.turn), "Test Failed: Stale hash after unmake_move.")
+
+    def test_zobrist_hash_transpositions(self):
+        position = Position()
+        start_hash = position.hash
+        for start, end in [((6, 7), (5, 5)), ((6, 0), (5, 2)), ((5, 5), (6, 7)), ((5, 2), (6, 0))]:
+            position.play_move(start, end)
+        self.assertEqual(position.hash, start_hash, "Test Failed: Transposition should keep the hash.")
+
+        for start, end in [((4, 6), (4, 4)), ((4, 1), (4, 3)), ((4, 7), (4, 6)), ((4, 0), (4, 1)), ((4, 6), (4, 7)), ((4, 1), (4, 0))]:
+            position.play_move(start, end)
+        self.assertEqual(position.castling_rights, 0, "Test Failed: King moves should drop castling rights.")
+        self.assertEqual(position.hash, compute_hash(position.board, position.turn), "Test Failed: Stale hash.")
+
+    def test_position_illegal_move(self):
+        position = Position()
+        with self.assertRaises(ValueError):
+            position.play_move((4, 7), (4, 5))
+
+
+class TestFen(unittest.TestCase):
+    def test_start_fen(self):
+        self.assertEqual(Position().to_fen(), START_FEN, "Test Failed: Incorrect start FEN.")
+        self.assertEqual(Position.from_fen(START_FEN).hash, Position().hash, "Test Failed: FEN start position differs.")
+
+    def test_fen_round_trip(self):
+        for moves, _ in PERFT_POSITIONS.values():
+            position = build_position(moves)
+            fen = position.to_fen()
+            self.assertEqual(Position.from_fen(fen).to_fen(), fen, "Test Failed: FEN does not round-trip.")
+            self.assertEqual(Position.from_fen(fen).hash, position.hash, "Test Failed: FEN position hash differs.")
+
+    def test_fen_counters(self):
+        position = build_position('e2e4 e7e5 g1f3 b8c6 f1c4')
+        self.assertEqual(position.to_fen(), 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3',
+                         "Test Failed: Incorrect FEN after moves.")
+        position.unmake_move()
+        self.assertEqual(position.to_fen().split()[-2:], ['2', '3'], "Test Failed: Counters should be restored.")
+
+    def test_fen_castling_flags(self):
+        position = Position.from_fen('r3k2r/8/8/8/8/8/P7/R3K2R w Kq - 0 1')
+        self.assertTrue(position.board[7][7].on_starting_square, "Test Failed: Kingside rook keeps its right.")
+        self.assertFalse(position.board[0][7].on_starting_square, "Test Failed: Queenside rook lost its right.")
+        self.assertTrue(position.board[0][6].on_starting_square, "Test Failed: Pawn on its start rank.")
+        self.assertEqual(position.board[4][7].get_castling_moves(position.board), {(6, 7)}, "Test Failed: Incorrect castling moves.")
+
+    def test_invalid_fen(self):
+        for fen in ['8/8/8 w - - 0 1', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1',
+                    'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', '4k3/8/8/8/8/8/8/4K3 w K - 0 1']:
+            with self.assertRaises(ValueError):
+                Position.from_fen(fen)
+
+    def test_epd(self):
+        fen, operations = parse_epd('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 bm e5; id "open game";')
+        self.assertEqual(operations, {'bm': 'e5', 'id': 'open game'}, "Test Failed: Incorrect EPD operations.")
+        self.assertEqual(Position.from_fen(fen).to_fen().split()[3], '-', "Test Failed: En passant field should be '-'.")
+        self.assertEqual(format_epd(START_FEN, {'id': 'start'}), 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - id start;',
+                         "Test Failed: Incorrect EPD.")
+
+    def test_chessboard_from_fen_loads_nothing(self):
+        with mock.patch('pygame.image.load', side_effect=AssertionError), mock.patch('pygame.mixer.Sound', side_effect=AssertionError):
+            chessboard = Chessboard.from_fen(PERFT_POSITIONS['kiwipete'][0])
+        self.assertIsInstance(chessboard, Chessboard, "Test Failed: from_fen should build a Chessboard.")
+        self.assertEqual(len(chessboard.get_legal_moves()), 48, "Test Failed: Incorrect moves from FEN.")
+
+
+class TestPgn(unittest.TestCase):
+    def test_move_to_san(self):
+        position = Position.from_fen('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1')
+        self.assertEqual(move_to_san(position, (2, 4), (2, 3)), 'c5', "Test Failed: Incorrect pawn push.")
+        self.assertEqual(move_to_san(position, (5, 5), (3, 3)), 'Nd5', "Test Failed: Incorrect knight move.")
+        position = Position.from_fen('1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1')
+        self.assertEqual(move_to_san(position, (0, 1), (1, 0), 'knight'), 'axb8=N', "Test Failed: Incorrect promotion.")
+        position = build_position('e2e4 e7e5 g1f3 b8c6 f1c4 g8f6 e1g1')
+        self.assertEqual(move_to_san(position, (4, 0), (6, 0)), 'O-O', "Test Failed: Incorrect castling.")
+        position = build_position(PERFT_POSITIONS['mate_in_one'][0])
+        self.assertEqual(move_to_san(position, (3, 7), (7, 3)), 'Qh5#', "Test Failed: Incorrect mate.")
+        position = Position.from_fen('4k3/8/8/8/8/8/8/R4RK1 w - - 0 1')
+        self.assertEqual(move_to_san(position, (0, 7), (3, 7)), 'Rad1', "Test Failed: Incorrect disambiguation.")
+        self.assertEqual(move_to_san(position, (0, 7), (0, 0)), 'Ra8+', "Test Failed: Incorrect check.")
+
+    def test_parse_san(self):
+        position = Position.from_fen('4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1')
+        self.assertEqual(parse_san(position, 'Rhf1'), ((7, 7), (5, 7), None), "Test Failed: Incorrect disambiguated move.")
+        self.assertEqual(parse_san(position, 'O-O-O'), ((4, 7), (2, 7), None), "Test Failed: Incorrect castling.")
+        for san in ['Rb2', 'Nf3', 'e4', 'Rz1']:
+            with self.assertRaises(ValueError):
+                parse_san(position, san)
+
+    def test_writer_and_reader_round_trip(self):
+        stream = io.StringIO()
+        writer = PGNWriter(stream)
+        games = [play_game(game, seed=2, max_plies=120) for game in range(5)]
+        for game in games:
+            position = Position()
+            san_moves = []
+            for move in game['moves']:
+                start, end, promotion = parse_move(move)
+                san_moves.append(move_to_san(position, start, end, promotion))
+                position.make_move(start, end, promotion or 'queen')
+            writer.write_game(san_moves, '*', {'Round': game['game']})
+        self.assertTrue(all(len(line) <= 80 for line in stream.getvalue().splitlines()), "Test Failed: Lines too long.")
+
+        stream.seek(0)
+        read = list(read_games(stream))
+        self.assertEqual([game['moves'] for game in read], [game['moves'] for game in games], "Test Failed: Moves did not round-trip.")
+        self.assertEqual(read[3]['tags']['Round'], '3', "Test Failed: Tags did not round-trip.")
+
+    def test_tag_escapes_round_trip(self):
+        tags = {'Event': 'x "quoted"', 'Site': 'back\\slash \\"mixed\\"', 'Round': '\\'}
+        stream = io.StringIO()
+        PGNWriter(stream).write_game(['e4'], '*', tags)
+        stream.seek(0)
+        read = list(read_games(stream))
+        for name, value in tags.items():
+            self.assertEqual(read[0]['tags'][name], value, "Test Failed: Escaped tag did not round-trip.")
+
+    def test_reader_skips_annotations(self):
+        text = """[Event "Test"]
+[Result "1-0"]
+
+1. e4 {best by test} e5 2. Qh5 $1 (2. Nf3 Nc6 (2... d6)) Nc6 ; a comment
+3. Bc4 Nf6?? 4. Qxf7# 1-0
+
+[Event "Second"]
+
+1.d4 d5 *
+"""
+        games = list(read_games(io.StringIO(text)))
+        self.assertEqual(len(games), 2, "Test Failed: Incorrect number of games.")
+        self.assertEqual(games[0]['moves'][-1], 'h5f7', "Test Failed: Annotations confused the reader.")
+        self.assertEqual(games[0]['position'].get_result(), 'White Wins by Checkmate', "Test Failed: Game not replayed.")
+        self.assertEqual(games[1]['moves'], ['d2d4', 'd7d5'], "Test Failed: Incorrect second game.")
+
+    def test_reader_rejects_en_passant(self):
+        text = '1. e4 a6 2. e5 d5 3. exd6 *\n\n1. e4 *\n'
+        with self.assertRaises(ValueError):
+            list(read_games(io.StringIO(text)))
+        games = list(read_games(io.StringIO(text), skip_invalid=True))
+        self.assertEqual([game['moves'] for game in games], [['e2e4']], "Test Failed: Invalid game should be skipped.")
+
+
+    def test_reader_ends_games_outside_comments(self):
+        text = """1. e4 {a comment ending 1-0
+ still comment} e5 (1... c5 2. Nf3
+[Variation "not a tag"] 0-1) 2. Nf3 1-0
+
+1. d4 *
+"""
+        games = list(read_games(io.StringIO(text)))
+        self.assertEqual([game['moves'] for game in games], [['e2e4', 'e7e5', 'g1f3'], ['d2d4']],
+                         "Test Failed: Comments and variations should not end a game.")
+        self.assertEqual([game['result'] for game in games], ['1-0', '*'], "Test Failed: Incorrect results.")
+        self.assertEqual(games[0]['tags'], {}, "Test Failed: A tag inside a variation should be ignored.")
+
+    def test_reader_rejects_bad_fen(self):
+        text = '[FEN "bogus"]\n\n1. e4 *\n\n1. d4 *\n'
+        with self.assertRaisesRegex(ValueError, r'^Game 1: '):
+            list(read_games(io.StringIO(text)))
+        games = list(read_games(io.StringIO(text), skip_invalid=True))
+        self.assertEqual([game['moves'] for game in games], [['d2d4']], "Test Failed: Game with a bad FEN should be skipped.")
+
+
+class TestGameRecord(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'games.cwg'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        games = [play_game(game, seed=3, max_plies=150) for game in range(6)]
+        fen = '4k3/P7/8/8/8/8/8/4K2R w K - 0 1'
+        with GameRecordWriter(self.path) as writer:
+            for game in games:
+                writer.write_game([encode_move(*parse_move(move)) for move in game['moves']], '1/2-1/2')
+            writer.write_game([encode_move((0, 1), (0, 0), 'knight'), encode_move((4, 0), (3, 0))], '*', fen)
+
+        with GameArchive(self.path) as archive:
+            self.assertEqual(len(archive), 7, "Test Failed: Incorrect number of games.")
+            for i, game in enumerate(games):
+                moves = [parse_move(move) for move in game['moves']]
+                self.assertEqual([decode_move(move) for move in archive.moves(i)], moves, "Test Failed: Moves did not round-trip.")
+                self.assertEqual(archive.move(i, 5), moves[5], "Test Failed: Incorrect random access move.")
+                self.assertIsNone(archive.fen(i), "Test Failed: Standard start should have no FEN.")
+            self.assertEqual(archive.result(0), '1/2-1/2', "Test Failed: Incorrect result.")
+            self.assertEqual(archive.fen(6), fen, "Test Failed: Incorrect starting position.")
+            self.assertEqual(archive.result(6), '*', "Test Failed: Incorrect result.")
+            self.assertEqual(archive.position(6, 1).board[0][0].piece_name, 'w_knight', "Test Failed: Promotion not replayed.")
+            with self.assertRaises(IndexError):
+                archive.moves(7)
+
+    def test_cursor_matches_replay(self):
+        game = play_game(0, seed=4, max_plies=120)
+        with GameRecordWriter(self.path) as writer:
+            writer.write_game([encode_move(*parse_move(move)) for move in game['moves']], '*')
+
+        fens = [build_position(' '.join(game['moves'][:ply])).to_fen() for ply in range(len(game['moves']) + 1)]
+        with GameArchive(self.path) as archive:
+            cursor = archive.cursor(0)
+            for ply in [10, 3, 3, len(fens) - 1, 0, 57, 56, 90]:
+                self.assertEqual(cursor.seek(ply).to_fen(), fens[ply], f"Test Failed: Incorrect position at ply {ply}.")
+            self.assertEqual(archive.position(0, 40, Chessboard).to_fen(), fens[40], "Test Failed: Chessboard replay differs.")
+            with self.assertRaises(IndexError):
+                cursor.seek(len(fens))
+
+    def test_convert_pgn(self):
+        pgn_path = Path(self.directory.name) / 'games.pgn'
+        pgn_path.write_text('1. f3 e5 2. g4 Qh4# 0-1\n\n[FEN "4k3/8/8/8/8/8/8/R3K3 w Q - 0 1"]\n\n1. O-O-O *\n')
+        self.assertEqual(convert_pgn(pgn_path, self.path), 2, "Test Failed: Incorrect number of games converted.")
+        with GameArchive(self.path) as archive:
+            self.assertEqual(archive.result(0), '0-1', "Test Failed: Incorrect result.")
+            self.assertEqual(archive.position(0, 4).get_result(), 'Black Wins by Checkmate', "Test Failed: Incorrect replay.")
+            self.assertEqual(archive.move(1, 0), ((4, 7), (2, 7), None), "Test Failed: Incorrect castling move.")
+
+    def test_rejects_other_files(self):
+        self.path.write_bytes(b'[Event "?"]\n' * 4)
+        with self.assertRaises(ValueError):
+            GameArchive(self.path)
+
+
+class TestBook(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'book.bin'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def encode(self, moves):
+        return [encode_move(*parse_move(move)) for move in moves.split()]
+
+    def test_weights(self):
+        builder = BookBuilder(max_plies=4)
+        builder.add_game(self.encode('e2e4 e7e5 g1f3 b8c6 f1b5'), '1-0')
+        builder.add_game(self.encode('e2e4 c7c5'), '0-1')
+        builder.add_game(self.encode('d2d4 d7d5'), '1/2-1/2')
+        builder.add_game(self.encode('d2d4 d7d5'), '0-1')
+        builder.write(self.path)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.moves(Position()), [(((4, 6), (4, 4), None), 2), (((3, 6), (3, 4), None), 1)],
+                             "Test Failed: Incorrect start position moves.")
+            position = build_position('d2d4')
+            self.assertEqual(book.moves(position), [(((3, 1), (3, 3), None), 3)], "Test Failed: Incorrect reply.")
+            self.assertEqual(book.moves(build_position('e2e4 c7c5')), [], "Test Failed: Losing move should not be stored.")
+            self.assertEqual(book.moves(build_position('e2e4 e7e5 g1f3 b8c6')), [], "Test Failed: Plies past the limit stored.")
+            self.assertEqual(book.choose_move(Position()), ((4, 6), (4, 4), None), "Test Failed: Heaviest move not chosen.")
+            self.assertIsNone(book.choose_move(build_position('a2a3')), "Test Failed: Unknown position should have no move.")
+            rng = random.Random(1)
+            self.assertEqual({book.choose_move(Position(), rng)[0] for _ in range(50)}, {(4, 6), (3, 6)},
+                             "Test Failed: Weighted choice should play both moves.")
+
+    def test_probes_reuse_legal_moves(self):
+        builder = BookBuilder()
+        builder.add_game(self.encode('e2e4 e7e5'), '1-0')
+        builder.write(self.path)
+
+        with OpeningBook(self.path) as book:
+            position = Position()
+            with mock.patch.object(Position, 'get_legal_moves_by_square', wraps=position.get_legal_moves_by_square) as sweep:
+                self.assertEqual(book.moves(build_position('a2a3')), [], "Test Failed: Unknown position should have no move.")
+                self.assertEqual(sweep.call_count, 0, "Test Failed: A book miss should not generate legal moves.")
+                for _ in range(3):
+                    self.assertEqual(book.moves(position), [(((4, 6), (4, 4), None), 2)], "Test Failed: Incorrect book move.")
+                self.assertEqual(sweep.call_count, 1, "Test Failed: Repeated probes should reuse the legal moves.")
+
+    def test_transpositions_and_scaling(self):
+        builder = BookBuilder()
+        builder.add_game(self.encode('b1c3 g8f6 g1f3 b8c6'), '0-1')
+        builder.weights[Position().hash, encode_move((6, 7), (5, 5))] = 4 * MAX_WEIGHT
+        builder.write(self.path)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.moves(Position())[0][1], MAX_WEIGHT, "Test Failed: Weights should be scaled to 16 bits.")
+            self.assertEqual(book.moves(build_position('g1f3 g8f6 b1c3')), [(((1, 0), (2, 2), None), 1)],
+                             "Test Failed: Transposed position not found.")
+
+    def test_build_from_files(self):
+        records = Path(self.directory.name) / 'games.cwg'
+        pgn_path = Path(self.directory.name) / 'games.pgn'
+        pgn_path.write_text('1. f3 e5 2. g4 Qh4# 0-1\n')
+        games = [play_game(game, seed=5, max_plies=60) for game in range(20)]
+        with GameRecordWriter(records) as writer:
+            for game in games:
+                writer.write_game(self.encode(' '.join(game['moves'])), '*')
+
+        self.assertGreater(build_book([records, pgn_path], self.path, max_plies=10), 20, "Test Failed: Book is too small.")
+        with OpeningBook(self.path) as book:
+            keys = [book.keys[index] for index in range(len(book))]
+            self.assertEqual(keys, sorted(keys), "Test Failed: Entries are not sorted.")
+            for game in games:
+                position = build_position(' '.join(game['moves'][:9]))
+                self.assertIn(parse_move(game['moves'][9]), [move for move, _ in book.moves(position)],
+                              "Test Failed: Game move missing from the book.")
+            position = build_position('f2f3 e7e5 g2g4')
+            self.assertEqual(Engine(book=book).best_move(position, max_nodes=1), ((3, 0), (7, 4), None),
+                             "Test Failed: Engine should play the book move.")
+
+    def test_rejects_other_files(self):
+        self.path.write_bytes(b'CWEPBOOK' + bytes(20))
+        with self.assertRaises(ValueError):
+            OpeningBook(self.path)
+
+
+class TestTablebase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        generate_table('KQvK', cls.directory.name, workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.tablebase = Tablebase(self.directory.name)
+
+    def tearDown(self):
+        self.tablebase.close()
+
+    def test_signatures(self):
+        self.assertEqual(parse_signature('KQvK'), [(0, 0), (0, 1), (1, 0)], "Test Failed: Incorrect pieces.")
+        self.assertEqual(sub_signatures('KPvK'), {'KvK', 'KQvK', 'KRvK', 'KBvK', 'KNvK'}, "Test Failed: Incorrect sub-tables.")
+        for signature in ['KQ', 'QKvK', 'KQvKK', 'KQRBvKN', 'KXvK']:
+            with self.assertRaises(ValueError):
+                parse_signature(signature)
+        self.assertTrue(table_path(self.directory.name, 'KvK').exists(), "Test Failed: Sub-table not built.")
+
+    def test_probe(self):
+        self.assertEqual(self.tablebase.probe(Position.from_fen('k7/8/1K6/8/8/8/7Q/8 w - - 0 1')), (1, 1),
+                         "Test Failed: Mate in one not found.")
+        self.assertEqual(self.tablebase.probe(Position.from_fen('k6Q/8/1K6/8/8/8/8/8 b - - 0 1')), (-1, 0),
+                         "Test Failed: Checkmate not found.")
+        self.assertEqual(self.tablebase.probe(Position.from_fen('k7/2Q5/1K6/8/8/8/8/8 b - - 0 1')), (0, None),
+                         "Test Failed: Stalemate should be a draw.")
+        self.assertEqual(self.tablebase.probe(Position.from_fen('8/8/8/3k4/8/8/8/Q3K3 b - - 0 1')), (-1, 18),
+                         "Test Failed: Incorrect distance to mate.")
+        self.assertIsNone(self.tablebase.probe(Position.from_fen('4k3/8/8/8/8/8/8/R3K3 w Q - 0 1')),
+                          "Test Failed: Castling rights are not in the tables.")
+        self.assertIsNone(self.tablebase.probe(Position()), "Test Failed: Too many pieces.")
+
+    def test_agrees_with_rules(self):
+        rng = random.Random(9)
+        table = TableFile(table_path(self.directory.name, 'KQvK'))
+        checked = 0
+        while checked < 150:
+            index = rng.randrange(2 * 64 ** 3)
+            if table[index] == INVALID:
+                continue
+            turn, king, queen, enemy = index >> 18, index >> 12 & 63, index >> 6 & 63, index & 63
+            board = [[None] * 8 for _ in range(8)]
+            for name, square in [('w_king', king), ('w_queen', queen), ('b_king', enemy)]:
+                board[square % 8][square // 8] = RulesPiece(name, (square % 8, square // 8))
+            position = Position.from_fen(format_fen(board, 'wb'[turn], 0))
+            wdl, distance = self.tablebase.probe(position)
+
+            successors = []
+            for start, ends in position.get_legal_moves_by_square().items():
+                for end in ends:
+                    position.make_move(start, end)
+                    successors.append(self.tablebase.probe(position))
+                    position.unmake_move()
+            if wdl == 1:
+                self.assertEqual(min(d for w, d in successors if w == -1), distance - 1, "Test Failed: Incorrect win.")
+            elif wdl == -1 and distance:
+                self.assertTrue(all(w == 1 for w, _ in successors), "Test Failed: Lost position has an escape.")
+                self.assertEqual(max(d for _, d in successors), distance - 1, "Test Failed: Incorrect loss.")
+            elif wdl == -1:
+                self.assertEqual(position.get_result(), 'Black Wins by Checkmate' if turn == 0 else 'White Wins by Checkmate',
+                                 "Test Failed: Incorrect checkmate.")
+            else:
+                self.assertFalse(any(w == -1 for w, _ in successors), "Test Failed: Drawn position has a win.")
+            checked += 1
+        table.close()
+
+    def test_perfect_play(self):
+        position = Position.from_fen('8/8/8/3k4/8/8/8/Q3K3 w - - 0 1')
+        engine = Engine(tablebase=self.tablebase)
+        plies = 0
+        while not position.get_result() and plies < 40:
+            start, end, promotion = engine.best_move(position, max_nodes=1)
+            position.make_move(start, end, promotion or 'queen')
+            plies += 1
+        self.assertEqual(position.get_result(), 'White Wins by Checkmate', "Test Failed: Tablebase play did not mate.")
+        self.assertEqual(plies, self.tablebase.probe(Position.from_fen('8/8/8/3k4/8/8/8/Q3K3 w - - 0 1'))[1],
+                         "Test Failed: Mate took longer than the tablebase distance.")
+
+    def test_rejects_other_files(self):
+        path = Path(self.directory.name) / 'KRvK.cwtb'
+        path.write_bytes(bytes(64))
+        with self.assertRaises(ValueError):
+            TableFile(path)
+        path.unlink()
+
+
+class TestTensor(unittest.TestCase):
+    def test_start_position_planes(self):
+        pieces, turn, castling = encode_positions([Position(), build_position('e2e4')])
+        self.assertEqual(pieces.shape, (2, 12, 8, 8), "Test Failed: Incorrect plane shape.")
+        self.assertTrue(pieces.flags['C_CONTIGUOUS'], "Test Failed: Planes should be contiguous.")
+        self.assertEqual(int(pieces[0].sum()), 32, "Test Failed: Incorrect piece count.")
+        self.assertEqual(pieces[0, PIECE_NAMES.index('w_pawn'), 6].tolist(), [1] * 8, "Test Failed: White pawns not on rank 2.")
+        self.assertEqual(pieces[0, PIECE_NAMES.index('b_king'), 0, 4], 1, "Test Failed: Black king not on e8.")
+        self.assertEqual(pieces[1, PIECE_NAMES.index('w_pawn'), 4, 4], 1, "Test Failed: Pawn not on e4.")
+        self.assertEqual(turn.tolist(), [0, 1], "Test Failed: Incorrect side to move.")
+        self.assertEqual(castling.tolist(), [[1, 1, 1, 1]] * 2, "Test Failed: Incorrect castling rights.")
+
+    def test_round_trip(self):
+        positions = [build_position(moves) for moves, _ in PERFT_POSITIONS.values()]
+        pieces, turn, castling = encode_positions(positions, np.float32)
+        self.assertEqual(pieces.dtype, np.float32, "Test Failed: Incorrect plane type.")
+        for position, decoded in zip(positions, decode_positions(pieces, turn, castling)):
+            self.assertEqual(decoded.to_fen().split()[:4], position.to_fen().split()[:4], "Test Failed: Position does not round-trip.")
+            self.assertEqual(decoded.hash, position.hash, "Test Failed: Decoded position hash differs.")
+
+    def test_replayed_game(self):
+        # One position mutated in place is read before each next move is made
+        moves = 'e2e4 e7e5 g1f3 b8c6 f1c4 g8f6 e1g1'.split()
+        position = Position()
+
+        def replay():
+            yield position
+            for move in moves:
+                position.make_move(*parse_move(move)[:2])
+                yield position
+
+        codes, turn, castling = encode_codes(replay())
+        expected, _, _ = encode_codes([build_position(' '.join(moves[:ply])) for ply in range(len(moves) + 1)])
+        self.assertEqual(codes.tolist(), expected.tolist(), "Test Failed: Replayed positions differ.")
+        self.assertEqual(turn.tolist(), [0, 1] * 4, "Test Failed: Incorrect side to move.")
+        self.assertEqual(castling[-1], BLACK_KINGSIDE | BLACK_QUEENSIDE, "Test Failed: Castling should drop white's rights.")
+        self.assertEqual(planes_to_codes(codes_to_planes(codes)).tolist(), codes.tolist(), "Test Failed: Codes do not round-trip.")
+
+    def test_stack_planes(self):
+        pieces, turn, castling = encode_positions([Position('r3k3/8/8/8/8/8/8/4K2R b Kq - 0 1')])
+        stacked = stack_planes(pieces, turn, castling, np.float32)
+        self.assertEqual(stacked.shape, (1, 17, 8, 8), "Test Failed: Incorrect stacked shape.")
+        self.assertTrue((stacked[:, :12] == pieces).all(), "Test Failed: Piece planes changed.")
+        self.assertEqual(stacked[0, 12:].mean(axis=(1, 2)).tolist(), [1, 1, 0, 0, 1], "Test Failed: Incorrect constant planes.")
+
+    def test_invalid_planes(self):
+        pieces, _, _ = encode_positions([Position()])
+        pieces[0, PIECE_NAMES.index('w_queen'), 0, 0] = 1
+        with self.assertRaises(ValueError):
+            planes_to_codes(pieces)
+        with self.assertRaises(ValueError):
+            decode_positions(np.zeros((1, 12, 8)))
+
+
+class TestBatchMoves(unittest.TestCase):
+    def assert_matches_scalar(self, positions):
+        for position, moves in zip(positions, batch_legal_moves(positions)):
+            self.assertEqual(len(moves), len(set(moves)), f"Test Failed: Duplicate batched moves in {position.to_fen()}.")
+            self.assertEqual(set(moves), set(position.get_legal_moves()), f"Test Failed: Batched moves differ in {position.to_fen()}.")
+
+    def test_matches_scalar_generator(self):
+        rng = random.Random(5)
+        positions = [build_position(moves) for moves, _ in PERFT_POSITIONS.values()]
+        for _ in range(20):
+            position = Position()
+            for _ in range(rng.randrange(120)):
+                moves = position.get_legal_moves()
+                if not moves:
+                    break
+                position.play_move(*rng.choice(sorted(moves)))
+                positions.append(position.copy())
+        self.assert_matches_scalar(positions)
+
+    def test_pins_checks_and_castling(self):
+        positions = [Position(fen) for fen in [
+            '4k3/8/8/1b6/8/3P4/4K3/8 w - - 0 1',  # Pawn pinned against capturing off the diagonal
+            '4k3/8/8/8/8/2b5/3P4/4K3 w - - 0 1',  # Pinned pawn takes its pinner
+            '4k3/4r3/8/8/8/8/4R3/4K3 w - - 0 1',  # Rook pinned along its file
+            '4k3/8/5n2/8/1b6/8/8/4K3 b - - 0 1',  # No check on the side to move
+            '4k3/8/3N4/8/8/8/4R3/4K3 b - - 0 1',  # Double check: only the king moves
+            'r3k2r/8/8/8/8/8/6b1/R3K2R w KQkq - 0 1',  # Castling through an attacked square
+            'r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1',
+            'r3k2r/8/8/8/8/8/4q3/R3K2R w KQkq - 0 1',  # No castling out of check
+            '4k3/1P6/8/8/8/8/6p1/4K2R b K - 0 1',  # Promotions count once
+            '8/8/8/8/8/8/8/R7 w - - 0 1',  # No king, so nothing to keep safe
+        ]]
+        self.assert_matches_scalar(positions)
+        moves = batch_legal_moves(positions)
+        self.assertNotIn(((3, 5), (1, 3)), moves[0], "Test Failed: Pinned pawn left its pin line.")
+        self.assertIn(((3, 6), (2, 5)), moves[1], "Test Failed: Pinned pawn should take its pinner.")
+        self.assertTrue(all(start == (4, 0) for start, _ in moves[4]), "Test Failed: Only the king may answer double check.")
+        self.assertNotIn(((4, 7), (6, 7)), moves[5], "Test Failed: Castled through an attacked square.")
+        self.assertIn(((4, 7), (2, 7)), moves[5], "Test Failed: Queenside castling should be allowed.")
+        self.assertNotIn(((4, 7), (2, 7)), moves[7], "Test Failed: Castled out of check.")
+
+    def test_arrays_and_masks(self):
+        positions = [Position(), build_position('e2e4 e7e5 g1f3'), Position('4k3/8/8/8/8/8/8/4K2q w - - 0 1')]
+        codes, turn, castling = encode_codes(positions)
+        index, start, end = legal_move_arrays(codes, turn, castling)
+        self.assertEqual(np.bincount(index, minlength=3).tolist(), [20, 29, 3], "Test Failed: Incorrect move counts.")
+        keys = (index * 4096 + start * 64 + end).tolist()
+        self.assertEqual(keys, sorted(keys), "Test Failed: Moves should be sorted by position and square.")
+        masks = legal_move_masks(codes, turn, castling)
+        self.assertEqual(masks.shape, (3, 64, 64), "Test Failed: Incorrect mask shape.")
+        self.assertEqual(int(masks.sum()), 52, "Test Failed: Incorrect number of moves in masks.")
+        self.assertTrue(masks[2, 60, 51] and not masks[2, 60, 59], "Test Failed: The king should step off the checking rank.")
+        empty = legal_move_arrays(np.zeros((0, 64), dtype=np.uint8), np.zeros(0), np.zeros(0))
+        self.assertEqual([len(array) for array in empty], [0, 0, 0], "Test Failed: An empty batch has no moves.")
+
+
+class TestEngine(unittest.TestCase):
+    def test_encode_move(self):
+        for move in [((4, 6), (4, 4), None), ((7, 1), (6, 0), 'knight'), ((0, 0), (7, 7), None)]:
+            self.assertEqual(decode_move(encode_move(*move)), move, "Test Failed: Move should survive encoding.")
+
+    def test_finds_mate_in_one(self):
+        position = build_position(PERFT_POSITIONS['mate_in_one'][0])
+        start_hash = position.hash
+        self.assertEqual(Engine().best_move(position, max_depth=3), ((3, 7), (7, 3), None), "Test Failed: Missed Qh5#.")
+        self.assertEqual(position.hash, start_hash, "Test Failed: Search should restore the position.")
+        self.assertEqual(len(position.move_stack), 4, "Test Failed: Search left moves on the stack.")
+
+    def test_wins_material(self):
+        position = build_position('e2e4 e7e5 g1f3 d8g5')
+        self.assertEqual(Engine().best_move(position, max_depth=3)[:2], ((5, 5), (6, 3)), "Test Failed: Should take the hanging queen.")
+
+    def test_node_budget(self):
+        position = Position()
+        engine = Engine()
+        move = engine.best_move(position, max_nodes=1500)
+        self.assertIn(move[:2], position.get_legal_moves(), "Test Failed: Budgeted search should return a legal move.")
+        self.assertLessEqual(engine.nodes, 1500, "Test Failed: Search exceeded its node budget.")
+        self.assertEqual(position.move_stack, [], "Test Failed: Stopped search left moves on the stack.")
+
+    def test_no_legal_moves(self):
+        position = build_position('f2f3 e7e5 g2g4 d8h4')
+        self.assertIsNone(Engine().best_move(position, max_depth=2), "Test Failed: Checkmated side has no move.")
+
+    def test_transposition_table(self):
+        table = TranspositionTable(1000)
+        self.assertEqual(table.size, 512, "Test Failed: Table size should be a power of two.")
+        table.store(5, 4, 30, EXACT, 77)
+        self.assertEqual(table.probe(5)[:4], (4, 30, EXACT, 77), "Test Failed: Stored entry missing.")
+        table.store(5 + 512, 2, 10, EXACT, 1)
+        self.assertEqual(table.probe(5)[:4], (4, 30, EXACT, 77), "Test Failed: Shallower entry replaced a deeper one.")
+        self.assertIsNone(table.probe(5 + 512), "Test Failed: Colliding key should not match.")
+        table.new_search()
+        table.store(5 + 512, 2, 10, EXACT, 1)
+        self.assertEqual(table.probe(5 + 512)[:4], (2, 10, EXACT, 1), "Test Failed: Stale entry should be replaced.")
+
+
+class TestParallel(unittest.TestCase):
+    def test_shared_table(self):
+        table = SharedTranspositionTable(1024)
+        try:
+            attached = SharedTranspositionTable(1024, table.name)
+            table.store(1 << 63 | 9, 5, -99990, LOWER, 4095)
+            self.assertEqual(attached.probe(1 << 63 | 9)[:4], (5, -99990, LOWER, 4095), "Test Failed: Entry not shared.")
+            # A slot whose two words disagree, as after a torn write, must not match
+            attached.words[9 * 2] ^= 1
+            self.assertIsNone(table.probe(1 << 63 | 9), "Test Failed: Torn entry accepted.")
+            attached.close()
+        finally:
+            table.close()
+
+    def test_parallel_best_move(self):
+        position = build_position(PERFT_POSITIONS['mate_in_one'][0])
+        with ParallelEngine(2, 1 << 12) as engine:
+            self.assertEqual(engine.best_move(position, max_depth=3), ((3, 7), (7, 3), None), "Test Failed: Missed Qh5#.")
+            move = engine.best_move(Position(), max_nodes=2000)
+            self.assertIn(move[:2], Position().get_legal_moves(), "Test Failed: Parallel search returned an illegal move.")
+            self.assertLessEqual(engine.nodes, 2000, "Test Failed: Search exceeded its node budget.")
+        self.assertEqual(len(position.move_stack), 4, "Test Failed: Search should leave the position alone.")
+
+    def test_position_copy(self):
+        position = build_position('e2e4 e7e5 e1e2')
+        copy = position.copy()
+        self.assertEqual(copy.hash, position.hash, "Test Failed: Copy should keep the hash.")
+        self.assertEqual(copy.turn, 'b', "Test Failed: Copy should keep the side to move.")
+        self.assertEqual(sorted(copy.get_legal_moves()), sorted(position.get_legal_moves()), "Test Failed: Copy moves differ.")
+
+
+class TestSimulate(unittest.TestCase):
+    def test_simulate_is_deterministic(self):
+        inline = list(simulate(6, 'random', workers=1, seed=11, max_plies=60, chunk_size=4))
+        pooled = list(simulate(6, 'random', workers=2, seed=11, max_plies=60, chunk_size=4))
+        self.assertEqual(inline, pooled, "Test Failed: Results should not depend on the worker count.")
+        self.assertEqual([result['game'] for result in inline], list(range(6)), "Test Failed: Results out of game order.")
+        self.assertNotEqual(inline[0]['moves'], inline[1]['moves'], "Test Failed: Games should differ.")
+
+    def test_play_game_outcome(self):
+        for game in range(20):
+            result = play_game(game, seed=1, max_plies=200)
+            self.assertEqual(result['plies'], len(result['moves']), "Test Failed: Ply count mismatch.")
+            position = build_position(' '.join(result['moves']))
+            expected = MOVE_LIMIT_RESULT if result['plies'] == 200 and not position.get_result() else position.get_result()
+            self.assertEqual(result['outcome'], expected, "Test Failed: Outcome does not match the final position.")
+
+    def test_summarize(self):
+        results = [{'outcome': 'Draw by Stalemate', 'plies': 10}, {'outcome': 'White Wins by Checkmate', 'plies': 30}]
+        summary = summarize(results, 2.0)
+        self.assertEqual(summary['outcomes'], {'Draw by Stalemate': 1, 'White Wins by Checkmate': 1}, "Test Failed: Outcome counts.")
+        self.assertEqual(summary['games_per_second'], 1.0, "Test Failed: Incorrect throughput.")
+
+
 if __name__ == "__main__":
     unittest.main() 
@@ -0,0 +1,77 @@
+"""
+Zobrist keys for Chess Without En Passant.
+
+A position key is the XOR of one random 64-bit number per (piece, square),
+one for black to move and one per castling right. With no en passant there is
+no file key. Position keeps its key current by XOR-ing in and out only what
+a move changes; compute_hash rebuilds it from scratch.
+"""
+from bitboard import PIECE_NAMES
+import random
+
+# A fixed seed keeps keys, and anything stored under them, stable across runs
+_rng = random.Random(0x5EED)
+
+PIECE_KEYS = {piece_name: [[_rng.getrandbits(64) for _ in range(8)] for _ in range(8)] for piece_name in PIECE_NAMES}
+TURN_KEY = _rng.getrandbits(64)
+
+# Castling rights as a 4-bit mask, indexed by the rights it holds
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+_CASTLING_RIGHT_KEYS = [_rng.getrandbits(64) for _ in range(4)]
+CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights >> _bit & 1:
+            CASTLING_KEYS[_rights] ^= _CASTLING_RIGHT_KEYS[_bit]
+
+
+def _unmoved(piece, piece_name: str):
+    return piece is not None and piece.piece_name == piece_name and piece.on_starting_square
+
+
+def castling_rights(board):
+    """
+    Derives the castling rights of a board from the on_starting_square flags.
+
+    A side keeps a right while its king and that corner's rook are unmoved.
+
+    Args:
+        board: The chessboard representation.
+
+    Returns:
+        int: A mask of WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE and BLACK_QUEENSIDE.
+    """
+    rights = 0
+    if _unmoved(board[4][7], 'w_king'):
+        if _unmoved(board[7][7], 'w_rook'):
+            rights |= WHITE_KINGSIDE
+        if _unmoved(board[0][7], 'w_rook'):
+            rights |= WHITE_QUEENSIDE
+    if _unmoved(board[4][0], 'b_king'):
+        if _unmoved(board[7][0], 'b_rook'):
+            rights |= BLACK_KINGSIDE
+        if _unmoved(board[0][0], 'b_rook'):
+            rights |= BLACK_QUEENSIDE
+    return rights
+
+
+def compute_hash(board, turn: str):
+    """
+    Computes the Zobrist key of a position from scratch.
+
+    Args:
+        board: The chessboard representation.
+        turn (str): The side to move.
+
+    Returns:
+        int: The 64-bit position key.
+    """
+    key = CASTLING_KEYS[castling_rights(board)]
+    if turn == 'b':
+        key ^= TURN_KEY
+    for x in range(8):
+        for y in range(8):
+            piece = board[x][y]
+            if piece is not None:
+                key ^= PIECE_KEYS[piece.piece_name][x][y]
+    return key